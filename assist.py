@@ -1,8 +1,21 @@
-from openai import OpenAI
+import io
+import atexit
+import queue
 import time
-from pygame import mixer
+import threading
+import contextvars
+import contextlib
+from collections import deque
+from concurrent.futures import CancelledError
 import os
 from dotenv import load_dotenv
+from core.text_stream import SentenceSplitter
+from core.run_polling import PollPolicy, wait_for_run
+from core.tts_cache import TTSCache
+from core.tts_backends import OpenAITTSBackend, Pyttsx3Backend, TTSSelector
+from core.playback import PlaybackEngine
+from core.tracing import tracer
+from core.response_cache import ResponseCache
 
 # Load environment variables from .env file
 load_dotenv(dotenv_path='Keys.env')
@@ -10,44 +23,228 @@ load_dotenv(dotenv_path='Keys.env')
 # Set your OpenAI API key
 api_key = os.getenv('OPENAI_API_KEY')
 
-# Initialize the client and mixer
-client = OpenAI(api_key=api_key, default_headers={"OpenAI-Beta": "assistants=v2"})
-mixer.init()
-
 assistant_id = "asst_LUL1wtigL2g5yB9opwodDaL1"
 thread_id = "thread_XJ3b3kaCxtxj50xypH8L7l0M"
 
-# Retrieve the assistant and thread
-assistant = client.beta.assistants.retrieve(assistant_id)
-thread = client.beta.threads.retrieve(thread_id)
+# The client and the mixer are created on first use
+# (or by jarvis' background warm-up) so importing this module stays cheap.
+client = None
+playback = None
+_init_lock = threading.Lock()
+
+def get_client():
+    global client
+    if client is None:
+        with _init_lock:
+            if client is None:
+                from openai import OpenAI
+                client = OpenAI(api_key=api_key, default_headers={"OpenAI-Beta": "assistants=v2"})
+    return client
+
+def get_playback():
+    global playback
+    if playback is None:
+        with _init_lock:
+            if playback is None:
+                from pygame import mixer
+                mixer.init()
+                playback = PlaybackEngine(mixer.music)
+    return playback
+
+def warm_up_clients():
+    # Checks the assistant and thread exist and opens the HTTPS connection ahead of the first question.
+    get_client().beta.assistants.retrieve(assistant_id)
+    get_client().beta.threads.retrieve(thread_id)
+
+# Polling strategy for non-streaming runs; replace to tune.
+poll_policy = PollPolicy()
+# Per-call polling metrics, most recent last.
+poll_metrics = deque(maxlen=100)
+
+RUN_STATUS_MESSAGES = {
+    'failed': "The run failed.",
+    'cancelled': "The run was cancelled.",
+    'expired': "The run expired.",
+    'timed_out': "The run timed out.",
+    'requires_action': "The run needed an action I can't perform.",
+    'incomplete': "The reply was cut short.",
+}
+
+def _run_options(max_messages):
+    # With `max_messages`, a run only sees the last that many messages of its thread.
+    if max_messages is None:
+        return {}
+    return {'truncation_strategy': {'type': 'last_messages', 'last_messages': max_messages}}
+
+def create_thread():
+    return get_client().beta.threads.create().id
+
+def delete_thread(thread):
+    get_client().beta.threads.delete(thread)
+
+# Replies to prompts asked with a `category` are cached here (see
+# core.response_cache.DEFAULT_TTLS); conversational turns never are.
+RESPONSE_CACHE_FILE = 'response_cache.json'
+RESPONSE_CACHE_ENTRIES = 512
+response_cache = None
+
+def get_response_cache():
+    global response_cache
+    if response_cache is None:
+        with _init_lock:
+            if response_cache is None:
+                response_cache = ResponseCache(RESPONSE_CACHE_FILE, RESPONSE_CACHE_ENTRIES, namespace=assistant_id)
+    return response_cache
+
+def flush_response_cache():
+    if response_cache is not None:
+        response_cache.flush()
 
-def ask_question_memory(question):
-    global thread
-    client.beta.threads.messages.create(thread.id, role="user", content=question)
-    run = client.beta.threads.runs.create(thread_id=thread.id, assistant_id=assistant.id)
+atexit.register(flush_response_cache)
 
-    while (run_status := client.beta.threads.runs.retrieve(thread_id=thread.id, run_id=run.id)).status != 'completed':
-        if run_status.status == 'failed':
-            return "The run failed."
-        time.sleep(1)
+def ask_question_memory(question, thread=None, max_messages=None, category=None):
+    # `thread` defaults to the shared conversation thread. Deterministic
+    # requests pass a `category` ('code', 'fix', ...) and are answered
+    # from the response cache when they were asked before; a cached reply
+    # doesn't reach the thread. Without one the question always goes to the assistant.
+    if category is None:
+        return _ask(question, thread, max_messages)
+    return get_response_cache().get_or_compute(category, question, lambda: _ask(question, thread, max_messages),
+                                               cacheable=lambda reply: reply not in RUN_STATUS_MESSAGES.values())
 
-    messages = client.beta.threads.messages.list(thread_id=thread.id)
+@tracer.traced("assistant")
+def _ask(question, thread, max_messages):
+    thread = thread or thread_id
+    client = get_client()
+    client.beta.threads.messages.create(thread, role="user", content=question)
+    run = client.beta.threads.runs.create(thread_id=thread, assistant_id=assistant_id, **_run_options(max_messages))
+
+    run, metrics = wait_for_run(client, thread, run.id, poll_policy)
+    poll_metrics.append(metrics)
+    if metrics.status != 'completed':
+        # Otherwise the newest message may be the question itself or a truncated reply.
+        return RUN_STATUS_MESSAGES.get(metrics.status, RUN_STATUS_MESSAGES['failed'])
+
+    messages = client.beta.threads.messages.list(thread_id=thread)
     return messages.data[0].content[0].text.value
 
-def generate_tts(sentence, speech_file_path):
-    response = client.audio.speech.create(model="tts-1", voice="echo", input=sentence)
-    response.stream_to_file(speech_file_path)
-    return str(speech_file_path)
-
-def play_sound(file_path):
-    mixer.music.load(file_path)
-    mixer.music.play()
-
-def TTS(text):
-    speech_file_path = generate_tts(text, "speech.mp3")
-    play_sound(speech_file_path)
-    while mixer.music.get_busy():
-        time.sleep(1)
-    mixer.music.unload()
-    os.remove(speech_file_path)
+def stream_question_memory(question, thread=None, max_messages=None):
+    thread = thread or thread_id
+    client = get_client()
+    client.beta.threads.messages.create(thread, role="user", content=question)
+    with client.beta.threads.runs.stream(thread_id=thread, assistant_id=assistant_id, **_run_options(max_messages)) as stream:
+        for text in stream.text_deltas:
+            yield text
+
+def transcribe(wav_data, model="whisper-1"):
+    # Speech to text for audio that didn't come from the local microphone.
+    audio = io.BytesIO(wav_data)
+    audio.name = "speech.wav"
+    return get_client().audio.transcriptions.create(model=model, file=audio).text
+
+TTS_MODEL = "tts-1"
+TTS_VOICE = "echo"
+# System prompts are spoken by the offline engine, replies by the remote
+# model; either one covers for the other when it fails or is slow.
+tts_remote = OpenAITTSBackend(get_client, TTS_MODEL, TTS_VOICE)
+tts_local = Pyttsx3Backend()
+tts_selector = TTSSelector(tts_remote, tts_local)
+tts_cache = TTSCache('tts_cache')
+tts_caches = {
+    tts_remote.name: tts_cache,
+    tts_local.name: TTSCache(os.path.join('tts_cache', 'local'), 10 * 1024 * 1024, tts_local.extension),
+}
+
+@tracer.traced("tts.synthesize")
+def generate_tts(sentence, system=False, backend=None):
+    return tts_selector.synthesize(sentence, tts_caches, system, backend)
+
+def warm_up_tts(prompts):
+    for prompt in prompts:
+        generate_tts(prompt, system=True)
+    return len(prompts)
+
+def play_sound(file_path, generation=None):
+    # Clips are decoded from memory so the cache file isn't held open while playing.
+    with open(file_path, 'rb') as file:
+        return get_playback().play(file.read(), os.path.splitext(file_path)[1].lstrip('.'), generation)
+
+# Cancel events of the replies still being streamed or synthesized.
+_active_replies = set()
+_replies_lock = threading.Lock()
+
+def stop_speaking():
+    # Barge-in: end the replies in flight, cut off the current clip and drop anything queued.
+    with _replies_lock:
+        for cancel in _active_replies:
+            cancel.set()
+    if playback is not None:
+        playback.stop()
+
+def TTS(text, wait=True, system=False):
+    speech_file_path = generate_tts(text, system)
+    finished = play_sound(speech_file_path)
+    if wait:
+        with tracer.span("tts.playback"):
+            try:
+                finished.result()
+            except CancelledError:
+                # stop_speaking() dropped the clip before it started: interrupted, like a cut-off one.
+                pass
     return "done"
+
+def _synthesize_worker(sentences, cancel, generation, backend):
+    # Clips are tagged with the playback generation the reply started in, so
+    # one synthesized after stop_speaking() is dropped instead of played.
+    # Every sentence goes to the backend chosen for the reply, so the voice
+    # doesn't change halfway through.
+    try:
+        while (sentence := sentences.get()) is not None:
+            if cancel.is_set():
+                continue
+            try:
+                play_sound(generate_tts(sentence, backend=backend), generation)
+            except Exception as e:
+                print(f"TTS failed for {sentence!r}: {e}")
+    finally:
+        with _replies_lock:
+            _active_replies.discard(cancel)
+
+def stream_TTS(question, wait=True):
+    # Speaks the reply sentence by sentence while the rest is still being generated:
+    # the stream feeds a synthesis thread, which queues clips on the playback engine.
+    # Returns the full response text (including any #command suffix) once the stream
+    # ends, after playback has finished too when `wait` is set. stop_speaking()
+    # ends the stream early; the text received so far is returned.
+    splitter = SentenceSplitter()
+    sentences = queue.Queue()
+    cancel = threading.Event()
+    with _replies_lock:
+        _active_replies.add(cancel)
+    # The synthesis thread runs in this context so its spans count towards the current turn.
+    synthesizer = threading.Thread(target=contextvars.copy_context().run,
+                                   args=(_synthesize_worker, sentences, cancel, get_playback().generation,
+                                         tts_selector.choose()), daemon=True)
+    synthesizer.start()
+    start = time.perf_counter()
+    first_token = True
+    try:
+        with tracer.span("assistant.stream"), contextlib.closing(stream_question_memory(question)) as stream:
+            for delta in stream:
+                if cancel.is_set():
+                    break
+                if first_token:
+                    tracer.observe("assistant.first_token", time.perf_counter() - start)
+                    first_token = False
+                for sentence in splitter.feed(delta):
+                    sentences.put(sentence)
+            else:
+                for sentence in splitter.flush():
+                    sentences.put(sentence)
+    finally:
+        sentences.put(None)
+    if wait:
+        with tracer.span("tts.playback"):
+            synthesizer.join()
+            get_playback().wait()
+    return splitter.text
@@ -0,0 +1,586 @@
+# core/benchmark.py
+
+import io
+import os
+import sys
+import glob
+import json
+import time
+import random
+import shutil
+import argparse
+import platform
+import tempfile
+import contextlib
+import numpy as np
+from core.wake_word import read_wav
+from core.tracing import tracer
+from core.tts_cache import TTSCache
+from core.tts_backends import TTSBackend, TTSSelector
+from core.playback import PlaybackEngine
+
+# Replayed conversation for the synthetic fixtures: (speaker, transcript).
+SCRIPT = [
+    ("alice", "Jarvis, what's the weather like in Chicago?"),
+    ("bob", "Jarvis, pause the music."),
+    ("carol", "I think it might rain later."),
+    ("alice", "Jarvis, tell me a joke."),
+    ("bob", "Jarvis, skip this song."),
+    ("carol", "Jarvis, who sings this song?"),
+]
+
+# Canned assistant replies, picked by the first keyword found in the question.
+REPLIES = {
+    "weather": "It is sunny and 72 degrees in Chicago. Expect clouds in the evening.",
+    "joke": "Why do programmers prefer dark mode? Because light attracts bugs.",
+    "sings": "Let me check what is playing. #spotify",
+}
+DEFAULT_REPLY = "Sure. I can help with that."
+
+# Injected latencies in seconds (mean, jitter), scaled by --latency_scale.
+LATENCIES = {
+    'stt': (0.30, 0.05),
+    'assistant': (1.20, 0.30),
+    'first_token': (0.40, 0.10),
+    'token': (0.03, 0.01),
+    'tts': (0.40, 0.10),
+    'playback': (1.00, 0.20),
+    'spotify': (0.15, 0.05),
+}
+
+SAMPLE_RATE = 16000
+UTTERANCE_SECONDS = 1.5
+VOICES = {"alice": 210.0, "bob": 120.0, "carol": 165.0}
+
+class ReplayFinished(Exception):
+    pass
+
+class Latency:
+    # Deterministic delays: mean +/- jitter from a seeded generator, so every run
+    # injects the same sequence. `total` is what has been injected so far.
+    def __init__(self, mean, jitter=0.0, seed=0, scale=1.0):
+        self.mean = mean * scale
+        self.jitter = jitter * scale
+        self.random = random.Random(seed)
+        self.total = 0.0
+
+    def next(self):
+        return max(0.0, self.mean + self.random.uniform(-self.jitter, self.jitter))
+
+    def sleep(self):
+        delay = self.next()
+        self.total += delay
+        time.sleep(delay)
+        return delay
+
+def latencies(scale=1.0, seed=0):
+    return {name: Latency(mean, jitter, seed + i, scale) for i, (name, (mean, jitter)) in enumerate(sorted(LATENCIES.items()))}
+
+class ReplayRecorder:
+    # Stands in for RealtimeSTT's AudioToTextRecorder: each wait_audio() takes the
+    # next recorded utterance and transcribe() returns its transcript after the
+    # injected speech-to-text latency. Once the fixtures run out, wait_audio()
+    # waits for `until()` (e.g. the last turn to finish) and raises ReplayFinished.
+    # Each utterance waits for `ready()` first, like a person letting Jarvis
+    # finish talking before speaking again.
+    def __init__(self, utterances, stt_latency, until=None, timeout=60.0, ready=None):
+        self.utterances = list(utterances)
+        self.stt_latency = stt_latency
+        self.until = until
+        self.ready = ready
+        self.timeout = timeout
+        self.consumed = 0
+        self.audio = None
+        self.sample_rate = SAMPLE_RATE
+        self._text = ""
+
+    def _wait_for(self, condition):
+        deadline = time.monotonic() + self.timeout
+        while condition is not None and not condition() and time.monotonic() < deadline:
+            time.sleep(0.005)
+
+    def wait_audio(self):
+        if self.consumed >= len(self.utterances):
+            self._wait_for(self.until)
+            raise ReplayFinished()
+        self._wait_for(self.ready)
+        _, samples, sample_rate, text = self.utterances[self.consumed]
+        self.consumed += 1
+        self.audio = samples
+        self.sample_rate = sample_rate
+        self._text = text
+
+    def transcribe(self):
+        self.stt_latency.sleep()
+        return self._text
+
+    def text(self):
+        self.wait_audio()
+        return self.transcribe()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+class FakeAssistant:
+    # ask_question_memory()/stream_question_memory() with canned replies and
+    # injected latency instead of OpenAI's assistant API.
+    def __init__(self, reply_latency, first_token_latency, token_latency, replies=REPLIES):
+        self.reply_latency = reply_latency
+        self.first_token_latency = first_token_latency
+        self.token_latency = token_latency
+        self.replies = replies
+        self.questions = []
+
+    def reply(self, question):
+        self.questions.append(question)
+        lowered = question.lower()
+        return next((reply for word, reply in self.replies.items() if word in lowered), DEFAULT_REPLY)
+
+    def ask_question_memory(self, question):
+        self.reply_latency.sleep()
+        return self.reply(question)
+
+    def stream_question_memory(self, question):
+        words = self.reply(question).split(' ')
+        self.first_token_latency.sleep()
+        for i, word in enumerate(words):
+            if i:
+                self.token_latency.sleep()
+            yield word if i + 1 == len(words) else word + ' '
+
+class FakeTTSBackend(TTSBackend):
+    # Renders a few bytes of "audio" after the injected synthesis latency.
+    extension = '.mp3'
+
+    def __init__(self, name, latency):
+        self.name = name
+        self.model = 'fake'
+        self.voice = name
+        self.latency = latency
+        self.renders = 0
+
+    def render(self, text, path):
+        self.latency.sleep()
+        self.renders += 1
+        with open(path, 'wb') as file:
+            file.write(text.encode('utf-8'))
+
+class FakePlayer:
+    # pygame.mixer.music stand-in for PlaybackEngine; each clip "plays" for the
+    # injected playback latency.
+    def __init__(self, latency):
+        self.latency = latency
+        self.clips = 0
+        self._until = 0.0
+
+    def load(self, source, namehint=None):
+        pass
+
+    def play(self):
+        self.clips += 1
+        duration = self.latency.next()
+        self.latency.total += duration
+        self._until = time.monotonic() + duration
+
+    def get_busy(self):
+        return time.monotonic() < self._until
+
+    def stop(self):
+        self._until = 0.0
+
+    def unload(self):
+        pass
+
+class FakeSpotify:
+    # The functions tools.py calls on spot, with injected Web API latency.
+    def __init__(self, latency):
+        self.latency = latency
+        self.playing = True
+        self.calls = []
+
+    def _call(self, name):
+        self.latency.sleep()
+        self.calls.append(name)
+
+    def start_music(self):
+        self._call('start_music')
+        self.playing = True
+
+    def stop_music(self):
+        self._call('stop_music')
+        self.playing = False
+
+    def skip_to_next(self):
+        self._call('skip_to_next')
+
+    def skip_to_previous(self):
+        self._call('skip_to_previous')
+
+    def describe_current_track(self):
+        self._call('describe_current_track')
+        return "You are listening to Test Song by The Fixtures."
+
+@contextlib.contextmanager
+def patched(target, **attrs):
+    # Temporarily replaces attributes of a module or object.
+    saved = {name: getattr(target, name) for name in attrs}
+    for name, value in attrs.items():
+        setattr(target, name, value)
+    try:
+        yield target
+    finally:
+        for name, value in saved.items():
+            setattr(target, name, value)
+
+def synthetic_voice(speaker, text, seed=0):
+    # A vowel-like harmonic signal at the speaker's pitch, with syllable
+    # envelopes that depend on the transcript.
+    rng = np.random.default_rng([seed, sum(map(ord, speaker)), sum(map(ord, text))])
+    f0 = VOICES.get(speaker, 150.0)
+    t = np.arange(int(UTTERANCE_SECONDS * SAMPLE_RATE)) / SAMPLE_RATE
+    pitch = f0 * (1 + 0.03 * np.sin(2 * np.pi * rng.uniform(2, 5) * t))
+    phase = 2 * np.pi * np.cumsum(pitch) / SAMPLE_RATE
+    signal = sum(np.sin(k * phase) / k ** (1 + f0 / 300) for k in range(1, 8))
+    syllables = rng.uniform(3, 6)
+    envelope = np.clip(np.sin(np.pi * syllables * t) ** 2 + 0.1, 0, 1)
+    signal = signal * envelope
+    signal = 0.5 * signal / np.abs(signal).max() + rng.normal(0, 0.005, len(t))
+    return signal.astype(np.float32)
+
+def write_synthetic_fixtures(directory, script=SCRIPT, seed=0):
+    # WAV files named <nn>_<speaker>.wav with the transcript next to each as .txt.
+    import core.speech_recognition as sr_core
+    os.makedirs(directory, exist_ok=True)
+    for i, (speaker, text) in enumerate(script):
+        base = os.path.join(directory, f"{i:02d}_{speaker}")
+        sr_core.save_audio_to_wav(synthetic_voice(speaker, text, seed), base + '.wav', SAMPLE_RATE)
+        with open(base + '.txt', 'w') as file:
+            file.write(text)
+    return directory
+
+def load_fixtures(directory):
+    # [(speaker, samples, sample_rate, transcript)] in file name order; the speaker
+    # is the part of the name after the first "_".
+    utterances = []
+    for path in sorted(glob.glob(os.path.join(directory, '*.wav'))):
+        base = os.path.splitext(path)[0]
+        samples, sample_rate = read_wav(path)
+        with open(base + '.txt') as file:
+            text = file.read().strip()
+        utterances.append((os.path.basename(base).split('_', 1)[-1], samples, sample_rate, text))
+    return utterances
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+def _percentiles(seconds):
+    values = np.asarray(seconds) * 1000
+    return {'p50_ms': round(float(np.percentile(values, 50)), 3), 'p95_ms': round(float(np.percentile(values, 95)), 3)}
+
+def enroll_fixture_speakers(sr_core, utterances):
+    # Enrolls each speaker from their first utterance.
+    enrolled = set()
+    for speaker, samples, sample_rate, _ in utterances:
+        if speaker not in enrolled:
+            sr_core.enroll_speaker(speaker, samples, sample_rate)
+            enrolled.add(speaker)
+    return enrolled
+
+def bench_conversation(utterances, pipeline=False, latency_scale=1.0, seed=0):
+    # Replays the utterances through jarvis.main with every external service
+    # faked, and reports the traced per-stage latencies.
+    import jarvis
+    import assist
+    import tools
+    import core.speech_recognition as sr_core
+
+    work = tempfile.mkdtemp(prefix='jarvis-bench-')
+    injected = latencies(latency_scale, seed)
+    assistant = FakeAssistant(injected['assistant'], injected['first_token'], injected['token'])
+    remote, local = FakeTTSBackend('remote', injected['tts']), FakeTTSBackend('local', injected['tts'])
+    caches = {name: TTSCache(os.path.join(work, 'tts', name)) for name in ('remote', 'local')}
+    player = FakePlayer(injected['playback'])
+    spotify = FakeSpotify(injected['spotify'])
+
+    def turns_finished():
+        return tracer.summary().get('turn', {}).get('count', 0) >= recorder.consumed
+
+    def jarvis_done():
+        return turns_finished() and not assist.playback.is_playing()
+
+    recorder = ReplayRecorder(utterances, injected['stt'], until=turns_finished, ready=jarvis_done)
+    argv = ['jarvis.py', '--trace', os.path.join(work, 'trace.jsonl')] + (['--pipeline'] if pipeline else [])
+    tracer.reset()
+    try:
+        with contextlib.ExitStack() as stack:
+            stack.enter_context(patched(sys, argv=argv))
+            stack.enter_context(patched(jarvis, create_recorder=lambda args: recorder))
+            stack.enter_context(patched(
+                assist,
+                warm_up_clients=lambda: None,
+                playback=PlaybackEngine(player, poll_interval=0.005),
+                ask_question_memory=tracer.traced("assistant")(assistant.ask_question_memory),
+                stream_question_memory=assistant.stream_question_memory,
+                tts_selector=TTSSelector(remote, local),
+                tts_caches=caches,
+            ))
+            stack.enter_context(patched(tools, spot=spotify))
+            stack.enter_context(patched(sr_core, SPEAKER_PROFILES_FILE=os.path.join(work, 'speaker_profiles.json'),
+                                        _profile_store=None, _speaker_index=None, _speaker_index_key=None,
+                                        _embedder=None, _embedding_cache=None))
+            enroll_fixture_speakers(sr_core, utterances)
+            stack.enter_context(contextlib.redirect_stdout(io.StringIO()))
+            start = time.perf_counter()
+            try:
+                jarvis.main()
+            except ReplayFinished:
+                pass
+            tools.commands.wait(recorder.timeout)
+            assist.playback.wait(recorder.timeout)
+        wall = time.perf_counter() - start
+        summary = tracer.summary()
+    finally:
+        tracer.configure(enabled=False)
+        tracer.reset()
+        shutil.rmtree(work, ignore_errors=True)
+    spans = {name: {'p50_ms': _ms(values['p50']), 'p95_ms': _ms(values['p95']), 'p99_ms': _ms(values['p99']),
+                    'count': values['count']}
+             for name, values in sorted(summary.items())}
+    return {
+        'utterances': len(utterances),
+        'assistant_calls': len(assistant.questions),
+        'tts_renders': remote.renders + local.renders,
+        'clips_played': player.clips,
+        'spotify_calls': len(spotify.calls),
+        'wall_ms': _ms(wall),
+        'injected_ms': _ms(sum(latency.total for latency in injected.values())),
+        'spans': spans,
+    }
+
+def bench_speaker_recognition(utterances, profile_counts=(10, 100, 1000), repeats=5, seed=0):
+    # Recognition accuracy and cost with the fixture speakers hidden among
+    # synthetic profiles drawn around their features. Each speaker is enrolled
+    # from their first utterance and queried with the others.
+    import core.speech_recognition as sr_core
+
+    work = tempfile.mkdtemp(prefix='jarvis-bench-')
+    rng = np.random.default_rng(seed)
+    backend = sr_core.get_embedder().backend
+    enrolled, queries = {}, []
+    for speaker, samples, sample_rate, _ in utterances:
+        if speaker in enrolled:
+            queries.append((speaker, samples, sample_rate))
+        else:
+            enrolled[speaker] = backend.embed_batch([(samples, sample_rate)])[0]
+    extract_times = []
+    query_features = []
+    for speaker, samples, sample_rate in queries:
+        start = time.perf_counter()
+        query_features.append((speaker, backend.embed_batch([(samples, sample_rate)])[0]))
+        extract_times.append(time.perf_counter() - start)
+    start = time.perf_counter()
+    if queries:
+        backend.embed_batch([(samples, sample_rate) for _, samples, sample_rate in queries])
+    batch_time = (time.perf_counter() - start) / max(len(queries), 1)
+    real = np.array(list(enrolled.values()))
+    mean, spread = real.mean(axis=0), real.std(axis=0) + np.abs(real.mean(axis=0)) * 0.1 + 1e-6
+
+    results = {
+        'backend': backend.name,
+        'queries': len(queries),
+        'extract': _percentiles(extract_times) if extract_times else {},
+        'extract_batched_per_clip_ms': _ms(batch_time),
+    }
+    try:
+        with patched(sr_core, _profile_store=None, _speaker_index=None, _speaker_index_key=None,
+                     _embedder=None, _embedding_cache=None):
+            for count in profile_counts:
+                # A fresh embedding cache per size: the first recognize_speaker() of a
+                # clip embeds it, the second is served from the cache.
+                sr_core._embedder = sr_core._embedding_cache = None
+                profiles = dict(enrolled)
+                for i in range(max(0, count - len(enrolled))):
+                    profiles[f"synthetic_{i:05d}"] = mean + rng.normal(size=len(mean)) * spread
+                with patched(sr_core, SPEAKER_PROFILES_FILE=os.path.join(work, f'profiles_{count}.json')):
+                    sr_core.save_speaker_profiles(profiles)
+                    start = time.perf_counter()
+                    index = sr_core.get_speaker_index()
+                    load_time = time.perf_counter() - start
+                    query_times, correct, accepted = [], 0, 0
+                    min_confidence = sr_core.speaker_min_confidence(index) or 0.0
+                    for _ in range(repeats):
+                        for speaker, features in query_features:
+                            start = time.perf_counter()
+                            match = index.query(features, k=1)[0]
+                            query_times.append(time.perf_counter() - start)
+                            correct += match.name == speaker
+                            accepted += match.name == speaker and match.confidence >= min_confidence
+                    recognize_times, rescore_times = [], []
+                    for times in (recognize_times, rescore_times):
+                        for speaker, samples, sample_rate in queries:
+                            start = time.perf_counter()
+                            sr_core.recognize_speaker(samples, sample_rate)
+                            times.append(time.perf_counter() - start)
+                results[str(count)] = dict(
+                    profiles=len(profiles),
+                    index_load_ms=_ms(load_time),
+                    query=_percentiles(query_times) if query_times else {},
+                    recognize=_percentiles(recognize_times) if recognize_times else {},
+                    rescore_cached=_percentiles(rescore_times) if rescore_times else {},
+                    # Share of queries whose nearest profile is the right speaker, and
+                    # share that is also confident enough for recognize_speaker().
+                    accuracy=correct / len(query_times) if query_times else None,
+                    accepted_accuracy=accepted / len(query_times) if query_times else None,
+                )
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    return results
+
+def generate_source(lines, errors=0, seed=0):
+    # A deterministic Python module of at least `lines` lines, with `errors` broken
+    # statements spread through it.
+    rng = random.Random(seed)
+    body = []
+    i = 0
+    while len(body) < lines:
+        if i % 5 == 0:
+            body += [f"class Model{i}:", f"    limit = {rng.randint(1, 100)}", "",
+                     f"    def scale(self, value):", f"        return [value * k for k in range(self.limit)]", ""]
+        body += [f"def function_{i}(a, b={rng.randint(0, 9)}):",
+                 f"    '''Returns a mix of a and b.'''",
+                 f"    values = {{'a': a, 'b': b, 'n': {i}}}",
+                 f"    if a > b:",
+                 f"        return (a - b) * values['n']",
+                 f"    for k in range(b):",
+                 f"        a += k % 3",
+                 f"    return sum(values.values()) + a",
+                 ""]
+        i += 1
+    defs = [n for n, line in enumerate(body) if line.startswith('def ')]
+    for n in sorted(rng.sample(defs, min(errors, len(defs)))):
+        body[n] = body[n].rstrip(':')
+    return '\n'.join(body) + '\n'
+
+def bench_syntax_check(sizes=(1000, 10000, 50000), errors=(0, 10), repeats=3, seed=0):
+    import ast
+    from core.code_management import check_syntax_errors
+
+    results = {}
+    for lines in sizes:
+        for error_count in errors:
+            code = generate_source(lines, error_count, seed)
+            times = []
+            for _ in range(repeats):
+                start = time.perf_counter()
+                found = check_syntax_errors(code)
+                times.append(time.perf_counter() - start)
+            start = time.perf_counter()
+            try:
+                ast.parse(code)
+            except SyntaxError:
+                pass
+            parse_time = time.perf_counter() - start
+            results[f"{lines}_lines_{error_count}_errors"] = {
+                'lines': code.count('\n'),
+                'bytes': len(code),
+                'injected_errors': error_count,
+                'errors_found': len(found),
+                'best_ms': _ms(min(times)),
+                'ast_parse_ms': _ms(parse_time),
+            }
+    return results
+
+def run(fixtures=None, profile_counts=(10, 100, 1000), syntax_sizes=(1000, 10000, 50000),
+        latency_scale=1.0, only=None, seed=0):
+    # Runs the selected benchmarks (conversation, pipeline, speaker, syntax) and
+    # returns the machine-readable report.
+    only = set(only or ('conversation', 'pipeline', 'speaker', 'syntax'))
+    work = None
+    if fixtures is None and only & {'conversation', 'pipeline', 'speaker'}:
+        work = tempfile.mkdtemp(prefix='jarvis-fixtures-')
+        fixtures = write_synthetic_fixtures(work, seed=seed)
+    try:
+        utterances = load_fixtures(fixtures) if fixtures else []
+        results = {}
+        if 'conversation' in only:
+            results['conversation'] = bench_conversation(utterances, False, latency_scale, seed)
+        if 'pipeline' in only:
+            results['pipeline'] = bench_conversation(utterances, True, latency_scale, seed)
+        if 'speaker' in only:
+            results['speaker_recognition'] = bench_speaker_recognition(utterances, profile_counts, seed=seed)
+        if 'syntax' in only:
+            results['syntax_check'] = bench_syntax_check(syntax_sizes, seed=seed)
+    finally:
+        if work is not None:
+            shutil.rmtree(work, ignore_errors=True)
+    return {
+        'meta': {
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'fixtures': 'synthetic' if work is not None else fixtures,
+            'latency_scale': latency_scale,
+            'seed': seed,
+        },
+        'results': results,
+    }
+
+def flatten(results, prefix=''):
+    flat = {}
+    for key, value in results.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+def compare(baseline, report, tolerance=0.25, min_delta_ms=1.0):
+    # Regressions of `report` against `baseline`: any *_ms value that grew by more
+    # than `tolerance` (and `min_delta_ms`, to ignore timer noise) and any
+    # accuracy that dropped.
+    old, new = flatten(baseline['results']), flatten(report['results'])
+    regressions = []
+    for name, value in sorted(new.items()):
+        before = old.get(name)
+        if before is None:
+            continue
+        if name.endswith('_ms') and value > before * (1 + tolerance) and value - before > min_delta_ms:
+            regressions.append({'metric': name, 'baseline': before, 'value': value})
+        elif name.endswith('accuracy') and value < before:
+            regressions.append({'metric': name, 'baseline': before, 'value': value})
+    return regressions
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Offline Jarvis benchmarks with recorded audio and fake services.")
+    parser.add_argument("--fixtures", default=None,
+                        help="Directory of <n>_<speaker>.wav recordings with .txt transcripts (default: synthetic voices).")
+    parser.add_argument("--output", default=None, help="Write the JSON report to this file instead of stdout.")
+    parser.add_argument("--baseline", default=None, help="Earlier JSON report; exit with status 1 on regressions.")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown against --baseline (0.25 = 25%%).")
+    parser.add_argument("--latency_scale", type=float, default=1.0, help="Multiplier for the injected service latencies.")
+    parser.add_argument("--profiles", type=int, nargs='+', default=[10, 100, 1000], help="Speaker profile counts.")
+    parser.add_argument("--syntax_lines", type=int, nargs='+', default=[1000, 10000, 50000], help="Source file sizes.")
+    parser.add_argument("--only", nargs='+', choices=['conversation', 'pipeline', 'speaker', 'syntax'], default=None)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    report = run(args.fixtures, args.profiles, args.syntax_lines, args.latency_scale, args.only, args.seed)
+    if args.baseline:
+        with open(args.baseline) as file:
+            report['regressions'] = compare(json.load(file), report, args.tolerance)
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as file:
+            file.write(text + '\n')
+    else:
+        print(text)
+    for regression in report.get('regressions', []):
+        print(f"Regression: {regression['metric']} {regression['baseline']} -> {regression['value']}", file=sys.stderr)
+    return 1 if report.get('regressions') else 0
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -2,11 +2,21 @@
 
 import ast
 import os
+import re
+import json
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
 import assist
 
-def generate_code_from_description(description):
-    prompt = f"Generate Python code that {description}. Wrap the code in <code> tags."
-    response = assist.ask_question_memory(prompt)
+SYNTAX_CACHE_FILE = '.syntax_cache.json'
+SKIP_DIRS = {'__pycache__', 'venv', '.venv', 'env', 'node_modules', 'build', 'dist'}
+# Below this many files to parse, a process pool costs more than it saves.
+PARALLEL_THRESHOLD = 16
+CONTINUATIONS = ('else', 'elif', 'except', 'finally', ')', ']', '}', '#')
+STATEMENT_STARTS = ('def ', 'async def ', 'class ', '@', 'import ', 'from ')
+FILE_BLOCK = re.compile(r'<file name="([^"]+)">(.*?)</file>', re.DOTALL)
+
+def _extract_code(response):
     start_index = response.find('<code>') + len('<code>')
     end_index = response.find('</code>')
     code_content = response[start_index:end_index].strip()
@@ -15,6 +25,11 @@ def generate_code_from_description(description):
         code_content = code_content[3:-3].strip()
     return code_content
 
+def generate_code_from_description(description):
+    prompt = f"Generate Python code that {description}. Wrap the code in <code> tags."
+    response = assist.ask_question_memory(prompt, category="code")
+    return _extract_code(response)
+
 def update_code(description, filename):
     new_code = generate_code_from_description(description)
     with open(filename, 'w') as file:
@@ -30,32 +45,139 @@ def create_file(description, filename):
     else:
         return f"File {filename} already exists. Please choose a different name."
 
+def _scan_line(line, quote, depth):
+    # Returns the triple quote still open and the bracket depth at the end of
+    # `line`, given both at its start. Quotes and brackets inside single-line
+    # strings and comments don't count.
+    i = 0
+    while i < len(line):
+        char = line[i]
+        if quote is not None:
+            if char == '\\':
+                i += 2
+                continue
+            if line.startswith(quote, i):
+                quote = None
+                i += 3
+                continue
+        elif char == '#':
+            break
+        elif char in '"\'':
+            if line.startswith(char * 3, i):
+                quote = char * 3
+                i += 3
+                continue
+            i += 1
+            while i < len(line) and line[i] != char:
+                i += 2 if line[i] == '\\' else 1
+        elif char in '([{':
+            depth += 1
+        elif char in ')]}':
+            depth = max(depth - 1, 0)
+        i += 1
+    return quote, depth
+
+def _split_top_level(lines):
+    # Yields (start, end) line ranges of top-level statements, so a syntax error
+    # only forces re-parsing the statement it is in. Lines inside strings or
+    # brackets, continuation keywords and decorated definitions stay with the
+    # statement above them. An unclosed bracket is assumed to end at the next
+    # line that can only start a new statement.
+    start = 0
+    quote, depth = None, 0
+    decorated = False
+    for i, line in enumerate(lines):
+        opens_statement = line.startswith(STATEMENT_STARTS)
+        splittable = (quote is None and (depth == 0 or opens_statement)
+                      and line[:1].strip() and not line.startswith(CONTINUATIONS)
+                      and not (i and lines[i - 1].endswith('\\')))
+        if splittable:
+            depth = 0
+        quote, depth = _scan_line(line, quote, depth)
+        if i == 0:
+            decorated = line.startswith('@')
+        if not splittable or i == 0:
+            continue
+        if decorated and opens_statement:
+            decorated = line.startswith('@')
+            continue
+        yield start, i
+        start = i
+        decorated = line.startswith('@')
+    if start < len(lines):
+        yield start, len(lines)
+
+def _stub_line(line):
+    indent = line[:len(line) - len(line.lstrip())]
+    stripped = line.strip()
+    if stripped.startswith(('def ', 'async def ', 'class ')):
+        return indent + 'def _():'
+    if stripped.endswith(':'):
+        return indent + 'if True:'
+    return indent + 'pass'
+
+def _check_block(block, offset):
+    errors = []
+    reported = set()
+    patched = set()
+    while True:
+        try:
+            ast.parse('\n'.join(block))
+            return errors
+        except SyntaxError as e:
+            lineno = min(e.lineno or len(block), len(block))
+            if lineno not in reported:
+                reported.add(lineno)
+                errors.append(f"Line {lineno + offset}: {e.msg}")
+            while lineno > 0 and not block[lineno - 1].strip():
+                lineno -= 1
+            if lineno == 0:
+                return errors
+            # Stub out the offending line at its own indentation so the lines
+            # around it still parse; a line that still fails is dropped.
+            line = block[lineno - 1]
+            if lineno in patched:
+                block[lineno - 1] = ''
+            else:
+                patched.add(lineno)
+                block[lineno - 1] = _stub_line(line)
+
 def check_syntax_errors(code):
     errors = []
     try:
         ast.parse(code)
-    except SyntaxError as e:
+    except SyntaxError:
+        # Only the top-level blocks that fail on their own are re-parsed line by
+        # line, instead of re-parsing the whole file after every error.
         lines = code.split('\n')
-        while True:
+        for start, end in _split_top_level(lines):
+            block = lines[start:end]
             try:
-                ast.parse('\n'.join(lines))
-                break
-            except SyntaxError as e:
-                errors.append(f"Line {e.lineno}: {e.msg}")
-                lines.pop(e.lineno - 1)
+                ast.parse('\n'.join(block))
+            except SyntaxError:
+                errors.extend(_check_block(block, start))
     return errors
 
 def suggest_fixes_for_errors(errors, code):
     error_messages = "\n".join(errors)
     prompt = f"The following Python code has errors:\n\n{code}\n\nThe errors are:\n{error_messages}\n\nPlease provide a corrected version of the code. Wrap the code in <code> tags."
-    response = assist.ask_question_memory(prompt)
-    start_index = response.find('<code>') + len('<code>')
-    end_index = response.find('</code>')
-    fixed_code = response[start_index:end_index].strip()
+    response = assist.ask_question_memory(prompt, category="fix")
+    return _extract_code(response)
 
-    if fixed_code.startswith('```') and fixed_code.endswith('```'):
-        fixed_code = fixed_code[3:-3].strip()
-    return fixed_code
+def suggest_fixes_for_files(files):
+    # One request for every broken file: `files` maps filename -> (code, errors);
+    # returns filename -> fixed code for the files the reply covered.
+    sections = []
+    for filename, (code, errors) in files.items():
+        error_messages = "\n".join(errors)
+        sections.append(f'<file name="{filename}">\nErrors:\n{error_messages}\n<code>\n{code}\n</code>\n</file>')
+    prompt = ("The following Python files have syntax errors:\n\n" + "\n\n".join(sections) +
+              '\n\nPlease provide a corrected version of each file, each as <file name="..."><code>...</code></file>.')
+    response = assist.ask_question_memory(prompt, category="fix")
+    return {filename: _extract_code(body) for filename, body in FILE_BLOCK.findall(response) if filename in files}
+
+def _confirmed(answer):
+    return "yes" in answer or "yeah" in answer or "sure" in answer
 
 def check_and_fix_file(filename, recorder):
     with open(filename, 'r') as file:
@@ -64,9 +186,9 @@ def check_and_fix_file(filename, recorder):
     if errors:
         error_messages = "\n".join(errors)
         assist.TTS(f"Errors found in {filename}:\n{error_messages}")
-        assist.TTS("Do you want to fix these errors?")
+        assist.TTS("Do you want to fix these errors?", system=True)
         confirmation = recorder.text().strip().lower()
-        if "yes" in confirmation or "yeah" in confirmation or "sure" in confirmation:
+        if _confirmed(confirmation):
             fixed_code = suggest_fixes_for_errors(errors, code)
             with open(filename, 'w') as file:
                 file.write(fixed_code)
@@ -76,10 +198,94 @@ def check_and_fix_file(filename, recorder):
     else:
         return f"No errors found in {filename}."
 
-def check_and_fix_project(recorder):
+def find_python_files(root='.'):
+    for dirpath, dirnames, filenames in os.walk(root):
+        dirnames[:] = sorted(d for d in dirnames if not d.startswith('.') and d not in SKIP_DIRS)
+        for filename in sorted(filenames):
+            if filename.endswith('.py'):
+                yield os.path.join(dirpath, filename)
+
+def _load_syntax_cache(path):
+    if os.path.exists(path):
+        try:
+            with open(path, 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            pass
+    return {}
+
+def _save_syntax_cache(path, cache):
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as file:
+        json.dump(cache, file)
+    os.replace(tmp_path, path)
+
+def check_project(root='.', workers=None):
+    # Checks every .py file under `root` and returns
+    #   {'files': n, 'checked': n, 'cached': n, 'errors': {relative path: [errors]}}.
+    # Results are cached per file by mtime and size, falling back to the content
+    # hash, so unchanged files are neither re-read nor re-parsed.
+    cache_path = os.path.join(root, SYNTAX_CACHE_FILE)
+    cache = _load_syntax_cache(cache_path)
+    entries = {}
+    to_parse = []
+    report = {'files': 0, 'checked': 0, 'cached': 0, 'errors': {}}
+
+    for path in find_python_files(root):
+        name = os.path.relpath(path, root)
+        stat = os.stat(path)
+        entry = cache.get(name)
+        report['files'] += 1
+        if entry and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            entries[name] = entry
+            continue
+        with open(path, 'rb') as file:
+            data = file.read()
+        digest = hashlib.sha256(data).hexdigest()
+        if entry and entry['sha256'] == digest:
+            entries[name] = dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+            continue
+        entries[name] = {'mtime_ns': stat.st_mtime_ns, 'size': stat.st_size, 'sha256': digest, 'errors': []}
+        to_parse.append((name, data.decode('utf-8', errors='replace')))
+
+    codes = [code for _, code in to_parse]
+    if len(to_parse) >= PARALLEL_THRESHOLD:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(check_syntax_errors, codes, chunksize=8))
+    else:
+        results = [check_syntax_errors(code) for code in codes]
+    for (name, _), errors in zip(to_parse, results):
+        entries[name]['errors'] = errors
+
+    report['checked'] = len(to_parse)
+    report['cached'] = report['files'] - report['checked']
+    report['errors'] = {name: entry['errors'] for name, entry in entries.items() if entry['errors']}
+    _save_syntax_cache(cache_path, entries)
+    return report
+
+def check_and_fix_project(recorder, root='.'):
+    report = check_project(root)
+    if not report['errors']:
+        return f"No errors found in {report['files']} files."
+
+    summary = "\n".join(f"{name}: " + "; ".join(errors) for name, errors in report['errors'].items())
+    assist.TTS(f"Errors found in {len(report['errors'])} files:\n{summary}")
+    assist.TTS("Do you want to fix these errors?", system=True)
+    confirmation = recorder.text().strip().lower()
+    if not _confirmed(confirmation):
+        return "\n".join(f"Errors in {name} were not fixed." for name in report['errors'])
+
+    files = {}
+    for name, errors in report['errors'].items():
+        with open(os.path.join(root, name), 'r') as file:
+            files[name] = (file.read(), errors)
+    fixes = suggest_fixes_for_files(files)
     results = []
-    for filename in os.listdir():
-        if filename.endswith(".py"):
-            result = check_and_fix_file(filename, recorder)
-            results.append(result)
+    for name in report['errors']:
+        if name in fixes:
+            with open(os.path.join(root, name), 'w') as file:
+                file.write(fixes[name])
+            results.append(f"Errors in {name} have been fixed.")
+        else:
+            results.append(f"Errors in {name} could not be fixed.")
     return "\n".join(results)
@@ -0,0 +1,112 @@
+# core/commands.py
+
+import re
+import time
+import threading
+import contextvars
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor, TimeoutError, wait
+from core.tracing import tracer
+
+Command = namedtuple('Command', ['name', 'handler', 'words', 'takes_argument', 'blocking', 'timeout'])
+ParsedCommand = namedtuple('ParsedCommand', ['command', 'argument'])
+
+WORD = re.compile(r"[a-z]+")
+
+class CommandTable:
+    # Maps command strings such as "pause" or "search-red pandas" to exactly one
+    # registered handler. The part before the first "-" is split into words and the
+    # first word that names a command wins, so "display" never triggers "play";
+    # the rest of the string is the argument. Handlers run on a worker pool:
+    # dispatch() waits up to `timeout` seconds for blocking commands and returns
+    # the Future straight away for the others. Handlers are never cut short:
+    # for non-blocking commands `timeout` only counts slow runs in stats().
+    def __init__(self, max_workers=4, executor=None):
+        self.executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='command')
+        self.commands = {}
+        self.counters = {}
+        self._words = {}
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def register(self, name, handler, aliases=(), takes_argument=False, blocking=False, timeout=None):
+        words = (name,) + tuple(aliases)
+        command = Command(name, handler, words, takes_argument, blocking, timeout)
+        self.commands[name] = command
+        self.counters[name] = {'calls': 0, 'errors': 0, 'timeouts': 0, 'total_time': 0.0, 'max_time': 0.0}
+        for word in words:
+            self._words[word] = command
+        return command
+
+    def command(self, name, aliases=(), takes_argument=False, blocking=False, timeout=None):
+        def decorator(handler):
+            self.register(name, handler, aliases, takes_argument, blocking, timeout)
+            return handler
+        return decorator
+
+    def parse(self, text):
+        head, _, argument = text.partition('-')
+        for word in WORD.findall(head.lower()):
+            command = self._words.get(word)
+            if command is not None:
+                return ParsedCommand(command, argument.strip() if command.takes_argument else None)
+        return None
+
+    def _run(self, command, argument):
+        start = time.perf_counter()
+        ok = False
+        try:
+            with tracer.span(f"command.{command.name}"):
+                result = command.handler(argument) if command.takes_argument else command.handler()
+            ok = True
+            return result
+        finally:
+            elapsed = time.perf_counter() - start
+            with self._lock:
+                counters = self.counters[command.name]
+                counters['calls'] += 1
+                counters['total_time'] += elapsed
+                counters['max_time'] = max(counters['max_time'], elapsed)
+                if not ok:
+                    counters['errors'] += 1
+                if command.timeout is not None and elapsed > command.timeout:
+                    counters['timeouts'] += 1
+
+    def _report(self, name):
+        def callback(future):
+            with self._lock:
+                self._in_flight.discard(future)
+            if not future.cancelled() and future.exception() is not None:
+                print(f"Command {name} failed: {future.exception()}")
+        return callback
+
+    def dispatch(self, text):
+        # Returns the handler's Future, or None when `text` names no command.
+        parsed = self.parse(text)
+        if parsed is None:
+            return None
+        command = parsed.command
+        future = self.executor.submit(contextvars.copy_context().run, self._run, command, parsed.argument)
+        with self._lock:
+            self._in_flight.add(future)
+        future.add_done_callback(self._report(command.name))
+        if command.blocking:
+            try:
+                future.exception(command.timeout)
+            except TimeoutError:
+                print(f"Command {command.name} is still running after {command.timeout} s")
+        return future
+
+    def wait(self, timeout=None):
+        # Waits for every dispatched command to finish; returns whether they all did.
+        with self._lock:
+            futures = list(self._in_flight)
+        return not wait(futures, timeout).not_done
+
+    def stats(self):
+        with self._lock:
+            stats = {}
+            for name, counters in self.counters.items():
+                calls = counters['calls']
+                stats[name] = dict(counters, mean_time=counters['total_time'] / calls if calls else 0.0)
+            return stats
@@ -0,0 +1,159 @@
+# core/feature_stream.py
+
+import os
+import glob
+import wave
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+from core.startup import lazy_import
+
+aF = lazy_import('pyAudioAnalysis.MidTermFeatures')
+
+# Mid-term windows of MID_WINDOW seconds over short-term frames of
+# SHORT_WINDOW seconds every SHORT_STEP seconds.
+MID_WINDOW = 1.0
+SHORT_WINDOW = 0.050
+SHORT_STEP = 0.025
+# Seconds of audio read from a WAV file at a time.
+CHUNK_SECONDS = 30.0
+# A clip is padded (by repeating it) to at least this many short-term frames.
+MIN_FRAMES = 3
+# A trailing partial window shorter than this fraction of MID_WINDOW is dropped
+# rather than averaged in with a handful of frames.
+MIN_TAIL = 0.5
+# Below this many files, a process pool costs more than it saves.
+PARALLEL_THRESHOLD = 2
+
+_SAMPLE_FORMATS = {
+    1: (np.uint8, lambda x: (x.astype(np.float64) - 128.0) * 256.0),
+    2: (np.int16, lambda x: x.astype(np.float64)),
+    4: (np.int32, lambda x: x.astype(np.float64) / 65536.0),
+}
+
+def iter_wav_chunks(path, chunk_seconds=CHUNK_SECONDS):
+    # Yields (samples, sample_rate) for `chunk_seconds` of the file at a time,
+    # mono and in int16 scale, so a recording never has to fit in memory.
+    with wave.open(path, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        if wf.getsampwidth() not in _SAMPLE_FORMATS:
+            raise ValueError(f"{path}: unsupported sample width {wf.getsampwidth()}")
+        dtype, scale = _SAMPLE_FORMATS[wf.getsampwidth()]
+        frames = max(1, int(chunk_seconds * sample_rate))
+        while True:
+            data = wf.readframes(frames)
+            if not data:
+                break
+            samples = scale(np.frombuffer(data, dtype=dtype))
+            if channels > 1:
+                samples = samples.reshape(-1, channels).mean(axis=1)
+            yield samples, sample_rate
+
+class MidTermStats:
+    # Running mean of pyAudioAnalysis mid-term features (the mean and std of
+    # the short-term features in each MID_WINDOW) over audio fed in pieces.
+    # update() extracts the whole mid-term windows it has, together with the
+    # few samples their last short-term frame reaches into, and keeps the rest
+    # for later; finish() extracts what is left, including a partial last
+    # window. Windows count in proportion to their frames, and partial ones
+    # under MIN_TAIL of a window are dropped unless the clip has nothing else
+    # (it is then padded up to MIN_FRAMES frames if needed). pyAudioAnalysis
+    # level-normalizes each extraction, so finish(samples) with a whole clip
+    # gives exactly the features of a single extraction over it.
+    def __init__(self, sample_rate):
+        self.sample_rate = sample_rate
+        # Float window sizes, as pyAudioAnalysis derives its window ratios from them.
+        self.mid_window = MID_WINDOW * sample_rate
+        self.short_window = SHORT_WINDOW * sample_rate
+        self.short_step = SHORT_STEP * sample_rate
+        self.mid_frames = round((self.mid_window - (self.short_window - self.short_step)) / self.short_step)
+        self.mid_step_frames = int(round(self.mid_window / self.short_step))
+        self.overlap = int(self.short_window) - int(self.short_step)
+        self.min_samples = int(self.short_window) + (MIN_FRAMES - 1) * int(self.short_step)
+        self.windows = 0.0
+        self.samples = 0
+        self.mean = None
+        self._pending = np.zeros(0)
+
+    def _frames(self, n):
+        if n < int(self.short_window):
+            return 0
+        return (n - int(self.short_window)) // int(self.short_step) + 1
+
+    def _segment(self, x, keep_partial=False):
+        mt, _, _ = aF.mid_feature_extraction(x, self.sample_rate, self.mid_window, self.mid_window,
+                                             self.short_window, self.short_step)
+        frames = self._frames(len(x))
+        weights = [min(self.mid_frames, frames - start) / self.mid_frames
+                   for start in range(0, frames, self.mid_step_frames)]
+        kept = [(column, weight) for column, weight in zip(mt.T, weights) if weight >= MIN_TAIL]
+        if not kept and keep_partial:
+            kept = list(zip(mt.T, weights))
+        for column, weight in kept:
+            # Incremental weighted mean.
+            self.windows += weight
+            if self.mean is None:
+                self.mean = np.array(column, dtype=np.float64)
+            else:
+                self.mean += (column - self.mean) * (weight / self.windows)
+
+    def _append(self, samples):
+        x = np.asarray(samples, dtype=np.float64)
+        if x.ndim == 2:
+            x = x.mean(axis=1)
+        self.samples += len(x)
+        return np.concatenate([self._pending, x]) if len(self._pending) else x
+
+    def update(self, samples):
+        x = self._append(samples)
+        step = int(self.short_step) * self.mid_step_frames
+        whole = (len(x) - self.overlap) // step
+        if whole > 0:
+            end = whole * step
+            self._segment(x[:end + self.overlap])
+            x = x[end:]
+        self._pending = x
+
+    def finish(self, samples=()):
+        x = self._append(samples)
+        self._pending = np.zeros(0)
+        if self.mean is None:
+            if len(x) == 0:
+                raise ValueError("No audio to extract features from")
+            if len(x) < self.min_samples:
+                x = np.resize(x, self.min_samples)
+            self._segment(x, keep_partial=True)
+        elif len(x) >= self.min_samples:
+            self._segment(x)
+        return self.mean
+
+def stream_features(chunks):
+    # Feature vector for an iterable of (samples, sample_rate) chunks; the last
+    # chunk goes to finish(), so a single chunk is one extraction.
+    stats = None
+    last = None
+    for samples, sample_rate in chunks:
+        if stats is None:
+            stats = MidTermStats(sample_rate)
+        elif last is not None:
+            stats.update(last)
+        last = samples
+    if stats is None:
+        raise ValueError("No audio to extract features from")
+    return stats.finish(last)
+
+def extract_file_features(path, chunk_seconds=CHUNK_SECONDS):
+    return stream_features(iter_wav_chunks(path, chunk_seconds))
+
+def extract_many(paths, workers=None, chunk_seconds=CHUNK_SECONDS):
+    # extract_file_features() for every path, across a process pool when
+    # there are enough files; returns the vectors in the order of `paths`.
+    paths = list(paths)
+    chunk_sizes = [chunk_seconds] * len(paths)
+    if len(paths) >= PARALLEL_THRESHOLD and workers != 1:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(extract_file_features, paths, chunk_sizes))
+    return [extract_file_features(path, chunk_seconds) for path in paths]
+
+def find_recordings(directory):
+    return sorted(glob.glob(os.path.join(directory, '*.wav')))
@@ -0,0 +1,155 @@
+# core/image_search.py
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+INDEX_FILE = '.index.json'
+STAGING_PREFIX = '.crawl-'
+
+def google_crawler(root_dir, downloader_threads):
+    # icrawler is imported when the first search runs.
+    from icrawler.builtin import GoogleImageCrawler
+    return GoogleImageCrawler(downloader_threads=downloader_threads, storage={'root_dir': root_dir},
+                              log_level=logging.WARNING)
+
+class ImageSearch:
+    # Runs icrawler's GoogleImageCrawler, with `downloader_threads` parallel
+    # downloads, into a staging directory under `root`. The results are moved
+    # into `root` named by the hash of their content, so the same picture found
+    # by two queries is stored once. `.index.json` maps each query to its files;
+    # repeating a query is served from disk, and once the directory grows past
+    # `max_bytes` the least recently used queries are evicted.
+    # `crawler_factory(root_dir, downloader_threads)` returns an object with
+    # crawl(keyword=..., max_num=...).
+    def __init__(self, root='images', max_bytes=100 * 1024 * 1024, downloader_threads=4, max_num=1,
+                 crawler_factory=google_crawler):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.downloader_threads = downloader_threads
+        self.max_num = max_num
+        self.crawler_factory = crawler_factory
+        self.hits = 0
+        self.misses = 0
+        self._searches = ThreadPoolExecutor(max_workers=1, thread_name_prefix='image-search')
+        self._lock = threading.Lock()
+        self._index = self._load_index()
+
+    @staticmethod
+    def key(query):
+        return ' '.join(query.lower().split())
+
+    def _index_path(self):
+        return os.path.join(self.root, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), 'r') as file:
+                return json.load(file)
+        except (OSError, ValueError):
+            return {}
+
+    def _save_index(self):
+        os.makedirs(self.root, exist_ok=True)
+        tmp_path = self._index_path() + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(self._index, file)
+        os.replace(tmp_path, self._index_path())
+
+    def cached(self, query):
+        # Paths of a previous result for `query`, or None if any file is gone.
+        with self._lock:
+            entry = self._index.get(self.key(query))
+            if entry is None:
+                return None
+            paths = [os.path.join(self.root, name) for name in entry['files']]
+            if not all(os.path.exists(path) for path in paths):
+                return None
+            entry['used'] = time.time()
+            self._save_index()
+            return paths
+
+    def _store(self, path):
+        # Moves a crawled file into `root` under the hash of its content.
+        with open(path, 'rb') as file:
+            digest = hashlib.sha256(file.read()).hexdigest()[:32]
+        name = digest + os.path.splitext(path)[1].lower()
+        target = os.path.join(self.root, name)
+        if os.path.exists(target):
+            os.remove(path)
+        else:
+            os.replace(path, target)
+        return name
+
+    def search(self, query, max_num=None):
+        # Returns the paths of up to `max_num` images for `query`.
+        max_num = max_num or self.max_num
+        paths = self.cached(query)
+        if paths is not None and len(paths) >= max_num:
+            self.hits += 1
+            return paths[:max_num]
+        self.misses += 1
+        os.makedirs(self.root, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=STAGING_PREFIX, dir=self.root)
+        try:
+            self.crawler_factory(staging, self.downloader_threads).crawl(keyword=query, max_num=max_num)
+            names = []
+            # icrawler numbers its files in the order of the results.
+            for filename in sorted(os.listdir(staging)):
+                name = self._store(os.path.join(staging, filename))
+                if name not in names:
+                    names.append(name)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        names = names[:max_num]
+        with self._lock:
+            self._index[self.key(query)] = {'files': names, 'used': time.time()}
+            self._evict(keep=self.key(query))
+            self._save_index()
+        return [os.path.join(self.root, name) for name in names]
+
+    def search_async(self, query, max_num=None):
+        return self._searches.submit(self.search, query, max_num)
+
+    def size(self):
+        total = 0
+        if os.path.isdir(self.root):
+            for name in os.listdir(self.root):
+                path = os.path.join(self.root, name)
+                if name != INDEX_FILE and os.path.isfile(path):
+                    total += os.path.getsize(path)
+        return total
+
+    def _evict(self, keep=None):
+        # Drops the least recently used queries (other than `keep`) until the images
+        # fit in `max_bytes`; a file is deleted once no remaining query uses it.
+        sizes = {}
+        for entry in self._index.values():
+            for name in entry['files']:
+                path = os.path.join(self.root, name)
+                if name not in sizes and os.path.exists(path):
+                    sizes[name] = os.path.getsize(path)
+        total = sum(sizes.values())
+        for query, entry in sorted(self._index.items(), key=lambda item: item[1]['used']):
+            if total <= self.max_bytes:
+                break
+            if query == keep:
+                continue
+            del self._index[query]
+            in_use = {name for other in self._index.values() for name in other['files']}
+            for name in entry['files']:
+                if name in sizes and name not in in_use:
+                    try:
+                        os.remove(os.path.join(self.root, name))
+                    except OSError:
+                        continue
+                    total -= sizes.pop(name)
+
+    def close(self):
+        self._searches.shutdown(wait=True)
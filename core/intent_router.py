@@ -0,0 +1,66 @@
+# core/intent_router.py
+
+import re
+import json
+import time
+from collections import namedtuple, deque, Counter
+
+Route = namedtuple('Route', ['intent', 'handler', 'confidence', 'source', 'match'])
+
+class IntentRouter:
+    # Maps utterances to local handlers before anything goes to the assistant.
+    # Patterns are tried in the order they were added; if none matches, the
+    # optional `classifier(text) -> (intent, confidence)` gets a go. Anything
+    # below `min_confidence` is left for the remote assistant (route() returns None).
+    def __init__(self, classifier=None, min_confidence=0.6, log_file=None, history=500):
+        self.classifier = classifier
+        self.min_confidence = min_confidence
+        self.log_file = log_file
+        self.decisions = deque(maxlen=history)
+        self.counts = Counter()
+        self._patterns = []
+        self._handlers = {}
+
+    def add(self, intent, pattern, handler=None, confidence=1.0):
+        self._patterns.append((intent, re.compile(pattern, re.IGNORECASE), confidence))
+        if handler is not None:
+            self._handlers[intent] = handler
+        return self
+
+    def set_handler(self, intent, handler):
+        self._handlers[intent] = handler
+
+    def route(self, text):
+        start = time.perf_counter()
+        route = None
+        for intent, pattern, confidence in self._patterns:
+            match = pattern.search(text)
+            if match:
+                route = Route(intent, self._handlers.get(intent), confidence, 'pattern', match)
+                break
+        if route is None and self.classifier is not None:
+            intent, confidence = self.classifier(text)
+            if intent is not None:
+                route = Route(intent, self._handlers.get(intent), confidence, 'classifier', None)
+        if route is None:
+            self._record(text, None, 0.0, 'none', False, start)
+            return None
+        local = route.handler is not None and route.confidence >= self.min_confidence
+        self._record(text, route.intent, route.confidence, route.source, local, start)
+        return route if local else None
+
+    def _record(self, text, intent, confidence, source, local, start):
+        decision = {
+            'time': time.time(),
+            'text': text,
+            'intent': intent,
+            'confidence': confidence,
+            'source': source,
+            'local': local,
+            'elapsed_us': (time.perf_counter() - start) * 1e6,
+        }
+        self.decisions.append(decision)
+        self.counts['local' if local else 'remote'] += 1
+        if self.log_file:
+            with open(self.log_file, 'a') as file:
+                file.write(json.dumps(decision) + '\n')
@@ -0,0 +1,186 @@
+# core/memory_store.py
+
+import os
+import json
+import threading
+
+_DELETED = object()
+
+class MemoryStore:
+    # Key/value memory kept in RAM behind a lock. Writes only mark keys dirty;
+    # a timer flushes them `flush_interval` seconds after the first change, and
+    # close() flushes whatever is left. The snapshot is always replaced with an
+    # atomic rename. In journal mode a flush appends just the changed keys to
+    # `<path>.journal` and the snapshot is rewritten only once the journal has
+    # grown past `compact_bytes` and the size of the snapshot.
+    def __init__(self, path, flush_interval=1.0, journal=False, compact_bytes=64 * 1024):
+        self.path = path
+        self.journal_path = path + '.journal'
+        self.flush_interval = flush_interval
+        self.journal = journal
+        self.compact_bytes = compact_bytes
+        self.flushes = 0
+        self._lock = threading.RLock()
+        self._flush_lock = threading.Lock()
+        self._data = {}
+        self._dirty = {}
+        self._timer = None
+        self._stamp = None
+        self._compact_next = False
+        self._load()
+
+    def _file_stamp(self):
+        stamp = []
+        for path in (self.path, self.journal_path):
+            try:
+                stat = os.stat(path)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def _load(self):
+        data = {}
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as file:
+                data = json.load(file)
+        if os.path.exists(self.journal_path):
+            good = 0
+            with open(self.journal_path, 'rb') as file:
+                for line in file:
+                    try:
+                        entry = json.loads(line)
+                    except ValueError:
+                        break
+                    if not line.endswith(b'\n'):
+                        break
+                    if len(entry) == 2:
+                        data[entry[0]] = entry[1]
+                    else:
+                        data.pop(entry[0], None)
+                    good += len(line)
+            if good < os.path.getsize(self.journal_path):
+                # Torn write at the end of the journal; drop it so later appends start on a clean line.
+                os.truncate(self.journal_path, good)
+        self._data = data
+        self._stamp = self._file_stamp()
+
+    def _refresh(self):
+        # Picks up edits made to the files by someone else since our last load or
+        # flush; pending changes are laid back on top.
+        if self._file_stamp() == self._stamp:
+            return
+        self._load()
+        for key, value in self._dirty.items():
+            if value is _DELETED:
+                self._data.pop(key, None)
+            else:
+                self._data[key] = value
+
+    def get(self, key, default=None):
+        with self._lock:
+            self._refresh()
+            return self._data.get(key, default)
+
+    def snapshot(self):
+        with self._lock:
+            self._refresh()
+            return dict(self._data)
+
+    def set(self, key, value):
+        self.update({key: value})
+
+    def update(self, values):
+        with self._lock:
+            self._refresh()
+            self._data.update(values)
+            self._dirty.update(values)
+            self._schedule()
+
+    def delete(self, key):
+        with self._lock:
+            self._refresh()
+            if key in self._data:
+                del self._data[key]
+                self._dirty[key] = _DELETED
+                self._schedule()
+
+    def replace(self, data):
+        # Swaps in a whole new mapping; the next flush rewrites the snapshot.
+        with self._lock:
+            self._refresh()
+            for key in self._data:
+                if key not in data:
+                    self._dirty[key] = _DELETED
+            self._data = dict(data)
+            self._dirty.update(data)
+            self._compact_next = True
+            self._schedule()
+
+    def _schedule(self):
+        if self._timer is None and self.flush_interval is not None:
+            self._timer = threading.Timer(self.flush_interval, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self):
+        with self._flush_lock:
+            with self._lock:
+                if self._timer is not None:
+                    self._timer.cancel()
+                    self._timer = None
+                if not self._dirty:
+                    return False
+                dirty, self._dirty = self._dirty, {}
+                compact = not self.journal or self._compact_next or self._journal_too_big()
+                self._compact_next = False
+                data = dict(self._data)
+            try:
+                if self.journal:
+                    self._append_journal(dirty)
+                if compact:
+                    self._write_snapshot(data)
+            except Exception:
+                with self._lock:
+                    # Keep the changes for the next attempt unless they were overwritten since.
+                    for key, value in dirty.items():
+                        self._dirty.setdefault(key, value)
+                    self._schedule()
+                raise
+            with self._lock:
+                self._stamp = self._file_stamp()
+                self.flushes += 1
+            return True
+
+    def _journal_too_big(self):
+        try:
+            journal_size = os.path.getsize(self.journal_path)
+        except FileNotFoundError:
+            return False
+        snapshot_size = os.path.getsize(self.path) if os.path.exists(self.path) else 0
+        return journal_size > max(self.compact_bytes, snapshot_size)
+
+    def _write_snapshot(self, data):
+        tmp_path = self.path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(data, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.path)
+        # The journal already ends with this state, so replaying it over the new
+        # snapshot after a crash right here changes nothing; it can go.
+        if os.path.exists(self.journal_path):
+            os.remove(self.journal_path)
+
+    def _append_journal(self, dirty):
+        lines = []
+        for key, value in dirty.items():
+            entry = [key] if value is _DELETED else [key, value]
+            lines.append(json.dumps(entry) + '\n')
+        with open(self.journal_path, 'a') as file:
+            file.write(''.join(lines))
+            file.flush()
+            os.fsync(file.fileno())
+
+    def close(self):
+        self.flush()
@@ -0,0 +1,75 @@
+# core/pipeline.py
+
+import asyncio
+import functools
+import contextvars
+from core.tracing import tracer
+
+_STOP = object()
+
+class Pipeline:
+    # Chain of async stages joined by bounded queues. Each handler takes an item
+    # and returns the item for the next stage, or None to drop it. A full queue
+    # makes the stage before it wait, so a slow stage can't pile up work.
+    def __init__(self, maxsize=2, executor=None):
+        self.maxsize = maxsize
+        self.executor = executor
+        self.stages = []
+        self.stats = {}
+
+    def add_stage(self, name, handler, workers=1):
+        self.stages.append((name, handler, workers))
+        self.stats[name] = {'processed': 0, 'dropped': 0, 'errors': 0}
+        return self
+
+    async def run_blocking(self, fn, *args, **kwargs):
+        # Runs a blocking SDK call in the executor without stalling the other stages.
+        # The call sees the caller's context, so its spans land in the current turn.
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        return await loop.run_in_executor(self.executor, functools.partial(context.run, fn, *args, **kwargs))
+
+    async def run(self, source):
+        # Feeds items from the async iterable `source` through every stage and
+        # returns once the source is exhausted and all queues have drained.
+        queues = [asyncio.Queue(self.maxsize) for _ in self.stages]
+
+        async def feed():
+            async for item in source:
+                await queues[0].put(item)
+            for _ in range(self.stages[0][2]):
+                await queues[0].put(_STOP)
+
+        async def work(index, name, handler):
+            stats = self.stats[name]
+            out_queue = queues[index + 1] if index + 1 < len(queues) else None
+            while (item := await queues[index].get()) is not _STOP:
+                # Items with a `trace` attribute get a span per stage; the trace is
+                # finished when the item leaves the pipeline.
+                trace = getattr(item, 'trace', None)
+                try:
+                    with tracer.activate(trace), tracer.span(f"stage.{name}"):
+                        result = await handler(item)
+                except Exception as e:
+                    stats['errors'] += 1
+                    print(f"Pipeline stage {name} failed: {e}")
+                    tracer.finish(trace)
+                    continue
+                stats['processed'] += 1
+                if result is None:
+                    stats['dropped'] += 1
+                    tracer.finish(trace)
+                elif out_queue is not None:
+                    await out_queue.put(result)
+                else:
+                    tracer.finish(trace)
+
+        async def run_stage(index):
+            name, handler, workers = self.stages[index]
+            await asyncio.gather(*(work(index, name, handler) for _ in range(workers)))
+            if index + 1 < len(self.stages):
+                for _ in range(self.stages[index + 1][2]):
+                    await queues[index + 1].put(_STOP)
+
+        await asyncio.gather(feed(), *(run_stage(index) for index in range(len(self.stages))))
+        return self.stats
@@ -0,0 +1,104 @@
+# core/playback.py
+
+import io
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+class PlaybackEngine:
+    # Plays clips one after another on a background thread. `player` follows the
+    # pygame.mixer.music interface: load(source[, namehint]), play(), get_busy(),
+    # stop() and unload(). Each play() returns a Future that resolves to True when
+    # the clip finished and False when it was interrupted by stop().
+    def __init__(self, player, poll_interval=0.02, namehint='mp3'):
+        self.player = player
+        self.poll_interval = poll_interval
+        self.namehint = namehint
+        self._queue = queue.Queue()
+        # Bumped by stop(); clips queued under an older generation are skipped.
+        self._generation = 0
+        self._idle = threading.Event()
+        self._idle.set()
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._thread = None
+        # time.monotonic() at which the last clip stopped playing.
+        self.last_played = None
+
+    def _ensure_thread(self):
+        if self._thread is None or not self._thread.is_alive():
+            self._thread = threading.Thread(target=self._run, daemon=True)
+            self._thread.start()
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def play(self, source, namehint=None, generation=None):
+        # `source` is a file path or the encoded audio bytes; `namehint` overrides
+        # the default format hint for bytes. A clip tagged with a `generation`
+        # older than the current one (a stop() came in between) is cancelled.
+        future = Future()
+        with self._lock:
+            self._pending += 1
+            self._idle.clear()
+            self._ensure_thread()
+            self._queue.put((source, namehint or self.namehint, future,
+                             self._generation if generation is None else generation))
+        return future
+
+    def stop(self):
+        # Drops everything queued and interrupts the clip that is playing.
+        with self._lock:
+            self._generation += 1
+        while True:
+            try:
+                _, _, future, _ = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+            self._done()
+
+    def is_playing(self):
+        return not self._idle.is_set()
+
+    def played_since(self, since):
+        # Whether anything was playing at some point after time.monotonic() `since`.
+        return self.is_playing() or (self.last_played is not None and self.last_played >= since)
+
+    def wait(self, timeout=None):
+        return self._idle.wait(timeout)
+
+    def _done(self):
+        with self._lock:
+            self._pending -= 1
+            if self._pending == 0:
+                self._idle.set()
+
+    def _run(self):
+        while True:
+            source, namehint, future, generation = self._queue.get()
+            if generation != self._generation:
+                future.cancel()
+            if not future.set_running_or_notify_cancel():
+                self._done()
+                continue
+            try:
+                if isinstance(source, (bytes, bytearray)):
+                    self.player.load(io.BytesIO(source), namehint)
+                else:
+                    self.player.load(source)
+                self.player.play()
+                while self.player.get_busy() and generation == self._generation:
+                    time.sleep(self.poll_interval)
+                interrupted = generation != self._generation
+                if interrupted:
+                    self.player.stop()
+                self.player.unload()
+                future.set_result(not interrupted)
+            except Exception as e:
+                future.set_exception(e)
+            finally:
+                self.last_played = time.monotonic()
+                self._done()
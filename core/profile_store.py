@@ -0,0 +1,196 @@
+# core/profile_store.py
+
+import os
+import json
+import numpy as np
+
+FORMAT_VERSION = 1
+DTYPE = np.float32
+
+class ProfileStore:
+    # On-disk layout, all next to `base_path`:
+    #   <base>.meta.json      format version, feature width and current generation
+    #   <base>.<gen>.f32      fixed-width float32 rows, one per enrollment sample
+    #   <base>.<gen>.names    one JSON-encoded name per line, row i <-> line i
+    # Appends write the row before the name, so a torn append is dropped on the
+    # next open. Full rewrites go to a new generation and only become visible
+    # when the meta file is atomically replaced.
+    def __init__(self, base_path):
+        self.base_path = base_path
+        self.meta_path = base_path + '.meta.json'
+        self._meta = None
+        self._count = None
+        self._names_size = None
+
+    def exists(self):
+        return os.path.exists(self.meta_path)
+
+    def _read_meta(self):
+        if self._meta is None:
+            with open(self.meta_path, 'r') as file:
+                meta = json.load(file)
+            if meta.get('version') != FORMAT_VERSION:
+                raise ValueError(f"Unsupported profile store version: {meta.get('version')}")
+            self._meta = meta
+        return self._meta
+
+    def _write_meta(self, meta):
+        tmp_path = self.meta_path + '.tmp'
+        with open(tmp_path, 'w') as file:
+            json.dump(meta, file)
+            file.flush()
+            os.fsync(file.fileno())
+        os.replace(tmp_path, self.meta_path)
+        self._meta = meta
+
+    def _paths(self, generation):
+        prefix = f"{self.base_path}.{generation}"
+        return prefix + '.f32', prefix + '.names'
+
+    @property
+    def dim(self):
+        return self._read_meta()['dim'] if self.exists() else None
+
+    def version_key(self):
+        # Changes whenever the store is rewritten or appended to.
+        if not self.exists():
+            return None
+        meta_stat = os.stat(self.meta_path)
+        with open(self.meta_path, 'r') as file:
+            generation = json.load(file)['generation']
+        names_path = self._paths(generation)[1]
+        try:
+            names_size = os.path.getsize(names_path)
+        except OSError:
+            names_size = 0
+        return (meta_stat.st_mtime_ns, meta_stat.st_size, names_size)
+
+    def _read_meta_fresh(self):
+        self._meta = None
+        self._count = None
+        return self._read_meta()
+
+    def _read_names(self, names_path):
+        if not os.path.exists(names_path):
+            return []
+        with open(names_path, 'rb') as file:
+            data = file.read()
+        # Anything after the last newline is a torn append.
+        return data.split(b'\n')[:-1]
+
+    def load(self):
+        # Returns (names, matrix); the matrix is a copy-on-write memmap of the
+        # data file, so nothing is parsed or copied until a row is modified.
+        if not self.exists():
+            return [], np.zeros((0, 0), dtype=DTYPE)
+        meta = self._read_meta_fresh()
+        dim = meta['dim']
+        data_path, names_path = self._paths(meta['generation'])
+        lines = self._read_names(names_path)
+        row_bytes = dim * np.dtype(DTYPE).itemsize
+        rows = os.path.getsize(data_path) // row_bytes if os.path.exists(data_path) else 0
+        count = min(len(lines), rows)
+        self._count = count
+        self._names_size = sum(len(line) + 1 for line in lines[:count])
+        if count == 0:
+            return [], np.zeros((0, dim), dtype=DTYPE)
+        names = [json.loads(line) for line in lines[:count]]
+        matrix = np.memmap(data_path, dtype=DTYPE, mode='c', shape=(count, dim))
+        return names, matrix
+
+    def load_profiles(self):
+        # {name: centroid}; a name enrolled several times has one row per sample.
+        names, matrix = self.load()
+        rows = {}
+        for row, name in enumerate(names):
+            rows.setdefault(name, []).append(row)
+        return {name: np.asarray(matrix[indices], dtype=np.float64).mean(axis=0).tolist()
+                for name, indices in rows.items()}
+
+    def write_all(self, profiles):
+        names = list(profiles.keys())
+        if names:
+            matrix = np.asarray([profiles[name] for name in names], dtype=DTYPE)
+        else:
+            matrix = np.zeros((0, self.dim or 0), dtype=DTYPE)
+        self._write(names, matrix)
+
+    def _write(self, names, matrix):
+        dim = matrix.shape[1]
+        old_generation = self._read_meta_fresh()['generation'] if self.exists() else None
+        generation = 0 if old_generation is None else old_generation + 1
+        data_path, names_path = self._paths(generation)
+        with open(data_path, 'wb') as file:
+            file.write(np.ascontiguousarray(matrix).tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        names_data = b''.join(json.dumps(name).encode('utf-8') + b'\n' for name in names)
+        with open(names_path, 'wb') as file:
+            file.write(names_data)
+            file.flush()
+            os.fsync(file.fileno())
+
+        self._write_meta({'version': FORMAT_VERSION, 'dim': dim, 'generation': generation})
+        self._count = len(names)
+        self._names_size = len(names_data)
+        if old_generation is not None:
+            for path in self._paths(old_generation):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def append(self, name, features):
+        features = np.asarray(features, dtype=DTYPE).ravel()
+        if not self.exists() or self.dim == 0:
+            self.write_all({name: features})
+            return
+        meta = self._read_meta()
+        if features.shape[0] != meta['dim']:
+            raise ValueError(f"Expected {meta['dim']} features, got {features.shape[0]}")
+        if self._count is None:
+            self.load()
+
+        data_path, names_path = self._paths(meta['generation'])
+        row_bytes = meta['dim'] * np.dtype(DTYPE).itemsize
+        # Drop any partial row or name left behind by an interrupted append.
+        with open(data_path, 'r+b') as file:
+            file.truncate(self._count * row_bytes)
+            file.seek(0, os.SEEK_END)
+            file.write(features.tobytes())
+            file.flush()
+            os.fsync(file.fileno())
+        line = json.dumps(name).encode('utf-8') + b'\n'
+        with open(names_path, 'r+b') as file:
+            file.truncate(self._names_size)
+            file.seek(0, os.SEEK_END)
+            file.write(line)
+            file.flush()
+            os.fsync(file.fileno())
+        self._count += 1
+        self._names_size += len(line)
+
+    def compact(self):
+        # Rewrites every sample into a new generation, dropping torn appends.
+        if not self.exists():
+            return
+        names, matrix = self.load()
+        self._write(names, np.array(matrix, dtype=DTYPE).reshape(len(names), self.dim))
+
+    def remove(self):
+        if not self.exists():
+            return
+        generation = self._read_meta_fresh()['generation']
+        for path in self._paths(generation) + (self.meta_path,):
+            if os.path.exists(path):
+                os.remove(path)
+        self._meta = None
+        self._count = None
+        self._names_size = None
+
+def migrate_json_profiles(json_path, store):
+    # One-time import of the legacy speaker_profiles.json text format.
+    if store.exists() or not os.path.exists(json_path):
+        return False
+    with open(json_path, 'r') as file:
+        profiles = json.load(file)
+    store.write_all(profiles)
+    return True
@@ -0,0 +1,137 @@
+# core/response_cache.py
+
+import re
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from core.memory_store import MemoryStore
+
+# Seconds a reply stays fresh per category; None never expires.
+DEFAULT_TTLS = {
+    'code': 7 * 24 * 3600,
+    'fix': 24 * 3600,
+}
+DEFAULT_TTL = 3600
+
+_BLANK_LINES = re.compile(r'\n{3,}')
+
+def normalize_prompt(prompt):
+    # Line endings, trailing spaces and extra blank lines never matter.
+    # Indentation is kept, since code prompts depend on it.
+    lines = [line.rstrip() for line in prompt.replace('\r\n', '\n').replace('\r', '\n').split('\n')]
+    return _BLANK_LINES.sub('\n\n', '\n'.join(lines)).strip()
+
+class ResponseCache:
+    # Assistant replies by (category, normalized prompt): an LRU of
+    # `max_entries` in memory, persisted through a journaled MemoryStore at
+    # `path` so it starts warm. Entries expire after their category's TTL.
+    # `namespace` (the assistant id) is part of every key, so switching
+    # assistants never serves another one's replies.
+    def __init__(self, path=None, max_entries=512, ttls=None, default_ttl=DEFAULT_TTL, namespace='',
+                 flush_interval=1.0, clock=time.time):
+        self.max_entries = max_entries
+        self.ttls = dict(DEFAULT_TTLS if ttls is None else ttls)
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+        self.clock = clock
+        self.counters = {}
+        self._lock = threading.Lock()
+        self._entries = OrderedDict()
+        self._store = MemoryStore(path, flush_interval, journal=True) if path else None
+        if self._store is not None:
+            # Oldest first, so the LRU order survives a restart approximately.
+            saved = sorted(self._store.snapshot().items(), key=lambda item: item[1][1])
+            for key, entry in saved:
+                self._entries[key] = tuple(entry)
+            with self._lock:
+                self._trim()
+
+    def ttl(self, category):
+        return self.ttls.get(category, self.default_ttl)
+
+    def key(self, category, prompt):
+        text = normalize_prompt(prompt)
+        return hashlib.sha256(f"{self.namespace}\0{category}\0{text}".encode('utf-8')).hexdigest()
+
+    def _count(self, category, name):
+        counters = self.counters.setdefault(category, {'hits': 0, 'misses': 0, 'expired': 0, 'evictions': 0})
+        counters[name] += 1
+
+    def _expired(self, category, created):
+        ttl = self.ttl(category)
+        return ttl is not None and self.clock() - created > ttl
+
+    def _drop(self, key):
+        del self._entries[key]
+        if self._store is not None:
+            self._store.delete(key)
+
+    def _trim(self):
+        while len(self._entries) > self.max_entries:
+            key, (category, _, _) = next(iter(self._entries.items()))
+            self._drop(key)
+            self._count(category, 'evictions')
+
+    def get(self, category, prompt):
+        key = self.key(category, prompt)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and self._expired(category, entry[1]):
+                self._drop(key)
+                self._count(category, 'expired')
+                entry = None
+            if entry is None:
+                self._count(category, 'misses')
+                return None
+            self._entries.move_to_end(key)
+            self._count(category, 'hits')
+            return entry[2]
+
+    def put(self, category, prompt, response):
+        key = self.key(category, prompt)
+        entry = (category, self.clock(), response)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            if self._store is not None:
+                self._store.set(key, list(entry))
+            self._trim()
+
+    def get_or_compute(self, category, prompt, compute, cacheable=None):
+        # Returns the cached reply or computes and stores one; replies rejected
+        # by `cacheable` (errors, say) are returned but not kept.
+        response = self.get(category, prompt)
+        if response is None:
+            response = compute()
+            if cacheable is None or cacheable(response):
+                self.put(category, prompt, response)
+        return response
+
+    def invalidate(self, category=None):
+        with self._lock:
+            keys = [key for key, entry in self._entries.items() if category is None or entry[0] == category]
+            for key in keys:
+                self._drop(key)
+        return len(keys)
+
+    def stats(self):
+        with self._lock:
+            categories = {category: dict(counters) for category, counters in self.counters.items()}
+            entries = len(self._entries)
+        hits = sum(counters['hits'] for counters in categories.values())
+        misses = sum(counters['misses'] for counters in categories.values())
+        return {
+            'entries': entries,
+            'hits': hits,
+            'misses': misses,
+            'hit_rate': hits / (hits + misses) if hits + misses else 0.0,
+            'categories': categories,
+        }
+
+    def flush(self):
+        if self._store is not None:
+            self._store.flush()
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,81 @@
+# core/run_polling.py
+
+import time
+
+TERMINAL_STATUSES = {'completed', 'failed', 'cancelled', 'expired', 'incomplete'}
+
+class PollPolicy:
+    # First retrieve happens after `initial_delay`, then waits grow by `backoff`
+    # up to `max_delay`. After `timeout` seconds the run is cancelled.
+    def __init__(self, initial_delay=0.1, backoff=1.5, max_delay=2.0, timeout=60.0):
+        self.initial_delay = initial_delay
+        self.backoff = backoff
+        self.max_delay = max_delay
+        self.timeout = timeout
+
+    def delays(self):
+        delay = self.initial_delay
+        while True:
+            yield delay
+            delay = min(delay * self.backoff, self.max_delay)
+
+class PollMetrics:
+    def __init__(self):
+        self.polls = 0
+        self.wait_time = 0.0
+        self.elapsed = 0.0
+        self.status = None
+        self.cancelled = False
+
+    def as_dict(self):
+        return {
+            'polls': self.polls,
+            'wait_time': self.wait_time,
+            'elapsed': self.elapsed,
+            'status': self.status,
+            'cancelled': self.cancelled,
+        }
+
+    def __repr__(self):
+        return f"PollMetrics({self.as_dict()})"
+
+def wait_for_run(client, thread_id, run_id, policy=None, on_requires_action=None,
+                 sleep=time.sleep, clock=time.monotonic):
+    # Polls until the run reaches a terminal state or the deadline passes.
+    # `on_requires_action(run)` may submit tool outputs; without it such runs are
+    # cancelled, since the thread stays locked until the run ends.
+    # Returns (run, metrics); metrics.status is 'timed_out' when the deadline hit.
+    policy = policy or PollPolicy()
+    metrics = PollMetrics()
+    run = None
+    start = clock()
+    delays = policy.delays()
+
+    while True:
+        delay = next(delays)
+        remaining = policy.timeout - (clock() - start)
+        if remaining <= 0:
+            client.beta.threads.runs.cancel(run_id=run_id, thread_id=thread_id)
+            metrics.cancelled = True
+            metrics.status = 'timed_out'
+            break
+        delay = min(delay, remaining)
+        sleep(delay)
+        metrics.wait_time += delay
+
+        run = client.beta.threads.runs.retrieve(thread_id=thread_id, run_id=run_id)
+        metrics.polls += 1
+        if run.status in TERMINAL_STATUSES:
+            metrics.status = run.status
+            break
+        if run.status == 'requires_action':
+            if on_requires_action is not None:
+                on_requires_action(run)
+                continue
+            client.beta.threads.runs.cancel(run_id=run_id, thread_id=thread_id)
+            metrics.cancelled = True
+            metrics.status = 'requires_action'
+            break
+
+    metrics.elapsed = clock() - start
+    return run, metrics
@@ -0,0 +1,139 @@
+# core/server.py
+
+import io
+import json
+import wave
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from core.wake_word import read_wav
+from core.sessions import SessionPoolFull
+from core.tracing import tracer
+
+MAX_BODY_BYTES = 20 * 1024 * 1024
+
+class AssistantServer:
+    # HTTP front end for several clients at once:
+    #   POST /turn  JSON {"text": ..., "speaker": optional} or a WAV body
+    #               (Content-Type: audio/wav); answers {"speaker", "text", "reply"}
+    #   GET /sessions, GET /health
+    # WAV turns are attributed with `recognize(samples, sample_rate)` and
+    # transcribed with `transcribe(wav_bytes)`. Speakers that aren't recognized
+    # share a guest session per client (X-Client-Id header, else the address).
+    # Each request runs on its own thread; at most `max_concurrent` turns talk
+    # to the assistant at the same time.
+    def __init__(self, sessions, recognize=None, transcribe=None, host='127.0.0.1', port=8765, max_concurrent=8):
+        self.sessions = sessions
+        self.recognize = recognize
+        self.transcribe = transcribe
+        self.host = host
+        self.port = port
+        self.counters = {'requests': 0, 'text_turns': 0, 'audio_turns': 0, 'rejected': 0}
+        self._slots = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self._httpd = None
+
+    def _count(self, name):
+        with self._lock:
+            self.counters[name] += 1
+
+    def handle_text(self, text, speaker):
+        with tracer.turn(), self._slots:
+            reply = self.sessions.ask(speaker, text)
+        self._count('text_turns')
+        return {'speaker': speaker, 'text': text, 'reply': reply}
+
+    def handle_audio(self, wav_data, client):
+        if self.transcribe is None:
+            raise ValueError("This server doesn't accept audio")
+        samples, sample_rate = read_wav(io.BytesIO(wav_data))
+        with tracer.turn(), self._slots:
+            speaker = self.recognize(samples, sample_rate) if self.recognize is not None else None
+            speaker = speaker or f"guest:{client}"
+            with tracer.span("stt"):
+                text = self.transcribe(wav_data)
+            reply = self.sessions.ask(speaker, text) if text.strip() else ""
+        self._count('audio_turns')
+        return {'speaker': speaker, 'text': text, 'reply': reply}
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self.counters)
+        return dict(counters, sessions=self.sessions.stats())
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def _send(self, status, payload):
+                body = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_GET(self):
+                if self.path == '/health':
+                    self._send(200, {'status': 'ok'})
+                elif self.path == '/sessions':
+                    self._send(200, server.stats())
+                else:
+                    self._send(404, {'error': 'not found'})
+
+            def do_POST(self):
+                if self.path != '/turn':
+                    self._send(404, {'error': 'not found'})
+                    return
+                server._count('requests')
+                length = int(self.headers.get('Content-Length') or 0)
+                if length > MAX_BODY_BYTES:
+                    self._send(413, {'error': 'request too large'})
+                    return
+                body = self.rfile.read(length)
+                client = self.headers.get('X-Client-Id') or self.client_address[0]
+                try:
+                    if self.headers.get('Content-Type', '').startswith(('audio/wav', 'audio/x-wav')):
+                        result = server.handle_audio(body, client)
+                    else:
+                        request = json.loads(body or b'{}')
+                        text = request.get('text')
+                        if not isinstance(text, str) or not text.strip():
+                            self._send(400, {'error': 'text is required'})
+                            return
+                        result = server.handle_text(text, request.get('speaker') or f"guest:{client}")
+                except SessionPoolFull as e:
+                    server._count('rejected')
+                    self._send(503, {'error': str(e)})
+                    return
+                except (ValueError, EOFError, wave.Error) as e:
+                    self._send(400, {'error': str(e)})
+                    return
+                except Exception as e:
+                    print(f"Turn failed: {e}")
+                    self._send(500, {'error': str(e)})
+                    return
+                self._send(200, result)
+
+        return Handler
+
+    def _bind(self):
+        self._httpd = ThreadingHTTPServer((self.host, self.port), self._handler())
+        self._httpd.daemon_threads = True
+        return self._httpd
+
+    def start(self, poll_interval=0.5):
+        # Serves on a daemon thread; returns the (host, port) actually bound.
+        threading.Thread(target=self._bind().serve_forever, args=(poll_interval,), daemon=True).start()
+        return self._httpd.server_address
+
+    def serve_forever(self):
+        self._bind().serve_forever()
+
+    def close(self):
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+        self.sessions.close()
@@ -0,0 +1,121 @@
+# core/sessions.py
+
+import time
+import threading
+from contextlib import contextmanager
+
+class SessionPoolFull(Exception):
+    pass
+
+class Session:
+    def __init__(self, key, now):
+        self.key = key
+        self.thread = None
+        self.created = now
+        self.last_used = now
+        self.turns = 0
+        # Turns waiting for or holding the lock; busy sessions are never evicted.
+        self.active = 0
+        # One run at a time per assistant thread.
+        self.lock = threading.Lock()
+
+class SessionPool:
+    # One assistant thread per speaker. `backend` provides create_thread(),
+    # delete_thread(thread) and ask_question_memory(question, thread, max_messages)
+    # (the assist module does). Turns of the same speaker run one after another,
+    # different speakers concurrently. Sessions idle for `idle_timeout` seconds
+    # are dropped, and once `max_sessions` are open the least recently used idle
+    # one makes room; its thread is deleted. Each run only sees the last
+    # `max_context_messages` messages of its thread.
+    def __init__(self, backend, max_sessions=32, idle_timeout=900.0, max_context_messages=20, clock=time.monotonic):
+        self.backend = backend
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_context_messages = max_context_messages
+        self.clock = clock
+        self.sessions = {}
+        self.counters = {'created': 0, 'evicted_idle': 0, 'evicted_capacity': 0, 'turns': 0, 'errors': 0}
+        self._lock = threading.Lock()
+
+    def _evict(self, session, reason):
+        del self.sessions[session.key]
+        self.counters[reason] += 1
+        return session.thread
+
+    def _make_room(self, now, stale):
+        # Called with the pool lock held; adds the threads to delete to `stale`,
+        # which the caller deletes even when the pool turns out to be full.
+        for session in list(self.sessions.values()):
+            if session.active == 0 and now - session.last_used > self.idle_timeout:
+                stale.append(self._evict(session, 'evicted_idle'))
+        while len(self.sessions) >= self.max_sessions:
+            idle = [session for session in self.sessions.values() if session.active == 0]
+            if not idle:
+                raise SessionPoolFull(f"All {self.max_sessions} sessions are busy")
+            stale.append(self._evict(min(idle, key=lambda session: session.last_used), 'evicted_capacity'))
+
+    def _delete_threads(self, threads):
+        for thread in threads:
+            try:
+                self.backend.delete_thread(thread)
+            except Exception as e:
+                print(f"Could not delete thread {thread}: {e}")
+
+    @contextmanager
+    def session(self, key):
+        # Holds the session of `key` (created on first use) for one turn.
+        stale = []
+        try:
+            with self._lock:
+                now = self.clock()
+                session = self.sessions.get(key)
+                if session is None:
+                    self._make_room(now, stale)
+                    session = self.sessions[key] = Session(key, now)
+                    self.counters['created'] += 1
+                session.active += 1
+        finally:
+            self._delete_threads([thread for thread in stale if thread is not None])
+        try:
+            with session.lock:
+                if session.thread is None:
+                    session.thread = self.backend.create_thread()
+                yield session
+        finally:
+            with self._lock:
+                session.active -= 1
+                session.last_used = self.clock()
+
+    def ask(self, key, question):
+        with self.session(key) as session:
+            try:
+                reply = self.backend.ask_question_memory(question, session.thread, self.max_context_messages)
+            except Exception:
+                with self._lock:
+                    self.counters['errors'] += 1
+                raise
+            session.turns += 1
+            with self._lock:
+                self.counters['turns'] += 1
+            return reply
+
+    def evict_idle(self):
+        with self._lock:
+            now = self.clock()
+            stale = [self._evict(session, 'evicted_idle') for session in list(self.sessions.values())
+                     if session.active == 0 and now - session.last_used > self.idle_timeout]
+        self._delete_threads([thread for thread in stale if thread is not None])
+        return len(stale)
+
+    def stats(self):
+        with self._lock:
+            now = self.clock()
+            return dict(self.counters, open=len(self.sessions), sessions={
+                key: {'turns': session.turns, 'active': session.active, 'idle_seconds': now - session.last_used}
+                for key, session in self.sessions.items()})
+
+    def close(self):
+        with self._lock:
+            threads = [session.thread for session in self.sessions.values() if session.thread is not None]
+            self.sessions = {}
+        self._delete_threads(threads)
@@ -0,0 +1,223 @@
+# core/speaker_embeddings.py
+
+import os
+import abc
+import hashlib
+import threading
+import importlib.util
+from collections import OrderedDict
+import numpy as np
+from core.feature_stream import CHUNK_SECONDS, iter_wav_chunks
+
+ECAPA_SOURCE = 'speechbrain/spkrec-ecapa-voxceleb'
+ECAPA_SAMPLE_RATE = 16000
+
+def audio_hash(samples, sample_rate):
+    # Identifies a clip by its samples (as float32) and rate, whatever dtype it came in.
+    samples = np.ascontiguousarray(samples, dtype=np.float32)
+    digest = hashlib.sha256(str(sample_rate).encode('ascii') + b'\0')
+    digest.update(samples.tobytes())
+    return digest.hexdigest()
+
+def wav_hash(path, chunk_seconds=CHUNK_SECONDS):
+    # audio_hash() of a WAV file's samples (mono, int16 scale), read a chunk at a time.
+    digest = None
+    for samples, sample_rate in iter_wav_chunks(path, chunk_seconds):
+        if digest is None:
+            digest = hashlib.sha256(str(sample_rate).encode('ascii') + b'\0')
+        digest.update(np.ascontiguousarray(samples, dtype=np.float32).tobytes())
+    if digest is None:
+        raise ValueError(f"{path} has no audio")
+    return digest.hexdigest()
+
+class EmbeddingBackend(abc.ABC):
+    # Turns clips of audio into fixed-width speaker vectors. `metric` is the
+    # SpeakerIndex metric the vectors are compared with and `min_confidence` the
+    # default acceptance threshold on that metric's confidence, applied once the
+    # index holds `threshold_speakers` speakers (before that, the nearest wins).
+    name = None
+    metric = 'euclidean'
+    min_confidence = 0.5
+    threshold_speakers = 1
+
+    def available(self):
+        return True
+
+    def load(self):
+        pass
+
+    @abc.abstractmethod
+    def embed_batch(self, clips):
+        # `clips` is a list of (samples, sample_rate); returns an (n, dim) array.
+        pass
+
+class MidTermBackend(EmbeddingBackend):
+    # pyAudioAnalysis mid-term statistics averaged over the clip; `extract` is
+    # core.speech_recognition.extract_features_from_buffer. There is no batched
+    # form, so clips are processed one at a time. Euclidean confidence is
+    # relative to the spread between profiles, so it means nothing with a
+    # single speaker; on the benchmark fixtures further clips of enrolled
+    # speakers score 0.28-0.6 and unenrolled voices about 0.03.
+    name = 'midterm'
+    metric = 'euclidean'
+    min_confidence = 0.2
+    threshold_speakers = 2
+
+    def __init__(self, extract):
+        self.extract = extract
+
+    def embed_batch(self, clips):
+        return np.array([self.extract(samples, sample_rate) for samples, sample_rate in clips], dtype=np.float32)
+
+class EcapaBackend(EmbeddingBackend):
+    # speechbrain's ECAPA-TDNN speaker encoder (192-dim embeddings, compared by
+    # cosine) on the CPU. The model is downloaded to `savedir` and loaded on
+    # first use; clips are resampled to 16 kHz, zero-padded and encoded
+    # `batch_size` at a time with their relative lengths, so padding is ignored.
+    name = 'ecapa'
+    metric = 'cosine'
+    min_confidence = 0.25
+
+    def __init__(self, source=ECAPA_SOURCE, savedir=os.path.join('pretrained_models', 'spkrec-ecapa-voxceleb'),
+                 device='cpu', batch_size=8, classifier_factory=None):
+        self.source = source
+        self.savedir = savedir
+        self.device = device
+        self.batch_size = batch_size
+        self.classifier_factory = classifier_factory
+        self._classifier = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        if self.classifier_factory is not None:
+            return True
+        return importlib.util.find_spec('speechbrain') is not None and importlib.util.find_spec('torch') is not None
+
+    def load(self):
+        with self._lock:
+            if self._classifier is None:
+                if self.classifier_factory is not None:
+                    self._classifier = self.classifier_factory()
+                else:
+                    from speechbrain.inference.speaker import EncoderClassifier
+                    self._classifier = EncoderClassifier.from_hparams(
+                        source=self.source, savedir=self.savedir, run_opts={'device': self.device})
+        return self._classifier
+
+    def _prepare(self, samples, sample_rate):
+        import torch
+        import torchaudio
+        x = np.asarray(samples)
+        if x.ndim == 2:
+            x = x.mean(axis=1)
+        if not np.issubdtype(x.dtype, np.floating):
+            x = x / 32768.0
+        wav = torch.from_numpy(np.ascontiguousarray(x, dtype=np.float32))
+        if sample_rate != ECAPA_SAMPLE_RATE:
+            wav = torchaudio.functional.resample(wav, sample_rate, ECAPA_SAMPLE_RATE)
+        return wav
+
+    def embed_batch(self, clips):
+        import torch
+        classifier = self.load()
+        embeddings = []
+        for start in range(0, len(clips), self.batch_size):
+            wavs = [self._prepare(samples, sample_rate) for samples, sample_rate in clips[start:start + self.batch_size]]
+            longest = max(len(wav) for wav in wavs)
+            batch = torch.zeros(len(wavs), longest)
+            for i, wav in enumerate(wavs):
+                batch[i, :len(wav)] = wav
+            lengths = torch.tensor([len(wav) / longest for wav in wavs])
+            with torch.no_grad():
+                encoded = classifier.encode_batch(batch, lengths)
+            embeddings.append(encoded.reshape(len(wavs), -1).cpu().numpy())
+        return np.concatenate(embeddings).astype(np.float32)
+
+class EmbeddingCache:
+    # Embeddings by (backend, audio hash): an LRU of `max_entries` in memory and,
+    # with `cache_dir`, one .npy file per clip that survives restarts.
+    def __init__(self, max_entries=256, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, key[0], key[1] + '.npy')
+
+    def get(self, key):
+        with self._lock:
+            embedding = self._entries.get(key)
+            if embedding is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return embedding
+        if self.cache_dir is not None:
+            try:
+                embedding = np.load(self._path(key))
+            except (OSError, ValueError):
+                embedding = None
+            if embedding is not None:
+                self._remember(key, embedding)
+                with self._lock:
+                    self.hits += 1
+                return embedding
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key, embedding):
+        embedding = np.asarray(embedding, dtype=np.float32)
+        self._remember(key, embedding)
+        if self.cache_dir is not None:
+            path = self._path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = path + '.tmp.npy'
+            np.save(tmp_path, embedding)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key, embedding):
+        with self._lock:
+            self._entries[key] = embedding
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+class SpeakerEmbedder:
+    # Embeds clips through `backend`, skipping any clip whose embedding is
+    # already cached; the misses of a batch go to the backend in one call.
+    def __init__(self, backend, cache=None):
+        self.backend = backend
+        self.cache = cache if cache is not None else EmbeddingCache()
+
+    def embed(self, samples, sample_rate):
+        return self.embed_many([(samples, sample_rate)])[0]
+
+    def embed_many(self, clips):
+        keys = [(self.backend.name, audio_hash(samples, sample_rate)) for samples, sample_rate in clips]
+        return self._cached(keys, clips, self.backend.embed_batch)
+
+    def embed_files(self, paths, extract_files):
+        # Embeddings of WAV files that `extract_files(paths)` computes straight
+        # from disk (streamed midterm features), cached under the hash of the
+        # file's samples like any clip.
+        keys = [(self.backend.name, wav_hash(path)) for path in paths]
+        return self._cached(keys, paths, extract_files)
+
+    def _cached(self, keys, items, compute):
+        embeddings = [self.cache.get(key) for key in keys]
+        missing = {}
+        for key, embedding, item in zip(keys, embeddings, items):
+            if embedding is None:
+                missing.setdefault(key, item)
+        if missing:
+            computed = dict(zip(missing, compute(list(missing.values()))))
+            for key, embedding in computed.items():
+                self.cache.put(key, embedding)
+            embeddings = [computed[key] if embedding is None else embedding for key, embedding in zip(keys, embeddings)]
+        return embeddings
@@ -0,0 +1,195 @@
+# core/speaker_index.py
+
+from collections import namedtuple
+import numpy as np
+
+SpeakerMatch = namedtuple('SpeakerMatch', ['name', 'distance', 'confidence'])
+
+# 'euclidean': RMS distance over per-feature normalized values, for raw feature
+# vectors. 'cosine': 1 - cosine similarity, for neural embeddings.
+METRICS = ('euclidean', 'cosine')
+
+class SpeakerIndex:
+    # Profiles live in one contiguous float32 matrix; rows past `len(self)` are spare capacity.
+    # add_sample() folds further enrollment samples into a per-speaker centroid.
+    def __init__(self, dim=None, capacity=16, min_scale_ratio=0.1, metric='euclidean'):
+        if metric not in METRICS:
+            raise ValueError(f"Unknown metric {metric!r}")
+        self.dim = dim
+        self.min_scale_ratio = min_scale_ratio
+        self.metric = metric
+        self._capacity = capacity
+        self._matrix = None
+        self._names = []
+        self._rows = {}
+        self._counts = {}
+        self._sum = None
+        self._sum_sq = None
+        self._inv_scale = None
+        if dim is not None:
+            self._allocate(dim)
+
+    @classmethod
+    def from_profiles(cls, profiles, metric='euclidean'):
+        index = cls(metric=metric)
+        for name, features in profiles.items():
+            index.add(name, features)
+        return index
+
+    @classmethod
+    def from_matrix(cls, names, matrix, metric='euclidean', centroids=False):
+        # Adopts `matrix` (e.g. a memmap from ProfileStore) without copying when
+        # names are unique; rows are only copied once the index has to grow.
+        # Repeated names are either replaced by their last row or, with
+        # `centroids`, averaged.
+        if len(set(names)) != len(names) or (centroids and metric == 'cosine'):
+            index = cls(metric=metric)
+            for row, name in enumerate(names):
+                if centroids:
+                    index.add_sample(name, matrix[row])
+                else:
+                    index.add(name, matrix[row])
+            return index
+        index = cls(capacity=max(len(names), 1), metric=metric)
+        if not names:
+            return index
+        index.dim = matrix.shape[1]
+        index._matrix = matrix
+        index._names = list(names)
+        index._rows = {name: row for row, name in enumerate(names)}
+        values = np.asarray(matrix, dtype=np.float64)
+        index._sum = values.sum(axis=0)
+        index._sum_sq = (values * values).sum(axis=0)
+        return index
+
+    def _allocate(self, dim):
+        self.dim = dim
+        self._matrix = np.zeros((self._capacity, dim), dtype=np.float32)
+        self._sum = np.zeros(dim, dtype=np.float64)
+        self._sum_sq = np.zeros(dim, dtype=np.float64)
+
+    def _grow(self):
+        self._capacity *= 2
+        matrix = np.zeros((self._capacity, self.dim), dtype=np.float32)
+        matrix[:len(self._names)] = self._matrix[:len(self._names)]
+        self._matrix = matrix
+
+    def __len__(self):
+        return len(self._names)
+
+    def __contains__(self, name):
+        return name in self._rows
+
+    @property
+    def names(self):
+        return list(self._names)
+
+    @property
+    def matrix(self):
+        return self._matrix[:len(self._names)] if self._matrix is not None else np.zeros((0, self.dim or 0), dtype=np.float32)
+
+    def get(self, name):
+        row = self._rows.get(name)
+        return None if row is None else self._matrix[row].copy()
+
+    def samples(self, name):
+        # How many enrollment samples the profile of `name` averages.
+        return self._counts.get(name, 1) if name in self._rows else 0
+
+    def add_sample(self, name, features):
+        # Moves the profile of `name` to the mean of all samples added for it.
+        # Cosine embeddings are unit-normalized first, so every sample weighs the same.
+        features = np.asarray(features, dtype=np.float64).ravel()
+        if self.metric == 'cosine':
+            norm = np.linalg.norm(features)
+            if norm > 0:
+                features = features / norm
+        count = self.samples(name)
+        if count:
+            old = self._matrix[self._rows[name]].astype(np.float64)
+            features = old + (features - old) / (count + 1)
+        self.add(name, features)
+        self._counts[name] = count + 1
+        return features
+
+    def add(self, name, features):
+        # Replaces any existing profile of `name`.
+        features = np.asarray(features, dtype=np.float32).ravel()
+        if self._matrix is None:
+            self._allocate(features.shape[0])
+        if features.shape[0] != self.dim:
+            raise ValueError(f"Expected {self.dim} features, got {features.shape[0]}")
+
+        row = self._rows.get(name)
+        if row is None:
+            if len(self._names) == self._capacity:
+                self._grow()
+            row = len(self._names)
+            self._names.append(name)
+            self._rows[name] = row
+        else:
+            old = self._matrix[row].astype(np.float64)
+            self._sum -= old
+            self._sum_sq -= old * old
+
+        self._counts.pop(name, None)
+        self._matrix[row] = features
+        new = features.astype(np.float64)
+        self._sum += new
+        self._sum_sq += new * new
+        self._inv_scale = None
+
+    def to_profiles(self):
+        return {name: self._matrix[row].tolist() for name, row in self._rows.items()}
+
+    def _scale(self):
+        # Per-feature normalization from running statistics, so large-magnitude
+        # dimensions don't swamp the distance. With too few profiles for a useful
+        # spread, fall back to a fraction of the feature magnitude.
+        if self._inv_scale is None:
+            n = len(self._names)
+            mean = self._sum / n
+            std = np.sqrt(np.maximum(self._sum_sq / n - mean * mean, 0.0))
+            scale = np.maximum(std, self.min_scale_ratio * np.abs(mean))
+            scale[scale == 0] = 1.0
+            self._inv_scale = (1.0 / scale).astype(np.float32)
+        return self._inv_scale
+
+    def distances(self, features):
+        features = np.asarray(features, dtype=np.float32).ravel()
+        if self.metric == 'cosine':
+            matrix = self.matrix
+            norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(features)
+            norms[norms == 0] = 1.0
+            return 1.0 - (matrix @ features) / norms
+        diff = (self.matrix - features) * self._scale()
+        return np.sqrt(np.mean(diff * diff, axis=1))
+
+    def confidence(self, distance):
+        if self.metric == 'cosine':
+            return max(0.0, 1.0 - distance)
+        return 1.0 / (1.0 + distance)
+
+    def query(self, features, k=1, min_confidence=None):
+        if not self._names:
+            return []
+        distances = self.distances(features)
+        k = min(k, len(distances))
+        if k < len(distances):
+            candidates = np.argpartition(distances, k - 1)[:k]
+        else:
+            candidates = np.arange(len(distances))
+        candidates = candidates[np.argsort(distances[candidates])]
+
+        matches = []
+        for row in candidates:
+            distance = float(distances[row])
+            confidence = self.confidence(distance)
+            if min_confidence is not None and confidence < min_confidence:
+                break
+            matches.append(SpeakerMatch(self._names[row], distance, confidence))
+        return matches
+
+    def nearest(self, features, min_confidence=None):
+        matches = self.query(features, k=1, min_confidence=min_confidence)
+        return matches[0] if matches else None
@@ -1,85 +1,276 @@
 # core/speech_recognition.py
 
 import os
-import json
+import atexit
 import wave
 import numpy as np
 import speech_recognition as sr
-from pyAudioAnalysis import audioBasicIO as aIO
-from pyAudioAnalysis import MidTermFeatures as aF
 from dotenv import load_dotenv
+from core.startup import lazy_import, preload
+from core.speaker_index import SpeakerIndex
+from core.speaker_embeddings import EcapaBackend, EmbeddingCache, MidTermBackend, SpeakerEmbedder
+from core.feature_stream import MidTermStats, extract_file_features, extract_many, find_recordings
+from core.profile_store import ProfileStore, migrate_json_profiles
+from core.memory_store import MemoryStore
+from core.tracing import tracer
 
 MEMORY_FILE = 'memory.json'
 SPEAKER_PROFILES_FILE = 'speaker_profiles.json'
+# None uses the embedding backend's own threshold (0.2 for 'midterm', 0.25 for
+# 'ecapa'); the midterm one applies from two enrolled speakers on.
+SPEAKER_MIN_CONFIDENCE = None
+# 'midterm' (pyAudioAnalysis features) or 'ecapa' (speechbrain, falls back to
+# 'midterm' when speechbrain/torch aren't installed). Each keeps its own profiles.
+SPEAKER_BACKEND = 'midterm'
+# Embeddings are cached per audio hash; set a directory to keep them across runs.
+EMBEDDING_CACHE_DIR = None
+INT16_SCALE = 32768.0
+# Seconds between a memory change and its write-behind flush
+MEMORY_FLUSH_INTERVAL = 1.0
+# Append changed keys to memory.json.journal instead of rewriting memory.json
+MEMORY_JOURNAL = False
+
+_memory_store = None
+
+# pyAudioAnalysis pulls in scipy and sklearn, which takes over a second; it is
+# loaded on first use or by warm_up().
+aIO = lazy_import('pyAudioAnalysis.audioBasicIO')
+aF = lazy_import('pyAudioAnalysis.MidTermFeatures')
+
+_profile_store = None
+_speaker_index = None
+_speaker_index_key = None
+_embedder = None
+_embedding_cache = None
 
 def load_environment():
     load_dotenv()
 
+def warm_up():
+    preload(aIO, aF)
+    get_embedder().backend.load()
+    get_speaker_index()
+
+def get_memory_store():
+    global _memory_store
+    if _memory_store is None or _memory_store.path != MEMORY_FILE:
+        if _memory_store is not None:
+            _memory_store.close()
+        _memory_store = MemoryStore(MEMORY_FILE, MEMORY_FLUSH_INTERVAL, MEMORY_JOURNAL)
+    return _memory_store
+
+def flush_memory():
+    if _memory_store is not None:
+        _memory_store.flush()
+
+atexit.register(flush_memory)
+
 def load_memory():
-    if os.path.exists(MEMORY_FILE):
-        with open(MEMORY_FILE, 'r') as file:
-            return json.load(file)
-    return {}
+    return get_memory_store().snapshot()
 
 def save_memory(memory):
-    with open(MEMORY_FILE, 'w') as file:
-        json.dump(memory, file)
+    store = get_memory_store()
+    store.replace(memory)
+    store.flush()
 
 def get_memory(key, default=None):
-    memory = load_memory()
-    return memory.get(key, default)
+    return get_memory_store().get(key, default)
 
 def set_memory(key, value):
-    memory = load_memory()
-    memory[key] = value
-    save_memory(memory)
+    get_memory_store().set(key, value)
 
 def update_memory(key, value):
-    memory = load_memory()
-    memory[key] = value
-    save_memory(memory)
+    get_memory_store().set(key, value)
+
+def get_embedder():
+    global _embedder, _embedding_cache
+    if _embedding_cache is None or _embedding_cache.cache_dir != EMBEDDING_CACHE_DIR:
+        _embedding_cache = EmbeddingCache(cache_dir=EMBEDDING_CACHE_DIR)
+        _embedder = None
+    if _embedder is None or _embedder.backend.name != SPEAKER_BACKEND:
+        backend = EcapaBackend() if SPEAKER_BACKEND == 'ecapa' else MidTermBackend(extract_features_from_buffer)
+        if not backend.available():
+            print(f"Speaker backend {SPEAKER_BACKEND} is not installed; using midterm features.")
+            backend = MidTermBackend(extract_features_from_buffer)
+        _embedder = SpeakerEmbedder(backend, _embedding_cache)
+    return _embedder
+
+def speaker_min_confidence(speaker_index=None):
+    # None (take the nearest profile) while `speaker_index` has fewer speakers
+    # than the backend needs for its threshold to mean anything.
+    if SPEAKER_MIN_CONFIDENCE is not None:
+        return SPEAKER_MIN_CONFIDENCE
+    backend = get_embedder().backend
+    if speaker_index is not None and len(speaker_index) < backend.threshold_speakers:
+        return None
+    return backend.min_confidence
+
+def get_profile_store():
+    # Profiles are kept in a binary store next to the legacy JSON file, which is
+    # migrated once on first use. Every enrollment sample is a row; a speaker's
+    # profile is the centroid of their rows. Backends other than 'midterm' use
+    # their own store (speaker_profiles.<backend>.*).
+    global _profile_store
+    base_path = os.path.splitext(SPEAKER_PROFILES_FILE)[0]
+    backend = get_embedder().backend.name
+    if backend != 'midterm':
+        base_path = f"{base_path}.{backend}"
+    if _profile_store is None or _profile_store.base_path != base_path:
+        _profile_store = ProfileStore(base_path)
+    if backend == 'midterm':
+        migrate_json_profiles(SPEAKER_PROFILES_FILE, _profile_store)
+    return _profile_store
 
 def load_speaker_profiles():
-    if os.path.exists(SPEAKER_PROFILES_FILE):
-        with open(SPEAKER_PROFILES_FILE, 'r') as file:
-            return json.load(file)
-    return {}
+    # The centroids the index matches against, one per speaker.
+    return get_speaker_index().to_profiles()
 
 def save_speaker_profiles(profiles):
-    with open(SPEAKER_PROFILES_FILE, 'w') as file:
-        json.dump(profiles, file)
+    get_profile_store().write_all(profiles)
+
+def get_speaker_index():
+    global _speaker_index, _speaker_index_key
+    store = get_profile_store()
+    key = (store.base_path, store.version_key())
+    if _speaker_index is None or key != _speaker_index_key:
+        names, matrix = store.load()
+        _speaker_index = SpeakerIndex.from_matrix(names, matrix, get_embedder().backend.metric, centroids=True)
+        _speaker_index_key = key
+    return _speaker_index
+
+def extract_features_from_buffer(samples, sample_rate):
+    x = np.asarray(samples)
+    if x.ndim == 2:
+        x = x.mean(axis=1)
+    if np.issubdtype(x.dtype, np.floating):
+        # Recorder buffers are float32 in [-1, 1]; pyAudioAnalysis expects int16 scale.
+        x = x * INT16_SCALE
+    return MidTermStats(sample_rate).finish(x)
 
 def extract_features(audio_file):
+    # WAV files are read a chunk at a time (core.feature_stream), so long
+    # recordings don't have to fit in memory.
+    if str(audio_file).lower().endswith('.wav'):
+        return extract_file_features(audio_file)
     [Fs, x] = aIO.read_audio_file(audio_file)
-    mt, st, _ = aF.mid_feature_extraction(x, Fs, 1.0 * Fs, 1.0 * Fs, 0.050 * Fs, 0.025 * Fs)
-    return np.mean(mt, axis=1)
-
-def enroll_speaker(name, audio_file):
-    speaker_profiles = load_speaker_profiles()
-    features = extract_features(audio_file)
-    speaker_profiles[name] = features.tolist()
-    save_speaker_profiles(speaker_profiles)
+    return extract_features_from_buffer(x, Fs)
+
+def _clip(audio, sample_rate=None):
+    # `audio` is either a path to a WAV file or a sample array.
+    if isinstance(audio, (str, os.PathLike)):
+        [Fs, x] = aIO.read_audio_file(audio)
+        return x, Fs
+    if sample_rate is None:
+        raise ValueError("sample_rate is required when passing raw audio samples")
+    return audio, sample_rate
+
+def _is_wav_path(audio):
+    return isinstance(audio, (str, os.PathLike)) and str(audio).lower().endswith('.wav')
+
+def _embed(clips, sample_rate=None, workers=None):
+    # Embeddings of paths and sample arrays, through the embedding cache. With
+    # the midterm backend WAV files are streamed from disk (see _embed_files);
+    # everything else is loaded and embedded in one batch.
+    embedder = get_embedder()
+    streamed = [i for i, audio in enumerate(clips) if embedder.backend.name == 'midterm' and _is_wav_path(audio)]
+    loaded = sorted(set(range(len(clips))) - set(streamed))
+    embeddings = [None] * len(clips)
+    if streamed:
+        for i, features in zip(streamed, _embed_files([clips[i] for i in streamed], workers)):
+            embeddings[i] = features
+    if loaded:
+        for i, features in zip(loaded, embedder.embed_many([_clip(clips[i], sample_rate) for i in loaded])):
+            embeddings[i] = features
+    return embeddings
+
+def _extract_features(audio, sample_rate=None):
+    return _embed([audio], sample_rate)[0]
+
+def enroll_speaker(name, audio, sample_rate=None):
+    return enroll_speaker_samples(name, [audio], sample_rate)
+
+def enroll_speaker_samples(name, clips, sample_rate=None):
+    # Adds several recordings of one speaker at once; they are embedded in one
+    # batch and averaged into the speaker's profile with any earlier samples.
+    _add_samples(name, _embed(clips, sample_rate))
     return f"Speaker {name} enrolled successfully."
 
-def recognize_speaker(audio_file):
-    speaker_profiles = load_speaker_profiles()
-    features = extract_features(audio_file)
+def _add_samples(name, embeddings):
+    global _speaker_index_key
+    speaker_index = get_speaker_index()
+    store = get_profile_store()
+    for features in embeddings:
+        speaker_index.add_sample(name, features)
+        store.append(name, features)
+    _speaker_index_key = (store.base_path, store.version_key())
+
+def rank_speakers(audio, sample_rate=None, k=3, min_confidence=None):
+    features = _extract_features(audio, sample_rate)
+    return get_speaker_index().query(features, k=k, min_confidence=min_confidence)
+
+@tracer.traced("speaker_id")
+def recognize_speaker(audio, sample_rate=None, min_confidence=None):
+    if min_confidence is None:
+        min_confidence = speaker_min_confidence(get_speaker_index())
+    matches = rank_speakers(audio, sample_rate, k=1, min_confidence=min_confidence)
+    return matches[0].name if matches else None
+
+def recognize_speakers(clips, sample_rate=None, min_confidence=None):
+    # Batched recognize_speaker() for several clips.
+    speaker_index = get_speaker_index()
+    if min_confidence is None:
+        min_confidence = speaker_min_confidence(speaker_index)
+    names = []
+    for features in _embed(clips, sample_rate):
+        match = speaker_index.nearest(features, min_confidence=min_confidence)
+        names.append(match.name if match else None)
+    return names
 
-    best_match = None
-    best_score = float('inf')
+def _embed_files(paths, workers=None):
+    # Midterm features of the files not in the embedding cache are streamed
+    # from disk across a process pool; other backends load the clips and embed
+    # them in batches.
+    embedder = get_embedder()
+    if embedder.backend.name == 'midterm':
+        return embedder.embed_files(paths, lambda missing: extract_many(missing, workers))
+    return embedder.embed_many([_clip(path) for path in paths])
 
-    for name, profile in speaker_profiles.items():
-        profile = np.array(profile)
-        score = np.linalg.norm(profile - features)
-        if score < best_score:
-            best_score = score
-            best_match = name
+def enroll_directory(directory, name=None, workers=None):
+    # Enrolls every WAV in `directory` as `name`, or without a name, every WAV
+    # in each subdirectory as the speaker the subdirectory is named after.
+    # Returns {speaker: samples enrolled}.
+    if name is not None:
+        speakers = {name: find_recordings(directory)}
+    else:
+        speakers = {entry.name: find_recordings(entry.path)
+                    for entry in sorted(os.scandir(directory), key=lambda entry: entry.name) if entry.is_dir()}
+    paths = [path for recordings in speakers.values() for path in recordings]
+    embeddings = iter(_embed_files(paths, workers))
+    enrolled = {}
+    for speaker, recordings in speakers.items():
+        if recordings:
+            _add_samples(speaker, [next(embeddings) for _ in recordings])
+            enrolled[speaker] = len(recordings)
+    return enrolled
 
-    return best_match
+def score_directory(directory, min_confidence=None, workers=None):
+    # recognize_speaker() for every WAV in `directory`: {path: speaker or None}.
+    paths = find_recordings(directory)
+    speaker_index = get_speaker_index()
+    if min_confidence is None:
+        min_confidence = speaker_min_confidence(speaker_index)
+    results = {}
+    for path, features in zip(paths, _embed_files(paths, workers)):
+        match = speaker_index.nearest(features, min_confidence=min_confidence)
+        results[path] = match.name if match else None
+    return results
 
 def save_audio_to_wav(audio_data, filename, sample_rate):
+    audio_data = np.asarray(audio_data)
+    if np.issubdtype(audio_data.dtype, np.floating):
+        audio_data = np.clip(audio_data * INT16_SCALE, -INT16_SCALE, INT16_SCALE - 1).astype(np.int16)
     with wave.open(filename, 'wb') as wf:
         wf.setnchannels(1)  # Mono
         wf.setsampwidth(2)  # 2 bytes per sample
         wf.setframerate(sample_rate)
-        wf.writeframes(audio_data.tobytes())
+        wf.writeframes(audio_data.astype(np.int16).tobytes())
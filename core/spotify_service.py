@@ -0,0 +1,226 @@
+# core/spotify_service.py
+
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from requests.adapters import HTTPAdapter
+
+API_URL = 'https://api.spotify.com/v1/'
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+class SpotifyError(Exception):
+    def __init__(self, status, message):
+        super().__init__(f"{status}: {message}")
+        self.status = status
+
+class SpotifyService:
+    # Playback control over one pooled HTTP session. The access token is kept in
+    # memory and refreshed in the background `refresh_margin` seconds before it
+    # expires; the current playback state is cached for `ttl` seconds. Commands
+    # update that cached state at once and are sent in order on a worker thread;
+    # a failed command rolls the cached state back. Rate limits and server errors
+    # are retried with jittered exponential backoff, honouring Retry-After.
+    # `auth_manager` follows spotipy's SpotifyOAuth: get_access_token(as_dict=False),
+    # refresh_access_token(refresh_token) and cache_handler.get_cached_token().
+    def __init__(self, auth_manager, base_url=API_URL, ttl=5.0, pool_size=4, timeout=5.0,
+                 max_retries=3, backoff=0.5, max_backoff=8.0, refresh_margin=300.0,
+                 session=None, sleep=time.sleep, clock=time.monotonic, wall_clock=time.time):
+        self.auth_manager = auth_manager
+        self.base_url = base_url.rstrip('/') + '/'
+        self.ttl = ttl
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.refresh_margin = refresh_margin
+        self.sleep = sleep
+        self.clock = clock
+        self.wall_clock = wall_clock
+        self.metrics = {}
+        if session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+            session.mount('https://', adapter)
+            session.mount('http://', adapter)
+        self.session = session
+        self._token_info = None
+        self._token_lock = threading.Lock()
+        self._refreshing = False
+        self._state = None
+        self._state_time = None
+        self._state_lock = threading.Lock()
+        self._commands = ThreadPoolExecutor(max_workers=1)
+
+    # Token handling
+
+    def _fetch_token(self):
+        access_token = self.auth_manager.get_access_token(as_dict=False)
+        token_info = self.auth_manager.cache_handler.get_cached_token()
+        if not token_info or token_info.get('access_token') != access_token:
+            token_info = {'access_token': access_token, 'expires_at': self.wall_clock() + 3600}
+        return token_info
+
+    def _renew(self, token_info):
+        refresh_token = token_info.get('refresh_token') if token_info else None
+        if refresh_token:
+            return self.auth_manager.refresh_access_token(refresh_token)
+        return self._fetch_token()
+
+    def _background_refresh(self, token_info):
+        try:
+            renewed = self._renew(token_info)
+            with self._token_lock:
+                self._token_info = renewed
+        except Exception as e:
+            print(f"Spotify token refresh failed: {e}")
+        finally:
+            with self._token_lock:
+                self._refreshing = False
+
+    def access_token(self, force_refresh=False):
+        with self._token_lock:
+            token_info = self._token_info
+            if token_info is None:
+                token_info = self._token_info = self._fetch_token()
+            remaining = token_info['expires_at'] - self.wall_clock()
+            if force_refresh or remaining <= 0:
+                token_info = self._token_info = self._renew(token_info)
+            elif remaining < self.refresh_margin and not self._refreshing:
+                # Still valid: keep using it while a new one is fetched.
+                self._refreshing = True
+                threading.Thread(target=self._background_refresh, args=(token_info,), daemon=True).start()
+            return token_info['access_token']
+
+    # HTTP
+
+    def _record(self, name, elapsed, retries, ok):
+        metric = self.metrics.setdefault(name, {'calls': 0, 'errors': 0, 'retries': 0, 'latency': deque(maxlen=100)})
+        metric['calls'] += 1
+        metric['retries'] += retries
+        metric['latency'].append(elapsed)
+        if not ok:
+            metric['errors'] += 1
+
+    def _delay(self, attempt, response=None):
+        if response is not None and 'Retry-After' in response.headers:
+            try:
+                return float(response.headers['Retry-After']) + random.uniform(0, self.backoff)
+            except ValueError:
+                pass
+        # Full jitter keeps several clients from retrying in lockstep.
+        return random.uniform(0, min(self.max_backoff, self.backoff * 2 ** attempt))
+
+    def request(self, method, path, name=None, **kwargs):
+        name = name or f"{method} {path}"
+        start = self.clock()
+        retries = 0
+        refreshed = False
+        try:
+            while True:
+                headers = {'Authorization': f"Bearer {self.access_token()}"}
+                try:
+                    response = self.session.request(method, self.base_url + path, headers=headers,
+                                                    timeout=self.timeout, **kwargs)
+                except requests.ConnectionError:
+                    if retries >= self.max_retries:
+                        raise
+                    self.sleep(self._delay(retries))
+                    retries += 1
+                    continue
+                if response.status_code == 401 and not refreshed:
+                    self.access_token(force_refresh=True)
+                    refreshed = True
+                    continue
+                if response.status_code in RETRY_STATUSES and retries < self.max_retries:
+                    self.sleep(self._delay(retries, response))
+                    retries += 1
+                    continue
+                if response.status_code >= 400:
+                    raise SpotifyError(response.status_code, response.text)
+                self._record(name, self.clock() - start, retries, True)
+                return response.json() if response.content else None
+        except Exception:
+            self._record(name, self.clock() - start, retries, False)
+            raise
+
+    # Playback state
+
+    def now_playing(self, max_age=None):
+        # Returns {'artist', 'album', 'title', 'is_playing'} or None when nothing is playing.
+        max_age = self.ttl if max_age is None else max_age
+        with self._state_lock:
+            if self._state_time is not None and self.clock() - self._state_time <= max_age:
+                return self._state
+        data = self.request('GET', 'me/player/currently-playing', name='now_playing')
+        state = None
+        if data and data.get('item'):
+            item = data['item']
+            state = {
+                'artist': item['artists'][0]['name'],
+                'album': item['album']['name'],
+                'title': item['name'],
+                'is_playing': data.get('is_playing', False),
+            }
+        with self._state_lock:
+            self._state = state
+            self._state_time = self.clock()
+        return state
+
+    def invalidate(self):
+        with self._state_lock:
+            self._state_time = None
+
+    def _command(self, name, method, path, update):
+        # `update(state)` returns the state the command should lead to, or None
+        # when it can't be predicted (a new track), which just drops the cache.
+        with self._state_lock:
+            previous = (self._state, self._state_time)
+            predicted = update(dict(self._state)) if self._state else None
+            if predicted is None:
+                self._state_time = None
+            else:
+                self._state = predicted
+                self._state_time = self.clock()
+
+        def send():
+            try:
+                return self.request(method, path, name=name)
+            except Exception:
+                with self._state_lock:
+                    if self._state is predicted:
+                        self._state, self._state_time = previous
+                raise
+
+        return self._commands.submit(send)
+
+    def play(self):
+        return self._command('play', 'PUT', 'me/player/play', lambda state: dict(state, is_playing=True))
+
+    def pause(self):
+        return self._command('pause', 'PUT', 'me/player/pause', lambda state: dict(state, is_playing=False))
+
+    def next_track(self):
+        return self._command('next', 'POST', 'me/player/next', lambda state: None)
+
+    def previous_track(self):
+        return self._command('previous', 'POST', 'me/player/previous', lambda state: None)
+
+    def stats(self):
+        stats = {}
+        for name, metric in self.metrics.items():
+            latency = sorted(metric['latency'])
+            stats[name] = {
+                'calls': metric['calls'],
+                'errors': metric['errors'],
+                'retries': metric['retries'],
+                'p50': latency[len(latency) // 2] if latency else None,
+                'max': latency[-1] if latency else None,
+            }
+        return stats
+
+    def close(self):
+        self._commands.shutdown(wait=True)
+        self.session.close()
@@ -0,0 +1,131 @@
+# core/startup.py
+
+import sys
+import time
+import importlib
+import threading
+from contextlib import contextmanager
+from concurrent.futures import Future, TimeoutError
+
+class StartupProfiler:
+    # Records how long each startup phase took, whichever thread ran it, so
+    # --profile_startup can show what stands between launch and listening.
+    def __init__(self, clock=time.perf_counter):
+        self.clock = clock
+        self.started = clock()
+        self.phases = []
+        self.marks = []
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def phase(self, name):
+        start = self.clock()
+        error = None
+        try:
+            yield
+        except Exception as e:
+            error = e
+            raise
+        finally:
+            with self._lock:
+                self.phases.append({
+                    'name': name,
+                    'thread': threading.current_thread().name,
+                    'start': start - self.started,
+                    'duration': self.clock() - start,
+                    'error': None if error is None else repr(error),
+                })
+
+    def mark(self, name):
+        with self._lock:
+            self.marks.append((name, self.clock() - self.started))
+
+    def report(self):
+        with self._lock:
+            phases = sorted(self.phases, key=lambda phase: phase['start'])
+            marks = list(self.marks)
+        lines = ["Startup profile:"]
+        for phase in phases:
+            line = f"  {phase['name']:<20} {phase['duration'] * 1000:8.1f} ms  (at {phase['start'] * 1000:.1f} ms, {phase['thread']})"
+            if phase['error']:
+                line += f"  failed: {phase['error']}"
+            lines.append(line)
+        for name, at in marks:
+            lines.append(f"  {name:<20} at {at * 1000:.1f} ms")
+        return "\n".join(lines)
+
+class LazyModule:
+    # Stands in for a module and imports it on first attribute access, so a slow
+    # import (or one with side effects, like Spotify OAuth) costs nothing until
+    # the module is actually used. A failed import is retried on the next access.
+    def __init__(self, name):
+        self._lazy_name = name
+        self._lazy_module = None
+        self._lazy_lock = threading.Lock()
+
+    def _lazy_load(self):
+        if self._lazy_module is None:
+            with self._lazy_lock:
+                if self._lazy_module is None:
+                    self._lazy_module = importlib.import_module(self._lazy_name)
+        return self._lazy_module
+
+    def __getattr__(self, attr):
+        return getattr(self._lazy_load(), attr)
+
+    def __repr__(self):
+        state = "loaded" if self._lazy_module is not None else "not loaded"
+        return f"<lazy module {self._lazy_name!r} ({state})>"
+
+def lazy_import(name):
+    if name in sys.modules:
+        return sys.modules[name]
+    return LazyModule(name)
+
+def preload(*modules):
+    # Forces lazy modules to load; plain modules are left alone.
+    for module in modules:
+        if isinstance(module, LazyModule):
+            module._lazy_load()
+
+class Warmup:
+    # Runs warm-up tasks on background threads, each recorded as a profiler phase.
+    # A failing task is reported, not raised; whoever needs the resource retries.
+    def __init__(self, profiler=None):
+        self.profiler = profiler
+        self._tasks = {}
+
+    def start(self, name, fn, *args):
+        future = Future()
+        self._tasks[name] = future
+
+        def run():
+            future.set_running_or_notify_cancel()
+            try:
+                if self.profiler is not None:
+                    with self.profiler.phase(name):
+                        result = fn(*args)
+                else:
+                    result = fn(*args)
+            except Exception as e:
+                print(f"Warm-up {name} failed: {e}")
+                future.set_exception(e)
+            else:
+                future.set_result(result)
+
+        threading.Thread(target=run, name=f"warmup-{name}", daemon=True).start()
+        return future
+
+    def result(self, name, timeout=None):
+        return self._tasks[name].result(timeout)
+
+    def wait(self, timeout=None):
+        # Returns whether every task has finished, successfully or not.
+        deadline = None if timeout is None else time.monotonic() + timeout
+        for future in list(self._tasks.values()):
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                future.exception(remaining)
+            except TimeoutError:
+                return False
+        return True
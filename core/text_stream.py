@@ -0,0 +1,74 @@
+# core/text_stream.py
+
+import re
+
+# A sentence ends at . ! or ? (plus any closing quotes/brackets) followed by whitespace.
+SENTENCE_END = re.compile(r'[.!?]+["\')\]]*\s+')
+
+class SentenceSplitter:
+    # Turns streamed text deltas into speakable sentences. Everything after the
+    # command marker is kept in `text` but never spoken.
+    def __init__(self, command_marker='#', min_length=20):
+        self.command_marker = command_marker
+        self.min_length = min_length
+        self.text = ''
+        self._buffer = ''
+        self._pending = ''
+        self._stopped = False
+
+    @property
+    def speech(self):
+        return self.text.split(self.command_marker)[0]
+
+    def feed(self, delta):
+        self.text += delta
+        if self._stopped:
+            return []
+        self._buffer += delta
+
+        marker_index = self._buffer.find(self.command_marker)
+        if marker_index != -1:
+            self._stopped = True
+            head, self._buffer = self._buffer[:marker_index], ''
+            return self._group(self._split(head), final=True)
+
+        last_end = None
+        for last_end in SENTENCE_END.finditer(self._buffer):
+            pass
+        if last_end is None:
+            return []
+        head, rest = self._buffer[:last_end.end()], self._buffer[last_end.end():]
+        sentences = self._group(self._split(head), final=False)
+        self._buffer = self._pending + rest
+        return sentences
+
+    def flush(self):
+        if self._stopped:
+            return []
+        self._stopped = True
+        head, self._buffer = self._buffer, ''
+        return self._group(self._split(head), final=True)
+
+    def _split(self, text):
+        parts, start = [], 0
+        for match in SENTENCE_END.finditer(text):
+            parts.append(text[start:match.end()])
+            start = match.end()
+        if start < len(text):
+            parts.append(text[start:])
+        return parts
+
+    def _group(self, parts, final):
+        # Merge short fragments so TTS isn't called for every "Sure." on its own.
+        sentences, current = [], ''
+        for part in parts:
+            current += part
+            if len(current.strip()) >= self.min_length:
+                sentences.append(current.strip())
+                current = ''
+        if final:
+            if current.strip():
+                sentences.append(current.strip())
+            current = ''
+        self._pending = current
+        return sentences
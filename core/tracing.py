@@ -0,0 +1,253 @@
+# core/tracing.py
+
+import json
+import time
+import functools
+import itertools
+import threading
+import contextvars
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+QUANTILES = (0.5, 0.95, 0.99)
+
+_current = contextvars.ContextVar('trace', default=None)
+_ids = itertools.count(1)
+
+class _NullContext:
+    # Returned by span()/activate() when tracing is off, so an instrumented call
+    # costs one attribute check and a shared no-op `with`.
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+_NULL = _NullContext()
+
+class Histogram:
+    # Rolling window of the last `window` observations for quantiles, plus
+    # all-time count and sum.
+    def __init__(self, window=1000):
+        self.values = deque(maxlen=window)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value):
+        self.values.append(value)
+        self.count += 1
+        self.sum += value
+
+    def quantile(self, q):
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        return ordered[min(len(ordered) - 1, int(q * len(ordered)))]
+
+    def summary(self):
+        return {f"p{int(q * 100)}": self.quantile(q) for q in QUANTILES}
+
+class Trace:
+    # One conversation turn: the spans recorded while it was active.
+    def __init__(self):
+        self.id = next(_ids)
+        self.start = None
+        self.spans = []
+        self.breakdown = {}
+        self.finished = False
+
+class _Span:
+    def __init__(self, tracer, name, attrs):
+        self.tracer = tracer
+        self.name = name
+        self.attrs = attrs
+
+    def __enter__(self):
+        self.start_wall = time.time()
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        duration = time.perf_counter() - self.start
+        if exc_type is not None:
+            self.attrs['error'] = exc_type.__name__
+        self.tracer._record(self.name, self.start_wall, duration, self.attrs)
+        return False
+
+class Tracer:
+    # Spans around pipeline stages, grouped per turn. Each finished span feeds a
+    # rolling histogram (p50/p95/p99) and, with `jsonl_path`, one JSON line; each
+    # finished turn writes its per-stage latency breakdown. serve() exposes the
+    # histograms in Prometheus text format. Disabled by default.
+    def __init__(self, enabled=False, jsonl_path=None, window=1000):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        self.window = window
+        self.histograms = {}
+        self._lock = threading.Lock()
+        self._server = None
+
+    def configure(self, enabled=True, jsonl_path=None, window=None):
+        self.enabled = enabled
+        self.jsonl_path = jsonl_path
+        if window is not None:
+            self.window = window
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+
+    def span(self, name, **attrs):
+        if not self.enabled:
+            return _NULL
+        return _Span(self, name, attrs)
+
+    def traced(self, name):
+        # Decorator form of span().
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, name, {}):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def observe(self, name, seconds, **attrs):
+        # Records a duration measured elsewhere (e.g. time to first token) as a span.
+        if self.enabled:
+            self._record(name, time.time() - seconds, seconds, attrs)
+
+    def start_trace(self):
+        return Trace() if self.enabled else None
+
+    def activate(self, trace):
+        # Makes `trace` the current turn for this thread or task.
+        if trace is None:
+            return _NULL
+        return _Activation(trace)
+
+    def current(self):
+        return _current.get()
+
+    def turn(self):
+        # Starts a turn, makes it current and finishes it on exit.
+        if not self.enabled:
+            return _NULL
+        return _Turn(self)
+
+    def _record(self, name, start_wall, duration, attrs):
+        trace = _current.get()
+        with self._lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = Histogram(self.window)
+            histogram.observe(duration)
+            if trace is not None and not trace.finished:
+                if trace.start is None:
+                    trace.start = start_wall
+                trace.spans.append(name)
+                trace.breakdown[name] = trace.breakdown.get(name, 0.0) + duration
+        self._write({
+            'type': 'span',
+            'trace': trace.id if trace is not None else None,
+            'name': name,
+            'start': start_wall,
+            'duration_ms': duration * 1000,
+            'attrs': attrs,
+        })
+
+    def finish(self, trace):
+        if trace is None or trace.finished:
+            return
+        with self._lock:
+            trace.finished = True
+            if trace.start is None:
+                return
+            total = time.time() - trace.start
+            histogram = self.histograms.get('turn')
+            if histogram is None:
+                histogram = self.histograms['turn'] = Histogram(self.window)
+            histogram.observe(total)
+        self._write({
+            'type': 'turn',
+            'trace': trace.id,
+            'start': trace.start,
+            'total_ms': total * 1000,
+            'breakdown_ms': {name: duration * 1000 for name, duration in trace.breakdown.items()},
+        })
+
+    def _write(self, record):
+        if self.jsonl_path:
+            line = json.dumps(record) + '\n'
+            with self._lock:
+                with open(self.jsonl_path, 'a') as file:
+                    file.write(line)
+
+    def summary(self):
+        with self._lock:
+            return {name: dict(histogram.summary(), count=histogram.count, sum=histogram.sum)
+                    for name, histogram in self.histograms.items()}
+
+    def prometheus_text(self, prefix='jarvis'):
+        lines = [f"# TYPE {prefix}_latency_seconds summary"]
+        with self._lock:
+            for name, histogram in sorted(self.histograms.items()):
+                for q in QUANTILES:
+                    value = histogram.quantile(q)
+                    if value is not None:
+                        lines.append(f'{prefix}_latency_seconds{{span="{name}",quantile="{q}"}} {value:.6f}')
+                lines.append(f'{prefix}_latency_seconds_sum{{span="{name}"}} {histogram.sum:.6f}')
+                lines.append(f'{prefix}_latency_seconds_count{{span="{name}"}} {histogram.count}')
+        return "\n".join(lines) + "\n"
+
+    def serve(self, port, host='127.0.0.1'):
+        # Serves prometheus_text() at /metrics on a daemon thread; returns the server.
+        tracer = self
+
+        class MetricsHandler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                if self.path != '/metrics':
+                    self.send_response(404)
+                    self.end_headers()
+                    return
+                body = tracer.prometheus_text().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        self._server = ThreadingHTTPServer((host, port), MetricsHandler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return self._server
+
+class _Activation:
+    def __init__(self, trace):
+        self.trace = trace
+
+    def __enter__(self):
+        self.token = _current.set(self.trace)
+        return self.trace
+
+    def __exit__(self, *exc):
+        _current.reset(self.token)
+        return False
+
+class _Turn(_Activation):
+    def __init__(self, tracer):
+        super().__init__(Trace())
+        self.tracer = tracer
+
+    def __exit__(self, *exc):
+        super().__exit__(*exc)
+        self.tracer.finish(self.trace)
+        return False
+
+# Shared tracer; jarvis turns it on with --trace / --metrics_port.
+tracer = Tracer()
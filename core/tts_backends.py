@@ -0,0 +1,172 @@
+# core/tts_backends.py
+
+import os
+import abc
+import time
+import threading
+import importlib.util
+
+class TTSBackend(abc.ABC):
+    # A speech engine: render(text, path) writes the audio for `text` to `path`.
+    # (model, voice) is what the TTS cache keys clips by, next to the text.
+    name = None
+    model = None
+    voice = None
+    extension = '.mp3'
+
+    def available(self):
+        return True
+
+    @abc.abstractmethod
+    def render(self, text, path):
+        pass
+
+class OpenAITTSBackend(TTSBackend):
+    name = 'remote'
+    extension = '.mp3'
+
+    def __init__(self, get_client, model='tts-1', voice='echo'):
+        self.get_client = get_client
+        self.model = model
+        self.voice = voice
+
+    def render(self, text, path):
+        response = self.get_client().audio.speech.create(model=self.model, voice=self.voice, input=text)
+        response.stream_to_file(path)
+
+class Pyttsx3Backend(TTSBackend):
+    # Offline speech through pyttsx3 (espeak, SAPI5 or NSSpeechSynthesizer). The
+    # engine isn't thread-safe, so renders are serialized.
+    name = 'local'
+    model = 'pyttsx3'
+    extension = '.wav'
+
+    def __init__(self, voice=None, rate=None, engine_factory=None):
+        self.voice = voice
+        self.rate = rate
+        self.engine_factory = engine_factory
+        self._engine = None
+        self._available = None
+        self._lock = threading.Lock()
+
+    def available(self):
+        if self.engine_factory is not None:
+            return True
+        if self._available is None:
+            self._available = importlib.util.find_spec('pyttsx3') is not None
+        return self._available
+
+    def _get_engine(self):
+        if self._engine is None:
+            if self.engine_factory is not None:
+                engine = self.engine_factory()
+            else:
+                import pyttsx3
+                engine = pyttsx3.init()
+            if self.voice is not None:
+                engine.setProperty('voice', self.voice)
+            if self.rate is not None:
+                engine.setProperty('rate', self.rate)
+            self._engine = engine
+        return self._engine
+
+    def render(self, text, path):
+        # Some drivers pick the output format from the file name, so render to a
+        # name with the right extension and move it into place.
+        tmp_path = path + self.extension
+        with self._lock:
+            engine = self._get_engine()
+            engine.save_to_file(text, tmp_path)
+            engine.runAndWait()
+        os.replace(tmp_path, path)
+
+class TTSSelector:
+    # Picks a backend per reply. System prompts go to the local engine and
+    # replies go to the remote one, unless the preferred backend is unhealthy:
+    # it failed within the last `retry_after` seconds or, for the remote one,
+    # its smoothed render latency is above `latency_threshold`. A render that
+    # fails falls back to the other backend.
+    def __init__(self, remote, local=None, latency_threshold=2.0, smoothing=0.3,
+                 retry_after=30.0, clock=time.monotonic):
+        self.remote = remote
+        self.local = local
+        self.latency_threshold = latency_threshold
+        self.smoothing = smoothing
+        self.retry_after = retry_after
+        self.clock = clock
+        self.latency = {}
+        self.renders = {}
+        self.failures = {}
+        self._failed_at = {}
+        self._slow_since = None
+        self._lock = threading.Lock()
+
+    def _local_usable(self):
+        return self.local is not None and self.local.available()
+
+    def healthy(self, backend):
+        with self._lock:
+            failed_at = self._failed_at.get(backend.name)
+            if failed_at is not None and self.clock() - failed_at < self.retry_after:
+                return False
+            if backend is self.remote and self._slow_since is not None:
+                # Give the remote backend another try every `retry_after` seconds.
+                if self.clock() - self._slow_since < self.retry_after:
+                    return False
+                self._slow_since = None
+                self.latency.pop(backend.name, None)
+            return True
+
+    def choose(self, system=False):
+        if not self._local_usable():
+            return self.remote
+        preferred, other = self.remote, self.local
+        if system:
+            preferred, other = self.local, self.remote
+        if not self.healthy(preferred) and self.healthy(other):
+            return other
+        return preferred
+
+    def record(self, backend, elapsed, ok=True):
+        with self._lock:
+            name = backend.name
+            if not ok:
+                self.failures[name] = self.failures.get(name, 0) + 1
+                self._failed_at[name] = self.clock()
+                return
+            self.renders[name] = self.renders.get(name, 0) + 1
+            self._failed_at.pop(name, None)
+            previous = self.latency.get(name)
+            latency = elapsed if previous is None else previous + self.smoothing * (elapsed - previous)
+            self.latency[name] = latency
+            if backend is self.remote and latency > self.latency_threshold:
+                self._slow_since = self.clock()
+
+    def synthesize(self, text, caches, system=False, backend=None):
+        # `caches` maps backend name -> TTSCache; returns the path of the clip.
+        # `backend` is the one chosen for the whole reply, so its sentences
+        # share a voice; without it one is chosen for `text` alone. A clip the
+        # remote voice already rendered is always reused.
+        cached = caches[self.remote.name].get(self.remote.model, self.remote.voice, text)
+        if cached is not None:
+            caches[self.remote.name].hits += 1
+            return cached
+        backend = backend or self.choose(system)
+        backends = [backend]
+        if self._local_usable():
+            backends.append(self.local if backend is self.remote else self.remote)
+        for i, backend in enumerate(backends):
+            cache = caches[backend.name]
+            start = self.clock()
+            misses = cache.misses
+            try:
+                path = cache.get_or_render(backend.model, backend.voice, text, backend.render)
+            except Exception as e:
+                self.record(backend, self.clock() - start, ok=False)
+                if i + 1 == len(backends):
+                    raise
+                print(f"TTS backend {backend.name} failed, falling back: {e}")
+                continue
+            if cache.misses != misses:
+                self.record(backend, self.clock() - start)
+            return path
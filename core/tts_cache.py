@@ -0,0 +1,90 @@
+# core/tts_cache.py
+
+import os
+import hashlib
+import threading
+
+class TTSCache:
+    # Rendered speech keyed by (model, voice, text). File mtimes double as the
+    # LRU clock: hits touch the file and eviction removes the oldest first.
+    def __init__(self, cache_dir='tts_cache', max_bytes=50 * 1024 * 1024, extension='.mp3'):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.extension = extension
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def key(self, model, voice, text):
+        return hashlib.sha256(f"{model}\0{voice}\0{text}".encode('utf-8')).hexdigest()
+
+    def path_for(self, model, voice, text):
+        return os.path.join(self.cache_dir, self.key(model, voice, text) + self.extension)
+
+    def get(self, model, voice, text):
+        path = self.path_for(model, voice, text)
+        try:
+            os.utime(path)
+        except OSError:
+            return None
+        return path
+
+    def get_or_render(self, model, voice, text, render):
+        # `render(text, path)` writes the audio for `text` to `path`.
+        path = self.get(model, voice, text)
+        if path is not None:
+            self.hits += 1
+            return path
+        self.misses += 1
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.path_for(model, voice, text)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            render(text, tmp_path)
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict(keep=path)
+        return path
+
+    def warm_up(self, model, voice, texts, render):
+        rendered = 0
+        for text in texts:
+            if self.get(model, voice, text) is None:
+                self.get_or_render(model, voice, text, render)
+                rendered += 1
+        return rendered
+
+    def size(self):
+        return sum(size for _, _, size in self._entries())
+
+    def _entries(self):
+        entries = []
+        if not os.path.isdir(self.cache_dir):
+            return entries
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(self.extension):
+                continue
+            path = os.path.join(self.cache_dir, name)
+            try:
+                stat = os.stat(path)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime_ns, path, stat.st_size))
+        return entries
+
+    def evict(self, keep=None):
+        with self._lock:
+            entries = sorted(self._entries())
+            total = sum(size for _, _, size in entries)
+            for _, path, size in entries:
+                if total <= self.max_bytes:
+                    break
+                if path == keep:
+                    continue
+                try:
+                    os.remove(path)
+                except OSError:
+                    continue
+                total -= size
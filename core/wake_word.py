@@ -0,0 +1,157 @@
+# core/wake_word.py
+
+import os
+import sys
+import glob
+import time
+import wave
+import numpy as np
+from scipy.fft import dct
+from core.startup import lazy_import
+
+sF = lazy_import('pyAudioAnalysis.ShortTermFeatures')
+
+FRAME_SECONDS = 0.025
+STEP_SECONDS = 0.010
+NUM_MFCC = 13
+INT16_SCALE = 32768.0
+
+_filter_banks = {}
+
+def read_wav(path):
+    with wave.open(path, 'rb') as wf:
+        sample_rate = wf.getframerate()
+        channels = wf.getnchannels()
+        samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+    if channels > 1:
+        samples = samples.reshape(-1, channels).mean(axis=1)
+    return samples.astype(np.float32) / INT16_SCALE, sample_rate
+
+def load_wav_dir(directory):
+    return [read_wav(path) for path in sorted(glob.glob(os.path.join(directory, '*.wav')))]
+
+def filter_banks(sample_rate, num_fft):
+    key = (sample_rate, num_fft)
+    if key not in _filter_banks:
+        _filter_banks[key] = sF.mfcc_filter_banks(sample_rate, num_fft)[0]
+    return _filter_banks[key]
+
+def mfcc_frames(samples, sample_rate, max_seconds=None):
+    # (frames, 13) MFCCs with per-utterance mean and variance normalization, so
+    # microphone and level differences don't move the distances. Uses the same
+    # filter banks as pyAudioAnalysis' feature_extraction, but computes only the
+    # MFCCs and does every frame at once.
+    samples = np.asarray(samples, dtype=np.float64)
+    if samples.ndim > 1:
+        samples = samples.mean(axis=1)
+    if max_seconds is not None:
+        samples = samples[:int(max_seconds * sample_rate)]
+    frame = int(FRAME_SECONDS * sample_rate)
+    step = int(STEP_SECONDS * sample_rate)
+    if len(samples) < frame:
+        return np.zeros((0, NUM_MFCC))
+    count = 1 + (len(samples) - frame) // step
+    frames = samples[np.arange(frame)[None, :] + step * np.arange(count)[:, None]]
+    num_fft = frame // 2
+    magnitude = np.abs(np.fft.rfft(frames, axis=1))[:, :num_fft] / num_fft
+    mfcc = dct(np.log10(magnitude @ filter_banks(sample_rate, num_fft).T + 1e-8), type=2, norm='ortho', axis=1)[:, :NUM_MFCC]
+    return (mfcc - mfcc.mean(axis=0)) / (mfcc.std(axis=0) + 1e-8)
+
+def subsequence_dtw(template, utterance):
+    # Cost of the best match of `template` anywhere inside `utterance`, per template
+    # frame. Each template frame advances the utterance by 0, 1 or 2 frames, so
+    # the spoken word may be up to twice as fast or slow as the template, and each
+    # row only depends on the previous one, which keeps the loop vectorized.
+    if len(utterance) == 0 or len(template) == 0:
+        return np.inf
+    cost = np.sqrt(np.maximum(
+        (template ** 2).sum(axis=1)[:, None] + (utterance ** 2).sum(axis=1)[None, :] - 2 * template @ utterance.T, 0))
+    total = cost[0].copy()
+    for row in cost[1:]:
+        best = total.copy()
+        best[1:] = np.minimum(best[1:], total[:-1])
+        best[2:] = np.minimum(best[2:], total[:-2])
+        total = row + best
+    return total.min() / len(template)
+
+class WakeWordDetector:
+    # Decides from raw audio whether an utterance contains the wake word, by
+    # matching its MFCCs against recorded templates of the word. Only the first
+    # `search_seconds` of an utterance are searched, which bounds the cost. With
+    # no explicit threshold, one is derived from how well the templates match
+    # each other; calibrate() picks a better one from labelled recordings.
+    def __init__(self, templates=(), threshold=None, search_seconds=4.0, margin=1.5):
+        self.search_seconds = search_seconds
+        self.margin = margin
+        self.templates = []
+        self.stats = {'calls': 0, 'accepted': 0, 'cpu_time': 0.0, 'audio_time': 0.0}
+        for samples, sample_rate in templates:
+            self.add_template(samples, sample_rate)
+        self.threshold = threshold if threshold is not None else self._template_threshold()
+
+    @classmethod
+    def from_directory(cls, directory, **kwargs):
+        return cls(load_wav_dir(directory), **kwargs)
+
+    def add_template(self, samples, sample_rate):
+        self.templates.append(mfcc_frames(samples, sample_rate))
+
+    def _template_threshold(self):
+        # Leave-one-out: the worst score a template gets against the others, plus a margin.
+        if len(self.templates) < 2:
+            return None
+        worst = max(min(subsequence_dtw(other, template) for other in self.templates if other is not template)
+                    for template in self.templates)
+        return worst * self.margin
+
+    def score(self, samples, sample_rate):
+        utterance = mfcc_frames(samples, sample_rate, self.search_seconds)
+        return min((subsequence_dtw(template, utterance) for template in self.templates), default=np.inf)
+
+    def detect(self, samples, sample_rate):
+        start = time.process_time()
+        detected = self.threshold is not None and self.score(samples, sample_rate) <= self.threshold
+        self.stats['calls'] += 1
+        self.stats['accepted'] += detected
+        self.stats['cpu_time'] += time.process_time() - start
+        self.stats['audio_time'] += len(samples) / sample_rate
+        return detected
+
+    def calibrate(self, positives, negatives):
+        # Chooses the threshold with the fewest false accepts plus false rejects.
+        positive_scores = sorted(self.score(samples, rate) for samples, rate in positives)
+        negative_scores = sorted(self.score(samples, rate) for samples, rate in negatives)
+        best = None
+        for threshold in positive_scores + negative_scores:
+            errors = sum(score > threshold for score in positive_scores) + sum(score <= threshold for score in negative_scores)
+            if best is None or errors < best[0]:
+                best = (errors, threshold)
+        if best is not None:
+            self.threshold = best[1]
+        return self.threshold
+
+def evaluate(detector, positives, negatives):
+    # False accept/reject rates and the CPU cost of the gate on labelled recordings.
+    start = time.process_time()
+    false_rejects = sum(not detector.detect(samples, rate) for samples, rate in positives)
+    false_accepts = sum(detector.detect(samples, rate) for samples, rate in negatives)
+    cpu_time = time.process_time() - start
+    utterances = len(positives) + len(negatives)
+    audio_time = sum(len(samples) / rate for samples, rate in list(positives) + list(negatives))
+    return {
+        'threshold': detector.threshold,
+        'false_reject_rate': false_rejects / len(positives) if positives else 0.0,
+        'false_accept_rate': false_accepts / len(negatives) if negatives else 0.0,
+        'cpu_ms_per_utterance': cpu_time * 1000 / utterances if utterances else 0.0,
+        'realtime_factor': cpu_time / audio_time if audio_time else 0.0,
+        # Share of utterances that would still go on to Whisper
+        'transcribed_share': (len(positives) - false_rejects + false_accepts) / utterances if utterances else 0.0,
+    }
+
+if __name__ == '__main__':
+    # python -m core.wake_word TEMPLATES_DIR POSITIVES_DIR NEGATIVES_DIR
+    templates_dir, positives_dir, negatives_dir = sys.argv[1:4]
+    detector = WakeWordDetector.from_directory(templates_dir)
+    report = evaluate(detector, load_wav_dir(positives_dir), load_wav_dir(negatives_dir))
+    for name, value in report.items():
+        print(f"{name}: {value:.4f}" if isinstance(value, float) else f"{name}: {value}")
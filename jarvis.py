@@ -1,73 +1,400 @@
 # jarvis.py
 
-from RealtimeSTT import AudioToTextRecorder
+import argparse
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 import assist
 import tools
 import core.speech_recognition as sr_core
 import core.code_management as cm
+from core.pipeline import Pipeline
+from core.intent_router import IntentRouter
+from core.startup import StartupProfiler, Warmup
+from core.wake_word import WakeWordDetector
+from core.tracing import tracer
+from core.sessions import SessionPool
+from core.server import AssistantServer
+
+HOT_WORDS = ["jarvis"]
+
+# Fixed prompts that can be pre-rendered into the TTS cache with --warm_tts
+KNOWN_PROMPTS = [
+    "I don't recognize your voice. What is your name?",
+    "Please describe what the code should do.",
+    "Which file should I update?",
+    "What should be the name of the new file?",
+    "Which file should I check?",
+    "Do you want to fix these errors?",
+]
+
+def parse_args():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--archive_audio", action="store_true",
+                        help="Also save each hot-word utterance to current_speaker.wav.")
+    parser.add_argument("--stream", action="store_true",
+                        help="Stream assistant replies and speak them sentence by sentence.")
+    parser.add_argument("--warm_tts", action="store_true",
+                        help="Pre-render known prompts into the TTS cache at startup.")
+    parser.add_argument("--barge_in", action="store_true",
+                        help="Keep listening while Jarvis talks and stop speaking when the user starts talking.")
+    parser.add_argument("--pipeline", action="store_true",
+                        help="Run the conversation as an asyncio pipeline that keeps listening during replies.")
+    parser.add_argument("--intent_log", default=None,
+                        help="Append each local/remote routing decision to this JSONL file.")
+    parser.add_argument("--wake_word_templates", default=None,
+                        help="Directory of WAV recordings of the hot word; only utterances that match one are transcribed.")
+    parser.add_argument("--wake_word_threshold", type=float, default=None,
+                        help="Match threshold for --wake_word_templates (default: derived from the templates).")
+    parser.add_argument("--trace", default=None,
+                        help="Record per-stage latency spans and per-turn breakdowns to this JSONL file.")
+    parser.add_argument("--metrics_port", type=int, default=None,
+                        help="Serve p50/p95/p99 stage latencies in Prometheus text format on this port (/metrics).")
+    parser.add_argument("--serve", type=int, default=None, metavar="PORT",
+                        help="Run as a local HTTP server for several clients instead of listening on the microphone.")
+    parser.add_argument("--max_sessions", type=int, default=32,
+                        help="With --serve, how many per-speaker assistant threads to keep open.")
+    parser.add_argument("--profile_startup", "--profile-startup", action="store_true",
+                        help="Print how long each startup phase took.")
+    return parser.parse_args()
+
+def has_hot_word(text):
+    return any(hot_word in text.lower() for hot_word in HOT_WORDS)
+
+def load_wake_word(args):
+    if not args.wake_word_templates:
+        return None
+    detector = WakeWordDetector.from_directory(args.wake_word_templates, threshold=args.wake_word_threshold)
+    if detector.threshold is None:
+        print("Wake word gate disabled: it needs at least two templates or --wake_word_threshold.")
+        return None
+    return detector
+
+def listen(recorder, wake_word=None, expect_reply=False):
+    # With a wake word gate, Whisper only runs on utterances that contain the hot
+    # word, or when the last reply asked a question.
+    recorder.wait_audio()
+    if wake_word is not None and not expect_reply:
+        with tracer.span("wake_word"):
+            if not wake_word.detect(recorder.audio, recorder.sample_rate):
+                return ""
+    with tracer.span("stt"):
+        return recorder.transcribe()
+
+def enroll_new_speaker(recorder, speaker_audio, sample_rate):
+    assist.TTS("I don't recognize your voice. What is your name?", system=True)
+    speaker_name = recorder.text().strip()
+    sr_core.enroll_speaker(speaker_name, speaker_audio, sample_rate)
+    assist.TTS(f"Nice to meet you, {speaker_name}!")
+    return speaker_name
+
+def update_code(text, recorder, wait=True):
+    assist.TTS("Please describe what the code should do.", system=True)
+    description = recorder.text()
+    assist.TTS("Which file should I update?", system=True)
+    filename = recorder.text().strip()
+    result = cm.update_code(description, filename)
+    assist.TTS(result, wait=wait)
+
+def create_file(text, recorder, wait=True):
+    assist.TTS("Please describe what the code should do.", system=True)
+    description = recorder.text()
+    assist.TTS("What should be the name of the new file?", system=True)
+    filename = recorder.text().strip()
+    result = cm.create_file(description, filename)
+    assist.TTS(result, wait=wait)
+
+def check_errors(text, recorder, wait=True):
+    if "project" in text.lower():
+        results = cm.check_and_fix_project(recorder)
+    else:
+        assist.TTS("Which file should I check?", system=True)
+        filename = recorder.text().strip()
+        results = cm.check_and_fix_file(filename, recorder)
+    assist.TTS(results, wait=wait)
+
+def music_command(command):
+    def handler(text, recorder, wait=True):
+        tools.parse_command(command)
+    return handler
+
+def music_pattern(words):
+    # The whole utterance must be the command (after an optional "hey jarvis"),
+    # so questions that merely mention "skip" or "go back" reach the assistant.
+    return rf"^\W*(hey\W+)?(jarvis\W+)?((can|could)\W+you\W+)?(please\W+)?({words})(\W+please)?\W*$"
+
+def build_intent_router(log_file=None):
+    # Utterances matched here are handled locally; everything else goes to the assistant.
+    router = IntentRouter(log_file=log_file)
+    router.add("update_code", r"(?=.*\bupdate\b)(?=.*\bcode\b)", update_code)
+    router.add("create_file", r"(?=.*\bcreate\b)(?=.*\bfile\b)", create_file)
+    router.add("check_errors", r"(?=.*\bcheck\b)(?=.*\berrors\b)", check_errors)
+    router.add("pause", music_pattern(r"pause(\W+the\W+music)?|stop\W+the\W+music"), music_command("pause"))
+    router.add("skip", music_pattern(r"skip(\W+(this|the)\W+(song|track))?|next(\W+(song|track))?"), music_command("skip"))
+    router.add("previous", music_pattern(r"previous(\W+(song|track))?|go\W+back(\W+a\W+(song|track))?"),
+               music_command("previous"))
+    # Only bare "play"/"resume" requests; "play something by ..." needs the assistant.
+    router.add("play", music_pattern(r"(play|resume)(\W+(the\W+)?music)?"), music_command("play"))
+    return router
+
+def speak_response(response, args):
+    print(response)
+    speech = response.split('#')[0]
+    assist.TTS(speech, wait=not args.barge_in)
+
+def ask_and_speak(text, args):
+    if args.stream:
+        response = assist.stream_TTS(text, wait=not args.barge_in)
+        print(response)
+    else:
+        response = assist.ask_question_memory(text)
+        speak_response(response, args)
+    return response
+
+def run_response_command(response):
+    # Runs the #command suffix, if any; returns whether the next turn may skip the hot word.
+    if len(response.split('#')) > 1:
+        command = response.split('#')[1]
+        tools.parse_command(command)
+    return True if "?" in response else False
+
+class CaptureGuard:
+    # Without barge-in the pipeline keeps capturing while Jarvis talks, so his own
+    # prompts reach the microphone. The recorder reports when it starts recording
+    # (RealtimeSTT's on_recording_start); an utterance is Jarvis' echo when
+    # playback was busy at any point since.
+    def __init__(self):
+        self.started = None
+
+    def recording_started(self):
+        self.started = time.monotonic()
+
+    def overlaps_speech(self, playback):
+        started, self.started = self.started, None
+        if playback is None:
+            return False
+        if started is None:
+            return playback.is_playing()
+        return playback.played_since(started)
+
+capture_guard = CaptureGuard()
+
+class Turn:
+    def __init__(self, audio, sample_rate):
+        self.audio = audio
+        self.sample_rate = sample_rate
+        self.text = None
+        self.transcribed = asyncio.Event()
+        self.speaker_task = None
+        self.route = None
+        self.response_task = None
+        self.trace = tracer.start_trace()
+
+class PipelineListener:
+    # Stands in for the recorder inside a turn: prompts such as "Which file should I
+    # update?" wait for the next transcribed utterance instead of competing with the
+    # capture stage for the microphone.
+    def __init__(self, loop):
+        self.loop = loop
+        self._reply = None
+
+    async def listen(self):
+        self._reply = self.loop.create_future()
+        return await self._reply
+
+    def waiting(self):
+        return self._reply is not None and not self._reply.done()
+
+    def offer(self, text):
+        if self._reply is None or self._reply.done():
+            return False
+        self._reply.set_result(text)
+        self._reply = None
+        return True
+
+    def text(self):
+        # Called from executor threads, like recorder.text().
+        return asyncio.run_coroutine_threadsafe(self.listen(), self.loop).result()
+
+async def run_pipeline(args, recorder, router, wake_word=None):
+    # capture -> transcribe -> identify speaker -> dispatch intent -> respond.
+    # Speaker recognition and the assistant request run at the same time, and the
+    # capture stage keeps accepting speech while a reply is in flight.
+    pipeline = Pipeline(maxsize=2, executor=ThreadPoolExecutor(max_workers=8))
+    listener = PipelineListener(asyncio.get_running_loop())
+    state = {"skip_hot_word_check": False}
+
+    async def capture():
+        # recorder.transcribe() reads recorder.audio, so the next capture waits until
+        # the transcribe stage has taken the current utterance.
+        while True:
+            await pipeline.run_blocking(recorder.wait_audio)
+            if not args.barge_in and capture_guard.overlaps_speech(assist.playback):
+                continue
+            turn = Turn(recorder.audio, recorder.sample_rate)
+            yield turn
+            await turn.transcribed.wait()
+
+    async def transcribe_stage(turn):
+        try:
+            if wake_word is not None and not listener.waiting() and not state["skip_hot_word_check"]:
+                with tracer.span("wake_word"):
+                    detected = await pipeline.run_blocking(wake_word.detect, turn.audio, turn.sample_rate)
+                if not detected:
+                    return None
+            with tracer.span("stt"):
+                turn.text = await pipeline.run_blocking(recorder.transcribe)
+        finally:
+            turn.transcribed.set()
+        print(turn.text)
+        if listener.offer(turn.text):
+            return None
+        if not turn.text or not (has_hot_word(turn.text) or state["skip_hot_word_check"]):
+            return None
+        print("User: " + turn.text)
+        turn.text = turn.text + " "
+        return turn
+
+    async def identify_stage(turn):
+        if args.archive_audio:
+            sr_core.save_audio_to_wav(turn.audio, "current_speaker.wav", turn.sample_rate)
+        turn.speaker_task = asyncio.ensure_future(
+            pipeline.run_blocking(sr_core.recognize_speaker, turn.audio, turn.sample_rate))
+        return turn
+
+    async def dispatch_stage(turn):
+        with tracer.span("intent"):
+            turn.route = router.route(turn.text)
+        if turn.route is None and not args.stream:
+            turn.response_task = asyncio.ensure_future(
+                pipeline.run_blocking(assist.ask_question_memory, turn.text))
+        return turn
+
+    async def respond_stage(turn):
+        speaker_name = await turn.speaker_task
+        if not speaker_name:
+            await pipeline.run_blocking(enroll_new_speaker, listener, turn.audio, turn.sample_rate)
+
+        if turn.route is not None:
+            await pipeline.run_blocking(turn.route.handler, turn.text, listener, not args.barge_in)
+            state["skip_hot_word_check"] = False
+            return turn
+        if turn.response_task is None:
+            response = await pipeline.run_blocking(ask_and_speak, turn.text, args)
+        else:
+            response = await turn.response_task
+            await pipeline.run_blocking(speak_response, response, args)
+        state["skip_hot_word_check"] = await pipeline.run_blocking(run_response_command, response)
+        return turn
+
+    pipeline.add_stage("transcribe", transcribe_stage)
+    pipeline.add_stage("identify", identify_stage)
+    pipeline.add_stage("dispatch", dispatch_stage)
+    pipeline.add_stage("respond", respond_stage)
+    await pipeline.run(capture())
+
+def create_recorder(args):
+    # RealtimeSTT pulls in torch and loads the Whisper model, so it is imported here
+    # rather than at module level.
+    from RealtimeSTT import AudioToTextRecorder
+    # With barge-in, any detected speech cuts off playback immediately; otherwise
+    # the pipeline drops what was recorded while Jarvis was talking.
+    on_recording_start = assist.stop_speaking if args.barge_in else capture_guard.recording_started
+    return AudioToTextRecorder(spinner=False, model="tiny.en", language="en", post_speech_silence_duration=0.5, silero_sensitivity=0.3,
+                               on_recording_start=on_recording_start)
+
+def start_warm_up(args, profiler):
+    # Everything that isn't needed to hear the first utterance loads in the background
+    # while the speech model starts; each resource is still created on first use if
+    # its warm-up hasn't finished (or failed).
+    warmup = Warmup(profiler)
+    warmup.start("api clients", assist.warm_up_clients)
+    warmup.start("mixer", assist.get_playback)
+    warmup.start("speaker features", sr_core.warm_up)
+    warmup.start("tools", tools.warm_up)
+    if args.warm_tts:
+        warmup.start("tts cache", assist.warm_up_tts, KNOWN_PROMPTS)
+    return warmup
+
+def report_when_warm(warmup, profiler):
+    warmup.wait()
+    print(profiler.report())
+
+def serve(args):
+    # Every recognized speaker gets their own assistant thread instead of the shared one.
+    sessions = SessionPool(assist, max_sessions=args.max_sessions)
+    server = AssistantServer(sessions, recognize=sr_core.recognize_speaker, transcribe=assist.transcribe, port=args.serve)
+    print(f"Serving on http://127.0.0.1:{args.serve} (POST /turn)")
+    try:
+        server.serve_forever()
+    finally:
+        server.close()
 
 def main():
-    sr_core.load_environment()
+    profiler = StartupProfiler()
+    args = parse_args()
+    if args.trace or args.metrics_port:
+        tracer.configure(enabled=True, jsonl_path=args.trace)
+    if args.metrics_port:
+        tracer.serve(args.metrics_port)
+    with profiler.phase("environment"):
+        sr_core.load_environment()
+    warmup = start_warm_up(args, profiler)
+    if args.serve:
+        serve(args)
+        return
 
-    recorder = AudioToTextRecorder(spinner=False, model="tiny.en", language="en", post_speech_silence_duration=0.5, silero_sensitivity=0.3)
-    hot_words = ["jarvis"]
+    with profiler.phase("speech model"):
+        recorder = create_recorder(args)
+    with profiler.phase("intent router"):
+        router = build_intent_router(args.intent_log)
+    with profiler.phase("wake word"):
+        wake_word = load_wake_word(args)
+    profiler.mark("listening")
+    if args.profile_startup:
+        print(profiler.report())
+        threading.Thread(target=report_when_warm, args=(warmup, profiler), daemon=True).start()
     skip_hot_word_check = False
     print("Say something...")
 
+    if args.pipeline:
+        asyncio.run(run_pipeline(args, recorder, router, wake_word))
+        return
+
     while True:
-        current_text = recorder.text()
-        print(current_text)
-        if any(hot_word in current_text.lower() for hot_word in hot_words) or skip_hot_word_check:
-            if current_text:
-                print("User: " + current_text)
-                recorder.stop()
-                current_text = current_text + " "
-
-                # Save audio data to wav file
-                sr_core.save_audio_to_wav(recorder.audio, "current_speaker.wav", recorder.sample_rate)
-
-                # Recognize speaker
-                speaker_name = sr_core.recognize_speaker("current_speaker.wav")
-
-                if not speaker_name:
-                    assist.TTS("I don't recognize your voice. What is your name?")
-                    speaker_name = recorder.text().strip()
-                    sr_core.enroll_speaker(speaker_name, "current_speaker.wav")
-                    assist.TTS(f"Nice to meet you, {speaker_name}!")
-
-                if "update" in current_text.lower() and "code" in current_text.lower():
-                    assist.TTS("Please describe what the code should do.")
-                    description = recorder.text()
-                    assist.TTS("Which file should I update?")
-                    filename = recorder.text().strip()
-                    result = cm.update_code(description, filename)
-                    assist.TTS(result)
-                elif "create" in current_text.lower() and "file" in current_text.lower():
-                    assist.TTS("Please describe what the code should do.")
-                    description = recorder.text()
-                    assist.TTS("What should be the name of the new file?")
-                    filename = recorder.text().strip()
-                    result = cm.create_file(description, filename)
-                    assist.TTS(result)
-                elif "check" in current_text.lower() and "errors" in current_text.lower():
-                    if "project" in current_text.lower():
-                        results = cm.check_and_fix_project(recorder)
+        with tracer.turn():
+            current_text = listen(recorder, wake_word, skip_hot_word_check)
+            print(current_text)
+            if has_hot_word(current_text) or skip_hot_word_check:
+                if current_text:
+                    print("User: " + current_text)
+                    if not args.barge_in:
+                        recorder.stop()
+                    current_text = current_text + " "
+
+                    # Keep a reference to this utterance; the next recorder.text() replaces recorder.audio
+                    speaker_audio = recorder.audio
+                    if args.archive_audio:
+                        sr_core.save_audio_to_wav(speaker_audio, "current_speaker.wav", recorder.sample_rate)
+
+                    # Recognize speaker
+                    speaker_name = sr_core.recognize_speaker(speaker_audio, recorder.sample_rate)
+
+                    if not speaker_name:
+                        speaker_name = enroll_new_speaker(recorder, speaker_audio, recorder.sample_rate)
+
+                    with tracer.span("intent"):
+                        route = router.route(current_text)
+                    if route is not None:
+                        route.handler(current_text, recorder, wait=not args.barge_in)
+                        skip_hot_word_check = False
                     else:
-                        assist.TTS("Which file should I check?")
-                        filename = recorder.text().strip()
-                        results = cm.check_and_fix_file(filename, recorder)
-                    assist.TTS(results)
-                else:
-                    response = assist.ask_question_memory(current_text)
-                    print(response)
-                    speech = response.split('#')[0]
-                    assist.TTS(speech)
-                    skip_hot_word_check = True if "?" in response else False
-                    if len(response.split('#')) > 1:
-                        command = response.split('#')[1]
-                        tools.parse_command(command)
-
-                recorder.start()
+                        response = ask_and_speak(current_text, args)
+                        skip_hot_word_check = run_response_command(response)
+
+                    if not args.barge_in:
+                        recorder.start()
 
 if __name__ == '__main__':
     main()
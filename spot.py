@@ -1,7 +1,7 @@
-import spotipy
 from spotipy.oauth2 import SpotifyOAuth
 from dotenv import load_dotenv
 import os
+from core.spotify_service import SpotifyService
 
 load_dotenv(dotenv_path='Keys.env')
 username = 'Sticker94'
@@ -12,52 +12,51 @@ redirect_uri = 'http://localhost:8888/callback'
 def spotify_authenicate(client_id, client_secret, redirect_uri, username):
     scope = "user-read-currently-playing user-modify-playback-state"
     auth_manager = SpotifyOAuth(client_id, client_secret, redirect_uri, scope=scope, username=username)
-    return spotipy.Spotify(auth_manager = auth_manager)
+    service = SpotifyService(auth_manager)
+    # Log in (or load the cached token) now rather than on the first command.
+    service.access_token()
+    return service
 
 spotify = spotify_authenicate(clientID, clientSecret, redirect_uri, username)
 
+def _report_failure(action):
+    def callback(future):
+        if future.exception() is not None:
+            print(f"Error in {action}: {future.exception()}")
+    return callback
+
 def get_current_playing_info():
     global spotify
-    current_track = spotify.current_user_playing_track()
+    current_track = spotify.now_playing()
     if current_track is None:
         return None
-    
-    artist_name = current_track['item']['artists'][0]['name']
-    album_name = current_track['item']['album']['name']
-    track_title = current_track['item']['name']
 
     return {
-        "artist": artist_name,
-        "album": album_name,
-        "title": track_title
+        "artist": current_track['artist'],
+        "album": current_track['album'],
+        "title": current_track['title']
     }
 
+def describe_current_track():
+    info = get_current_playing_info()
+    if info is None:
+        return "Nothing is playing on Spotify right now."
+    return f"You're listening to {info['title']} by {info['artist']}, from the album {info['album']}."
+
+# Commands return at once; the request is sent in the background and failures are printed.
 
 def start_music():
     global spotify
-    try:
-        spotify.start_playback()
-    except spotipy.SpotifyException as e:
-        return f"Error in starting playback: {str(e)}"
-    
+    spotify.play().add_done_callback(_report_failure("starting playback"))
+
 def stop_music():
     global spotify
-    try:
-        spotify.pause_playback()
-    except spotipy.SpotifyException as e:
-        return f"Error in starting playback: {str(e)}"
-    
+    spotify.pause().add_done_callback(_report_failure("pausing playback"))
+
 def skip_to_next():
     global spotify
-    try:
-        spotify.next_track()
-    except spotipy.SpotifyException as e:
-        return f"Error in starting playback: {str(e)}"
-    
+    spotify.next_track().add_done_callback(_report_failure("skipping to the next track"))
+
 def skip_to_previous():
     global spotify
-    try:
-        spotify.previous_track()
-    except spotipy.SpotifyException as e:
-        return f"Error in starting playback: {str(e)}"
-    
+    spotify.previous_track().add_done_callback(_report_failure("skipping to the previous track"))
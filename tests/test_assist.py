@@ -0,0 +1,98 @@
+# tests/test_assist.py
+
+import unittest
+import os
+import time
+import shutil
+import tempfile
+import threading
+from unittest.mock import MagicMock
+import assist
+from core.benchmark import patched
+from core.playback import PlaybackEngine
+from core.response_cache import ResponseCache
+from core.run_polling import PollMetrics
+from tests.test_playback import FakePlayer
+
+class TestStreamTTS(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+        self.player = FakePlayer(duration=5.0)
+        self.synthesized = []
+        self.closed = threading.Event()
+
+    def generate_tts(self, sentence, system=False, backend=None):
+        self.synthesized.append(sentence)
+        path = os.path.join(self.dir, f'{len(self.synthesized)}.mp3')
+        with open(path, 'wb') as file:
+            file.write(sentence.encode('utf-8'))
+        return path
+
+    def stream(self, question):
+        try:
+            for i in range(20):
+                yield f"This is sentence number {i} of the reply. "
+                time.sleep(0.01)
+        finally:
+            self.closed.set()
+
+    def test_stop_speaking_interrupts_a_streamed_reply(self):
+        engine = PlaybackEngine(self.player, poll_interval=0.005)
+        with patched(assist, playback=engine, stream_question_memory=self.stream, generate_tts=self.generate_tts):
+            result = {}
+            speaker = threading.Thread(target=lambda: result.setdefault('text', assist.stream_TTS("Talk", wait=True)))
+            speaker.start()
+            while not self.player.loaded:
+                time.sleep(0.001)
+            assist.stop_speaking()
+            speaker.join(timeout=2)
+            self.assertFalse(speaker.is_alive())
+            self.assertTrue(self.closed.wait(timeout=1))
+            self.assertTrue(engine.wait(timeout=1))
+            time.sleep(0.05)
+        self.assertEqual(len(self.player.loaded), 1)
+        self.assertLess(len(self.synthesized), 20)
+        self.assertNotIn("sentence number 19", result['text'])
+        self.assertEqual(assist._active_replies, set())
+
+    def test_stop_speaking_while_a_prompt_is_queued(self):
+        engine = PlaybackEngine(self.player, poll_interval=0.005)
+        with patched(assist, playback=engine, generate_tts=self.generate_tts):
+            engine.play(b'reply')
+            result = {}
+            speaker = threading.Thread(target=lambda: result.setdefault('done', assist.TTS("Which file?", system=True)))
+            speaker.start()
+            time.sleep(0.05)
+            assist.stop_speaking()
+            speaker.join(timeout=2)
+            self.assertFalse(speaker.is_alive())
+        self.assertEqual(result, {'done': "done"})
+        self.assertEqual(len(self.player.loaded), 1)
+
+class TestAskQuestionMemory(unittest.TestCase):
+
+    def ask(self, status, category=None, cache=None):
+        client = MagicMock()
+        client.beta.threads.messages.list.return_value.data[0].content[0].text.value = "Partial repl"
+        metrics = PollMetrics()
+        metrics.status = status
+        with patched(assist, get_client=lambda: client, wait_for_run=lambda *args: (None, metrics),
+                     response_cache=cache if cache is not None else ResponseCache()):
+            return assist.ask_question_memory("Generate a parser", category=category)
+
+    def test_incomplete_run_is_reported_not_read(self):
+        self.assertEqual(self.ask('incomplete'), assist.RUN_STATUS_MESSAGES['incomplete'])
+        self.assertEqual(self.ask('something_new'), assist.RUN_STATUS_MESSAGES['failed'])
+        self.assertEqual(self.ask('completed'), "Partial repl")
+
+    def test_failed_runs_are_not_cached(self):
+        cache = ResponseCache()
+        self.ask('incomplete', category='code', cache=cache)
+        self.assertEqual(len(cache), 0)
+        self.ask('completed', category='code', cache=cache)
+        self.assertEqual(cache.get('code', "Generate a parser"), "Partial repl")
+
+if __name__ == '__main__':
+    unittest.main()
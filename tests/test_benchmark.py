@@ -0,0 +1,82 @@
+# tests/test_benchmark.py
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import contextlib
+import io
+import core.speech_recognition as sr_core
+from core.tracing import tracer
+from core.code_management import check_syntax_errors
+from core.benchmark import (Latency, ReplayRecorder, ReplayFinished, compare, generate_source, load_fixtures,
+                            main, run, write_synthetic_fixtures)
+
+class TestBenchmark(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.dir)
+
+    def test_latency_is_deterministic(self):
+        first, second = Latency(1.0, 0.5, seed=3), Latency(1.0, 0.5, seed=3)
+        self.assertEqual([first.next() for _ in range(5)], [second.next() for _ in range(5)])
+        self.assertEqual(Latency(1.0, 0.5, scale=0.0).next(), 0.0)
+
+    def test_replay_recorder(self):
+        write_synthetic_fixtures(self.dir)
+        utterances = load_fixtures(self.dir)
+        self.assertEqual(len(utterances), 6)
+        self.assertEqual(utterances[0][0], 'alice')
+        recorder = ReplayRecorder(utterances[:2], Latency(0.0))
+        self.assertEqual(recorder.text(), "Jarvis, what's the weather like in Chicago?")
+        self.assertEqual(recorder.sample_rate, 16000)
+        self.assertEqual(recorder.text(), "Jarvis, pause the music.")
+        with self.assertRaises(ReplayFinished):
+            recorder.wait_audio()
+
+    def test_generated_source_has_the_injected_errors(self):
+        self.assertEqual(check_syntax_errors(generate_source(300)), [])
+        self.assertEqual(len(check_syntax_errors(generate_source(300, errors=4))), 4)
+        self.assertEqual(generate_source(300, 4, seed=1), generate_source(300, 4, seed=1))
+
+    def test_report(self):
+        report = run(profile_counts=(5, 20), syntax_sizes=(200,), latency_scale=0.01)
+        results = report['results']
+        self.assertEqual(report['meta']['fixtures'], 'synthetic')
+        for mode in ('conversation', 'pipeline'):
+            conversation = results[mode]
+            self.assertEqual(conversation['spans']['turn']['count'], 6)
+            self.assertEqual(conversation['assistant_calls'], 3)
+            self.assertEqual(conversation['spotify_calls'], 3)
+            for span in ('stt', 'speaker_id', 'intent', 'assistant', 'tts.synthesize', 'tts.playback'):
+                self.assertIn(span, conversation['spans'])
+        self.assertEqual(results['speaker_recognition']['20']['profiles'], 20)
+        self.assertEqual(results['speaker_recognition']['5']['accuracy'], 1.0)
+        self.assertEqual(results['syntax_check']['200_lines_10_errors']['errors_found'], 10)
+        # The shared tracer and the speaker profile settings are left as they were.
+        self.assertFalse(tracer.enabled)
+        self.assertEqual(sr_core.SPEAKER_PROFILES_FILE, 'speaker_profiles.json')
+        self.assertEqual(compare(report, report), [])
+
+    def test_compare_flags_slowdowns_and_accuracy_drops(self):
+        baseline = {'results': {'syntax': {'best_ms': 10.0, 'tiny_ms': 0.1}, 'speaker': {'accuracy': 1.0}}}
+        report = {'results': {'syntax': {'best_ms': 20.0, 'tiny_ms': 0.5}, 'speaker': {'accuracy': 0.5}}}
+        self.assertEqual([r['metric'] for r in compare(baseline, report)], ['speaker.accuracy', 'syntax.best_ms'])
+        self.assertEqual(compare(baseline, report, tolerance=1.5, min_delta_ms=1.0), [{'metric': 'speaker.accuracy', 'baseline': 1.0, 'value': 0.5}])
+
+    def test_cli_writes_json_and_fails_on_regressions(self):
+        output = os.path.join(self.dir, 'report.json')
+        baseline = os.path.join(self.dir, 'baseline.json')
+        self.assertEqual(main(['--only', 'syntax', '--syntax_lines', '200', '--output', output]), 0)
+        with open(output) as file:
+            report = json.load(file)
+        report['results']['syntax_check']['200_lines_0_errors']['best_ms'] = 0.0
+        with open(baseline, 'w') as file:
+            json.dump(report, file)
+        with contextlib.redirect_stderr(io.StringIO()):
+            self.assertEqual(main(['--only', 'syntax', '--syntax_lines', '200', '--output', output, '--baseline', baseline]), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -3,6 +3,8 @@
 import unittest
 import os
 import ast
+import tempfile
+import shutil
 from unittest.mock import MagicMock
 from core import code_management as cm
 
@@ -67,22 +69,70 @@ class TestCodeManagement(unittest.TestCase):
         self.assertIn("Errors in test_check_and_fix_file.py have been fixed.", result)
         os.remove(filename)
 
+    def _write(self, root, name, code):
+        path = os.path.join(root, name)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'w') as file:
+            file.write(code)
+        return path
+
+    def test_check_syntax_errors_reports_each_line(self):
+        code = "def a():\n    return 1\n\ndef b(:\n    pass\n\nx = 1\n\ndef c():\n    return (\n"
+        errors = cm.check_syntax_errors(code)
+        self.assertEqual(len(errors), 2)
+        self.assertTrue(errors[0].startswith("Line 4:"))
+        self.assertTrue(errors[1].startswith("Line 10:"))
+
+    def test_check_project_caches_results(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        self._write(root, 'good.py', "x = 1\n")
+        bad = self._write(root, os.path.join('pkg', 'bad.py'), "print('Hello, World!'\n")
+        self._write(root, os.path.join('__pycache__', 'skipped.py'), "def (\n")
+
+        report = cm.check_project(root)
+        self.assertEqual(report['files'], 2)
+        self.assertEqual(report['checked'], 2)
+        self.assertEqual(list(report['errors']), [os.path.join('pkg', 'bad.py')])
+
+        report = cm.check_project(root)
+        self.assertEqual(report['checked'], 0)
+        self.assertEqual(report['cached'], 2)
+        self.assertIn(os.path.join('pkg', 'bad.py'), report['errors'])
+
+        with open(bad, 'w') as file:
+            file.write("print('Hello, World!')\n")
+        report = cm.check_project(root)
+        self.assertEqual(report['checked'], 1)
+        self.assertEqual(report['errors'], {})
+
+    def test_check_project_in_parallel(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for i in range(cm.PARALLEL_THRESHOLD + 4):
+            self._write(root, f'module{i}.py', "def f(:\n" if i % 5 == 0 else "x = 1\n")
+        report = cm.check_project(root, workers=2)
+        self.assertEqual(report['checked'], cm.PARALLEL_THRESHOLD + 4)
+        self.assertEqual(sorted(report['errors']), sorted(f'module{i}.py' for i in range(0, cm.PARALLEL_THRESHOLD + 4, 5)))
+
     def test_check_and_fix_project(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
         cm.assist = MagicMock()
-        cm.assist.ask_question_memory.return_value = "<code>\n```python\nprint('Hello, World!')\n```"
-        filename1 = 'test_file1.py'
-        filename2 = 'test_file2.py'
-        with open(filename1, 'w') as file:
-            file.write("print('Hello, World!'")
-        with open(filename2, 'w') as file:
-            file.write("print('Hello, World!'")
+        cm.assist.ask_question_memory.return_value = (
+            '<file name="test_file1.py"><code>\n```python\nprint("Hello, World!")\n```</code></file>\n'
+            '<file name="test_file2.py"><code>\nprint("Hello, World!")\n</code></file>')
+        self._write(root, 'test_file1.py', "print('Hello, World!'")
+        self._write(root, 'test_file2.py', "print('Hello, World!'")
+        self._write(root, 'test_file3.py', "print('Hello, World!'")
         recorder = MagicMock()
         recorder.text.return_value = "yes"
-        result = cm.check_and_fix_project(recorder)
+        result = cm.check_and_fix_project(recorder, root)
         self.assertIn("Errors in test_file1.py have been fixed.", result)
         self.assertIn("Errors in test_file2.py have been fixed.", result)
-        os.remove(filename1)
-        os.remove(filename2)
+        self.assertIn("Errors in test_file3.py could not be fixed.", result)
+        cm.assist.ask_question_memory.assert_called_once()
+        self.assertEqual(sorted(cm.check_project(root)['errors']), ['test_file3.py'])
 
 if __name__ == '__main__':
     unittest.main()
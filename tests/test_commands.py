@@ -0,0 +1,95 @@
+# tests/test_commands.py
+
+import unittest
+import time
+import threading
+from core.commands import CommandTable
+
+class TestCommandTable(unittest.TestCase):
+
+    def setUp(self):
+        self.calls = []
+        self.table = CommandTable(max_workers=2)
+        self.table.register("play", lambda: self.calls.append("play"), aliases=("resume",))
+        self.table.register("previous", lambda: self.calls.append("previous"), aliases=("back",))
+        self.table.register("search", lambda query: self.calls.append(("search", query)), takes_argument=True)
+
+    def test_parses_whole_words_only(self):
+        self.assertIsNone(self.table.parse("display the weather"))
+        self.assertEqual(self.table.parse("Resume").command.name, "play")
+        self.assertEqual(self.table.parse("play").command.name, "play")
+
+    def test_exactly_one_action(self):
+        parsed = self.table.parse("previous song, then play")
+        self.assertEqual(parsed.command.name, "previous")
+        self.table.dispatch("previous song, then play").result(timeout=1)
+        self.assertEqual(self.calls, ["previous"])
+
+    def test_argument_after_dash(self):
+        parsed = self.table.parse("search-red pandas - baby")
+        self.assertEqual(parsed.command.name, "search")
+        self.assertEqual(parsed.argument, "red pandas - baby")
+        self.table.dispatch("search-red pandas").result(timeout=1)
+        self.assertEqual(self.calls, [("search", "red pandas")])
+
+    def test_unknown_command(self):
+        self.assertIsNone(self.table.dispatch("weather"))
+
+    def test_non_blocking_commands_return_immediately(self):
+        release = threading.Event()
+        self.table.register("slow", release.wait)
+        future = self.table.dispatch("slow")
+        self.assertFalse(future.done())
+        release.set()
+        self.assertTrue(future.result(timeout=1))
+
+    def test_wait_for_in_flight_commands(self):
+        release = threading.Event()
+        self.table.register("slow", release.wait)
+        self.table.dispatch("slow")
+        self.assertFalse(self.table.wait(timeout=0.01))
+        release.set()
+        self.assertTrue(self.table.wait(timeout=1))
+        self.assertTrue(self.table.wait())
+
+    def test_blocking_commands_wait_up_to_timeout(self):
+        release = threading.Event()
+        self.table.register("quick", lambda: "done", blocking=True, timeout=1.0)
+        self.assertTrue(self.table.dispatch("quick").done())
+        self.table.register("stuck", release.wait, blocking=True, timeout=0.01)
+        future = self.table.dispatch("stuck")
+        self.assertFalse(future.done())
+        release.set()
+        future.result(timeout=1)
+        self.assertEqual(self.table.stats()["stuck"]["timeouts"], 1)
+
+    def test_slow_background_commands_are_counted_not_cut_short(self):
+        release = threading.Event()
+        self.table.register("slow", lambda: release.wait() and "done", timeout=0.01)
+        future = self.table.dispatch("slow")
+        time.sleep(0.05)
+        release.set()
+        self.assertEqual(future.result(timeout=1), "done")
+        self.assertEqual(self.table.stats()["slow"]["timeouts"], 1)
+
+    def test_counters(self):
+        def broken():
+            raise RuntimeError("no device")
+        self.table.register("broken", broken)
+        with self.assertRaises(RuntimeError):
+            self.table.dispatch("broken").result(timeout=1)
+        self.table.dispatch("play").result(timeout=1)
+        self.table.dispatch("resume").result(timeout=1)
+        stats = self.table.stats()
+        self.assertEqual(stats["broken"]["errors"], 1)
+        self.assertEqual(stats["play"]["calls"], 2)
+        self.assertGreaterEqual(stats["play"]["max_time"], stats["play"]["mean_time"])
+
+    def test_decorator_registers_handler(self):
+        @self.table.command("skip", aliases=("next",))
+        def skip():
+            return "skipped"
+        self.assertEqual(self.table.dispatch("next track").result(timeout=1), "skipped")
+
+if __name__ == '__main__':
+    unittest.main()
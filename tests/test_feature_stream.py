@@ -0,0 +1,83 @@
+# tests/test_feature_stream.py
+
+import unittest
+import os
+import wave
+import shutil
+import tempfile
+import numpy as np
+from core import feature_stream as fs
+
+def tone(seconds, frequency=220.0, sample_rate=16000):
+    t = np.arange(int(seconds * sample_rate)) / sample_rate
+    return 8000 * np.sin(2 * np.pi * frequency * (1 + 0.1 * np.sin(t)) * t)
+
+class TestFeatureStream(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def write_wav(self, name, samples, sample_rate=16000, channels=1):
+        path = os.path.join(self.dir, name)
+        data = np.repeat(samples, channels) if channels > 1 else samples
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(channels)
+            wf.setsampwidth(2)
+            wf.setframerate(sample_rate)
+            wf.writeframes(data.astype(np.int16).tobytes())
+        return path
+
+    def test_chunks_are_mono_and_bounded(self):
+        path = self.write_wav('stereo.wav', tone(2.5), channels=2)
+        chunks = list(fs.iter_wav_chunks(path, chunk_seconds=1.0))
+        self.assertEqual([len(samples) for samples, _ in chunks], [16000, 16000, 8000])
+        self.assertEqual(chunks[0][1], 16000)
+        np.testing.assert_allclose(np.concatenate([samples for samples, _ in chunks]), tone(2.5).astype(np.int16))
+
+    def test_one_chunk_matches_single_extraction(self):
+        samples = tone(3.0).astype(np.int16).astype(np.float64)
+        whole = fs.MidTermStats(16000).finish(samples)
+        mt, _, _ = fs.aF.mid_feature_extraction(samples, 16000, 16000.0, 16000.0, 800.0, 400.0)
+        np.testing.assert_allclose(whole, mt.mean(axis=1))
+        np.testing.assert_allclose(fs.extract_file_features(self.write_wav('a.wav', samples)), whole, rtol=1e-4, atol=1e-6)
+
+    def test_chunked_extraction_tracks_whole_clip(self):
+        path = self.write_wav('long.wav', tone(12.3))
+        whole = fs.extract_file_features(path, chunk_seconds=60)
+        chunked = fs.extract_file_features(path, chunk_seconds=2)
+        self.assertLess(np.linalg.norm(chunked - whole) / np.linalg.norm(whole), 0.05)
+
+    def test_windows_are_weighted_and_short_tails_dropped(self):
+        stats = fs.MidTermStats(16000)
+        stats.update(tone(2.0))
+        self.assertEqual(stats.windows, 1.0)
+        stats.finish(tone(0.3))
+        self.assertEqual(stats.windows, 2.0)
+        stats = fs.MidTermStats(16000)
+        stats.finish(tone(2.8))
+        self.assertAlmostEqual(stats.windows, 2 + 31 / 39)
+
+    def test_very_short_clips(self):
+        for seconds in (0.0001, 0.03, 0.2):
+            features = fs.MidTermStats(16000).finish(tone(seconds))
+            self.assertEqual(features.shape, (136,))
+            self.assertFalse(np.isnan(features).any())
+        with self.assertRaises(ValueError):
+            fs.MidTermStats(16000).finish()
+        with self.assertRaises(ValueError):
+            fs.stream_features([])
+
+    def test_extract_many_keeps_order(self):
+        paths = [self.write_wav(f'{i}.wav', tone(1.2, frequency)) for i, frequency in enumerate((220, 440, 880))]
+        serial = fs.extract_many(paths, workers=1)
+        parallel = fs.extract_many(paths, workers=2)
+        for one, other, path in zip(serial, parallel, paths):
+            np.testing.assert_allclose(one, other)
+            np.testing.assert_allclose(one, fs.extract_file_features(path))
+        self.assertEqual(fs.find_recordings(self.dir), sorted(paths))
+
+if __name__ == '__main__':
+    unittest.main()
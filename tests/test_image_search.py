@@ -0,0 +1,104 @@
+# tests/test_image_search.py
+
+import unittest
+import os
+import shutil
+import tempfile
+from core.image_search import ImageSearch, google_crawler
+
+class FakeCrawler:
+    # Writes the configured results into the storage directory the way
+    # icrawler's downloader names them (000001.jpg, ...).
+    def __init__(self, host, root_dir, downloader_threads):
+        self.host = host
+        self.root_dir = root_dir
+        host.threads.append(downloader_threads)
+
+    def crawl(self, keyword, max_num):
+        self.host.crawls.append((keyword, max_num))
+        for i, (extension, data) in enumerate(self.host.results[:max_num]):
+            with open(os.path.join(self.root_dir, f'{i + 1:06d}{extension}'), 'wb') as file:
+                file.write(data)
+
+class FakeGoogle:
+    def __init__(self):
+        self.results = []
+        self.crawls = []
+        self.threads = []
+
+    def factory(self, root_dir, downloader_threads):
+        return FakeCrawler(self, root_dir, downloader_threads)
+
+class TestImageSearch(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.google = FakeGoogle()
+        self.search = None
+
+    def tearDown(self):
+        if self.search is not None:
+            self.search.close()
+        shutil.rmtree(self.dir)
+
+    def make_search(self, **kwargs):
+        self.search = ImageSearch(self.dir, crawler_factory=self.google.factory, **kwargs)
+        return self.search
+
+    def add_images(self, count, size=100, prefix='img'):
+        for i in range(count):
+            self.google.results.append(('.jpg', bytes([i % 256]) * size + prefix.encode()))
+
+    def test_repeated_search_is_served_from_disk(self):
+        self.add_images(3)
+        search = self.make_search(downloader_threads=6)
+        paths = search.search("Red Pandas")
+        self.assertEqual(len(paths), 1)
+        self.assertTrue(os.path.exists(paths[0]))
+        self.assertEqual(search.search("red  pandas"), paths)
+        self.assertEqual(self.google.crawls, [("Red Pandas", 1)])
+        self.assertEqual(self.google.threads, [6])
+        self.assertEqual((search.hits, search.misses), (1, 1))
+        # Only the content-addressed files and the index are left behind.
+        self.assertEqual(sorted(os.listdir(self.dir)), sorted(['.index.json', os.path.basename(paths[0])]))
+
+    def test_index_survives_restart(self):
+        self.add_images(2)
+        paths = self.make_search().search("otters")
+        self.search.close()
+        self.assertEqual(self.make_search().cached("otters"), paths)
+
+    def test_same_picture_is_stored_once(self):
+        self.google.results = [('.jpg', b'same picture'), ('.jpg', b'same picture'), ('.png', b'other picture')]
+        search = self.make_search(max_num=3)
+        paths = search.search("pictures")
+        self.assertEqual(len(paths), 2)
+        self.assertTrue(paths[0].endswith('.jpg'))
+        self.assertTrue(paths[1].endswith('.png'))
+        self.assertEqual(search.search("more pictures")[:2], paths)
+        self.assertEqual(len([name for name in os.listdir(self.dir) if name != '.index.json']), 2)
+
+    def test_evicts_least_recently_used_queries(self):
+        self.add_images(1, size=600, prefix='first')
+        search = self.make_search(max_bytes=1000)
+        first = search.search("first")
+        self.google.results = []
+        self.add_images(1, size=600, prefix='second')
+        second = search.search("second")
+        self.assertFalse(os.path.exists(first[0]))
+        self.assertTrue(os.path.exists(second[0]))
+        self.assertIsNone(search.cached("first"))
+        self.assertLessEqual(search.size(), 1000)
+
+    def test_search_async(self):
+        self.add_images(1)
+        future = self.make_search().search_async("cats")
+        self.assertEqual(len(future.result(timeout=5)), 1)
+
+    def test_google_crawler_settings(self):
+        crawler = google_crawler(self.dir, 4)
+        self.assertEqual(crawler.downloader.thread_num, 4)
+        self.assertEqual(crawler.storage.root_dir, self.dir)
+
+if __name__ == '__main__':
+    unittest.main()
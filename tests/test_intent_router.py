@@ -0,0 +1,64 @@
+import unittest
+import os
+import json
+from core.intent_router import IntentRouter
+
+class TestIntentRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.log_file = 'test_intent_router.jsonl'
+        self.router = IntentRouter()
+        self.router.add('pause', r'\bpause\b', handler='pause_handler')
+        self.router.add('update_code', r'(?=.*\bupdate\b)(?=.*\bcode\b)', handler='update_handler')
+
+    def tearDown(self):
+        if os.path.exists(self.log_file):
+            os.remove(self.log_file)
+
+    def test_pattern_match(self):
+        route = self.router.route("Jarvis, pause")
+        self.assertEqual(route.intent, 'pause')
+        self.assertEqual(route.handler, 'pause_handler')
+        self.assertEqual(route.source, 'pattern')
+
+    def test_keyword_order_does_not_matter(self):
+        self.assertEqual(self.router.route("Jarvis, the code needs an update").intent, 'update_code')
+
+    def test_word_boundaries(self):
+        self.assertIsNone(self.router.route("Jarvis, what does the word unpaused mean?"))
+
+    def test_unmatched_goes_remote(self):
+        self.assertIsNone(self.router.route("Jarvis, what's the capital of France?"))
+        self.assertEqual(self.router.counts['remote'], 1)
+        self.assertEqual(self.router.decisions[-1]['source'], 'none')
+
+    def test_classifier_fallback(self):
+        router = IntentRouter(classifier=lambda text: ('skip', 0.9 if 'next' in text else 0.2), min_confidence=0.6)
+        router.set_handler('skip', 'skip_handler')
+        route = router.route("next one please")
+        self.assertEqual((route.intent, route.source), ('skip', 'classifier'))
+        self.assertIsNone(router.route("tell me a story"))
+        self.assertEqual(router.decisions[-1]['intent'], 'skip')
+        self.assertFalse(router.decisions[-1]['local'])
+
+    def test_low_confidence_pattern_goes_remote(self):
+        self.router.add('play', r'\bplay\b', handler='play_handler', confidence=0.3)
+        self.assertIsNone(self.router.route("Jarvis, play something relaxing"))
+
+    def test_intent_without_handler_goes_remote(self):
+        self.router.add('weather', r'\bweather\b')
+        self.assertIsNone(self.router.route("What's the weather?"))
+
+    def test_decisions_logged(self):
+        router = IntentRouter(log_file=self.log_file)
+        router.add('pause', r'\bpause\b', handler='pause_handler')
+        router.route("pause")
+        router.route("hello")
+        self.assertEqual(router.counts, {'local': 1, 'remote': 1})
+        with open(self.log_file, 'r') as file:
+            decisions = [json.loads(line) for line in file]
+        self.assertEqual([d['intent'] for d in decisions], ['pause', None])
+        self.assertTrue(all(d['elapsed_us'] >= 0 for d in decisions))
+
+if __name__ == '__main__':
+    unittest.main()
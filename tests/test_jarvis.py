@@ -0,0 +1,83 @@
+# tests/test_jarvis.py
+
+import unittest
+import asyncio
+import argparse
+import numpy as np
+import assist
+import jarvis
+import core.speech_recognition as sr_core
+from core.benchmark import Latency, ReplayFinished, ReplayRecorder, patched
+from core.playback import PlaybackEngine
+from tests.test_playback import FakePlayer
+
+PROMPT = "Jarvis here. Which file should I update?"
+QUESTION = "Jarvis what time is it"
+
+class EchoRecorder(ReplayRecorder):
+    # The first utterance is recorded while Jarvis is still speaking a prompt,
+    # the second after he has finished.
+    def __init__(self, engine, until):
+        audio = np.zeros(1600, dtype=np.float32)
+        super().__init__([('jarvis', audio, 16000, PROMPT), ('tony', audio, 16000, QUESTION)],
+                         Latency(0.0), until=until, timeout=2.0)
+        self.engine = engine
+
+    def wait_audio(self):
+        if self.consumed == 0:
+            self.engine.play('prompt.mp3')
+        else:
+            self.engine.wait(timeout=2)
+        jarvis.capture_guard.recording_started()
+        super().wait_audio()
+
+class Router:
+    def route(self, text):
+        return None
+
+class TestIntentRouter(unittest.TestCase):
+
+    def setUp(self):
+        self.router = jarvis.build_intent_router()
+
+    def intent(self, text):
+        route = self.router.route(text)
+        return route.intent if route else None
+
+    def test_music_commands(self):
+        self.assertEqual(self.intent("Jarvis, pause the music."), 'pause')
+        self.assertEqual(self.intent("Jarvis, skip this song."), 'skip')
+        self.assertEqual(self.intent("hey jarvis next track"), 'skip')
+        self.assertEqual(self.intent("Jarvis, can you go back a song?"), 'previous')
+        self.assertEqual(self.intent("Jarvis, resume"), 'play')
+
+    def test_questions_mentioning_music_words_reach_the_assistant(self):
+        for text in ("Jarvis, how do I skip a stone on water?",
+                     "Jarvis, can we go back to what you said about Rome?",
+                     "Jarvis, what does pause mean in music theory?",
+                     "Jarvis, what's the next song on the album?",
+                     "Jarvis, play something by Queen"):
+            self.assertIsNone(self.router.route(text), text)
+
+class TestPipelineCapture(unittest.TestCase):
+
+    def run_pipeline(self, barge_in):
+        questions = []
+        engine = PlaybackEngine(FakePlayer(duration=0.2), poll_interval=0.005)
+        recorder = EchoRecorder(engine, until=lambda: len(questions) >= (2 if barge_in else 1))
+        args = argparse.Namespace(barge_in=barge_in, stream=False, archive_audio=False)
+        with patched(assist, playback=engine, ask_question_memory=lambda text: questions.append(text) or "Noon."), \
+                patched(jarvis, speak_response=lambda response, args: None, run_response_command=lambda response: False), \
+                patched(sr_core, recognize_speaker=lambda audio, sample_rate: 'tony'):
+            with self.assertRaises(ReplayFinished):
+                asyncio.run(jarvis.run_pipeline(args, recorder, Router()))
+        return questions
+
+    def test_speech_recorded_while_jarvis_talks_is_dropped(self):
+        self.assertEqual(self.run_pipeline(barge_in=False), [QUESTION + " "])
+
+    def test_barge_in_keeps_everything(self):
+        self.assertEqual(self.run_pipeline(barge_in=True), [PROMPT + " ", QUESTION + " "])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+# tests/test_memory_store.py
+
+import unittest
+import os
+import json
+import shutil
+import tempfile
+import threading
+from core.memory_store import MemoryStore
+
+class TestMemoryStore(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'memory.json')
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def read_snapshot(self):
+        with open(self.path, 'r') as file:
+            return json.load(file)
+
+    def test_writes_are_batched_until_flush(self):
+        store = MemoryStore(self.path, flush_interval=None)
+        for i in range(100):
+            store.set('counter', i)
+        store.set('name', 'Tony')
+        self.assertFalse(os.path.exists(self.path))
+        self.assertEqual(store.get('counter'), 99)
+        self.assertTrue(store.flush())
+        self.assertFalse(store.flush())
+        self.assertEqual(store.flushes, 1)
+        self.assertEqual(self.read_snapshot(), {'counter': 99, 'name': 'Tony'})
+
+    def test_timer_flushes_in_background(self):
+        store = MemoryStore(self.path, flush_interval=0.05)
+        store.set('key', 'value')
+        store._timer.join(1)
+        self.assertEqual(self.read_snapshot(), {'key': 'value'})
+
+    def test_concurrent_writers_do_not_lose_updates(self):
+        store = MemoryStore(self.path, flush_interval=0.001)
+
+        def writer(n):
+            for i in range(200):
+                store.set(f'{n}-{i}', i)
+
+        threads = [threading.Thread(target=writer, args=(n,)) for n in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        store.close()
+        self.assertEqual(len(self.read_snapshot()), 800)
+
+    def test_picks_up_external_edits(self):
+        store = MemoryStore(self.path, flush_interval=None)
+        store.set('mine', 1)
+        with open(self.path, 'w') as file:
+            json.dump({'theirs': 2}, file)
+        self.assertEqual(store.snapshot(), {'theirs': 2, 'mine': 1})
+
+    def test_journal_appends_only_changes(self):
+        store = MemoryStore(self.path, flush_interval=None, journal=True)
+        store.replace({f'key{i}': 'x' * 100 for i in range(50)})
+        store.flush()
+        snapshot_size = os.path.getsize(self.path)
+
+        store.set('key1', 'changed')
+        store.delete('key2')
+        store.flush()
+        self.assertEqual(os.path.getsize(self.path), snapshot_size)
+        with open(store.journal_path, 'r') as file:
+            self.assertEqual([json.loads(line) for line in file], [['key1', 'changed'], ['key2']])
+
+        reloaded = MemoryStore(self.path, flush_interval=None, journal=True)
+        self.assertEqual(reloaded.get('key1'), 'changed')
+        self.assertIsNone(reloaded.get('key2'))
+        self.assertEqual(len(reloaded.snapshot()), 49)
+
+    def test_journal_compacts_when_large(self):
+        store = MemoryStore(self.path, flush_interval=None, journal=True, compact_bytes=200)
+        for i in range(20):
+            store.set('key', 'x' * i)
+            store.flush()
+        self.assertLess(os.path.getsize(store.journal_path) if os.path.exists(store.journal_path) else 0, 300)
+        self.assertEqual(MemoryStore(self.path, journal=True).get('key'), 'x' * 19)
+
+    def test_torn_journal_tail_is_dropped(self):
+        store = MemoryStore(self.path, flush_interval=None, journal=True)
+        store.set('a', 1)
+        store.flush()
+        with open(store.journal_path, 'a') as file:
+            file.write('["b", 2')
+        reloaded = MemoryStore(self.path, flush_interval=None, journal=True)
+        self.assertEqual(reloaded.snapshot(), {'a': 1})
+        reloaded.set('c', 3)
+        reloaded.flush()
+        self.assertEqual(MemoryStore(self.path, journal=True).snapshot(), {'a': 1, 'c': 3})
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+import asyncio
+import time
+from core.pipeline import Pipeline
+
+async def items(values, delay=0.0):
+    for value in values:
+        if delay:
+            await asyncio.sleep(delay)
+        yield value
+
+class TestPipeline(unittest.TestCase):
+
+    def test_stages_run_in_order(self):
+        results = []
+
+        async def double(item):
+            return item * 2
+
+        async def drop_odd(item):
+            return item if item % 4 == 0 else None
+
+        async def collect(item):
+            results.append(item)
+            return item
+
+        pipeline = Pipeline().add_stage('double', double).add_stage('filter', drop_odd).add_stage('collect', collect)
+        stats = asyncio.run(pipeline.run(items(range(6))))
+        self.assertEqual(results, [0, 4, 8])
+        self.assertEqual(stats['double']['processed'], 6)
+        self.assertEqual(stats['filter']['dropped'], 3)
+        self.assertEqual(stats['collect']['processed'], 3)
+
+    def test_errors_do_not_stop_pipeline(self):
+        results = []
+
+        async def fragile(item):
+            if item == 1:
+                raise ValueError("boom")
+            return item
+
+        async def collect(item):
+            results.append(item)
+
+        pipeline = Pipeline().add_stage('fragile', fragile).add_stage('collect', collect)
+        stats = asyncio.run(pipeline.run(items(range(3))))
+        self.assertEqual(results, [0, 2])
+        self.assertEqual(stats['fragile']['errors'], 1)
+
+    def test_slow_stage_does_not_block_input(self):
+        # Input keeps being accepted while a slow response stage is busy.
+        accepted = []
+
+        async def accept(item):
+            accepted.append((item, time.monotonic()))
+            return item
+
+        async def respond(item):
+            await asyncio.sleep(0.05)
+            return item
+
+        pipeline = Pipeline(maxsize=4).add_stage('accept', accept).add_stage('respond', respond)
+        start = time.monotonic()
+        asyncio.run(pipeline.run(items(range(3))))
+        self.assertEqual([item for item, _ in accepted], [0, 1, 2])
+        self.assertLess(accepted[-1][1] - start, 0.05)
+
+    def test_run_blocking_runs_concurrently(self):
+        pipeline = Pipeline()
+
+        async def both():
+            return await asyncio.gather(pipeline.run_blocking(time.sleep, 0.1), pipeline.run_blocking(time.sleep, 0.1))
+
+        start = time.monotonic()
+        asyncio.run(both())
+        self.assertLess(time.monotonic() - start, 0.19)
+
+    def test_multiple_workers(self):
+        results = []
+
+        async def slow(item):
+            await asyncio.sleep(0.05)
+            results.append(item)
+            return item
+
+        pipeline = Pipeline(maxsize=4).add_stage('slow', slow, workers=4)
+        start = time.monotonic()
+        asyncio.run(pipeline.run(items(range(4))))
+        self.assertEqual(sorted(results), [0, 1, 2, 3])
+        self.assertLess(time.monotonic() - start, 0.15)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+import unittest
+import io
+import time
+from core.playback import PlaybackEngine
+
+class FakePlayer:
+    # Stands in for pygame.mixer.music; each clip "plays" for `duration` seconds.
+    def __init__(self, duration=0.05):
+        self.duration = duration
+        self.loaded = []
+        self.namehints = []
+        self.stops = 0
+        self._until = 0.0
+
+    def load(self, source, namehint=''):
+        if isinstance(source, io.BytesIO):
+            self.loaded.append(source.getvalue())
+            self.namehints.append(namehint)
+        else:
+            self.loaded.append(source)
+
+    def play(self):
+        self._until = time.monotonic() + self.duration
+
+    def get_busy(self):
+        return time.monotonic() < self._until
+
+    def stop(self):
+        self.stops += 1
+        self._until = 0.0
+
+    def unload(self):
+        pass
+
+class TestPlaybackEngine(unittest.TestCase):
+
+    def test_play_returns_future(self):
+        player = FakePlayer()
+        engine = PlaybackEngine(player, poll_interval=0.005)
+        future = engine.play('speech.mp3')
+        self.assertTrue(future.result(timeout=1))
+        self.assertEqual(player.loaded, ['speech.mp3'])
+
+    def test_plays_in_order_without_blocking(self):
+        player = FakePlayer(duration=0.05)
+        engine = PlaybackEngine(player, poll_interval=0.005)
+        start = time.monotonic()
+        futures = [engine.play(name) for name in ['a.mp3', 'b.mp3', b'in-memory audio']]
+        self.assertLess(time.monotonic() - start, 0.05)
+        self.assertTrue(engine.is_playing())
+        self.assertTrue(all(future.result(timeout=1) for future in futures))
+        self.assertEqual(player.loaded, ['a.mp3', 'b.mp3', b'in-memory audio'])
+        self.assertTrue(engine.wait(timeout=1))
+        self.assertFalse(engine.is_playing())
+
+    def test_namehint_for_bytes(self):
+        player = FakePlayer(duration=0.01)
+        engine = PlaybackEngine(player, poll_interval=0.005)
+        engine.play(b'mp3 audio').result(timeout=1)
+        engine.play(b'wav audio', 'wav').result(timeout=1)
+        self.assertEqual(player.namehints, ['mp3', 'wav'])
+
+    def test_completion_detected_quickly(self):
+        player = FakePlayer(duration=0.05)
+        engine = PlaybackEngine(player, poll_interval=0.01)
+        start = time.monotonic()
+        engine.play('a.mp3').result(timeout=1)
+        self.assertLess(time.monotonic() - start, 0.05 + 0.1)
+
+    def test_stop_interrupts_and_clears_queue(self):
+        player = FakePlayer(duration=5.0)
+        engine = PlaybackEngine(player, poll_interval=0.005)
+        current = engine.play('long.mp3')
+        queued = engine.play('next.mp3')
+        while not player.loaded:
+            time.sleep(0.001)
+        engine.stop()
+        self.assertFalse(current.result(timeout=1))
+        self.assertTrue(queued.cancelled())
+        self.assertEqual(player.stops, 1)
+        self.assertTrue(engine.wait(timeout=1))
+        player.duration = 0.01
+        self.assertTrue(engine.play('after.mp3').result(timeout=1))
+
+    def test_clips_of_an_older_generation_are_dropped(self):
+        player = FakePlayer(duration=0.01)
+        engine = PlaybackEngine(player, poll_interval=0.005)
+        generation = engine.generation
+        engine.stop()
+        stale = engine.play('stale.mp3', generation=generation)
+        self.assertTrue(engine.wait(timeout=1))
+        self.assertTrue(stale.cancelled())
+        self.assertTrue(engine.play('fresh.mp3', generation=engine.generation).result(timeout=1))
+        self.assertEqual(player.loaded, ['fresh.mp3'])
+
+    def test_player_error_sets_exception(self):
+        player = FakePlayer()
+        player.load = lambda *args: (_ for _ in ()).throw(RuntimeError("bad file"))
+        engine = PlaybackEngine(player, poll_interval=0.005)
+        with self.assertRaises(RuntimeError):
+            engine.play('broken.mp3').result(timeout=1)
+        self.assertTrue(engine.wait(timeout=1))
+
+if __name__ == '__main__':
+    unittest.main()
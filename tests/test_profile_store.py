@@ -0,0 +1,88 @@
+import unittest
+import os
+import glob
+import json
+import numpy as np
+from core.profile_store import ProfileStore, migrate_json_profiles, FORMAT_VERSION
+
+class TestProfileStore(unittest.TestCase):
+
+    def setUp(self):
+        self.base_path = 'test_profile_store'
+        self.json_file = 'test_profile_store_legacy.json'
+        self.store = ProfileStore(self.base_path)
+
+    def tearDown(self):
+        for path in glob.glob(self.base_path + '*'):
+            os.remove(path)
+
+    def test_empty_store(self):
+        self.assertFalse(self.store.exists())
+        names, matrix = self.store.load()
+        self.assertEqual(names, [])
+        self.assertEqual(matrix.shape[0], 0)
+
+    def test_write_all_and_load(self):
+        self.store.write_all({'alice': [1.0, 2.0, 3.0], 'bob': [4.0, 5.0, 6.0]})
+        names, matrix = self.store.load()
+        self.assertEqual(names, ['alice', 'bob'])
+        self.assertIsInstance(matrix, np.memmap)
+        self.assertEqual(matrix.dtype, np.float32)
+        np.testing.assert_allclose(matrix, [[1.0, 2.0, 3.0], [4.0, 5.0, 6.0]])
+        with open(self.store.meta_path, 'r') as file:
+            meta = json.load(file)
+        self.assertEqual(meta['version'], FORMAT_VERSION)
+        self.assertEqual(meta['dim'], 3)
+
+    def test_append(self):
+        self.store.append('alice', [1.0, 2.0])
+        self.store.append('bob', [3.0, 4.0])
+        self.assertEqual(ProfileStore(self.base_path).load_profiles(), {'alice': [1.0, 2.0], 'bob': [3.0, 4.0]})
+
+    def test_append_dimension_mismatch(self):
+        self.store.append('alice', [1.0, 2.0])
+        with self.assertRaises(ValueError):
+            self.store.append('bob', [1.0, 2.0, 3.0])
+
+    def test_reenroll_averages_and_compact_keeps_samples(self):
+        self.store.append('alice', [1.0, 2.0])
+        self.store.append('bob', [0.0, 0.0])
+        self.store.append('alice', [5.0, 6.0])
+        self.assertEqual(self.store.load_profiles(), {'alice': [3.0, 4.0], 'bob': [0.0, 0.0]})
+        self.store.compact()
+        names, matrix = ProfileStore(self.base_path).load()
+        self.assertEqual(names, ['alice', 'bob', 'alice'])
+        np.testing.assert_array_equal(matrix, [[1.0, 2.0], [0.0, 0.0], [5.0, 6.0]])
+        self.assertEqual(self.store.load_profiles(), {'alice': [3.0, 4.0], 'bob': [0.0, 0.0]})
+
+    def test_torn_append_is_discarded(self):
+        self.store.write_all({'alice': [1.0, 2.0]})
+        data_path, names_path = self.store._paths(0)
+        with open(data_path, 'ab') as file:
+            file.write(np.float32([9.0, 9.0]).tobytes()[:5])
+        with open(names_path, 'ab') as file:
+            file.write(b'"bo')
+        store = ProfileStore(self.base_path)
+        self.assertEqual(store.load_profiles(), {'alice': [1.0, 2.0]})
+        store.append('bob', [3.0, 4.0])
+        self.assertEqual(ProfileStore(self.base_path).load_profiles(), {'alice': [1.0, 2.0], 'bob': [3.0, 4.0]})
+
+    def test_rewrite_replaces_generation(self):
+        self.store.write_all({'alice': [1.0, 2.0]})
+        self.store.write_all({'bob': [3.0, 4.0]})
+        self.assertEqual(self.store.load_profiles(), {'bob': [3.0, 4.0]})
+        self.assertFalse(any(os.path.exists(path) for path in self.store._paths(0)))
+
+    def test_migrate_json_profiles(self):
+        with open(self.json_file, 'w') as file:
+            json.dump({'nick': [0.5, -27.125]}, file)
+        self.assertTrue(migrate_json_profiles(self.json_file, self.store))
+        self.assertFalse(migrate_json_profiles(self.json_file, self.store))
+        self.assertEqual(self.store.load_profiles(), {'nick': [0.5, -27.125]})
+
+    def test_migrate_without_json(self):
+        self.assertFalse(migrate_json_profiles(self.json_file, self.store))
+        self.assertFalse(self.store.exists())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+# tests/test_response_cache.py
+
+import unittest
+import os
+import shutil
+import tempfile
+from core.response_cache import ResponseCache, normalize_prompt
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+class TestResponseCache(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.path = os.path.join(self.dir, 'response_cache.json')
+        self.clock = Clock()
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_normalize_prompt(self):
+        self.assertEqual(normalize_prompt("def f():\r\n    return 1   \r\n\n\n\n"), "def f():\n    return 1")
+        self.assertNotEqual(normalize_prompt("if x:\n  y"), normalize_prompt("if x:\ny"))
+
+    def test_hits_and_misses(self):
+        cache = ResponseCache(clock=self.clock)
+        self.assertIsNone(cache.get('code', "Generate a parser"))
+        cache.put('code', "Generate a parser", "<code>pass</code>")
+        self.assertEqual(cache.get('code', "Generate a parser  \n"), "<code>pass</code>")
+        self.assertIsNone(cache.get('fix', "Generate a parser"))
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (1, 2, 1))
+        self.assertAlmostEqual(stats['hit_rate'], 1 / 3)
+        self.assertEqual(stats['categories']['code']['hits'], 1)
+
+    def test_ttl_per_category(self):
+        cache = ResponseCache(ttls={'fix': 10, 'code': None}, clock=self.clock)
+        cache.put('fix', "broken.py", "fixed")
+        cache.put('code', "parser", "pass")
+        self.clock.now += 11
+        self.assertIsNone(cache.get('fix', "broken.py"))
+        self.assertEqual(cache.get('code', "parser"), "pass")
+        self.assertEqual(cache.stats()['categories']['fix']['expired'], 1)
+        self.assertEqual(len(cache), 1)
+
+    def test_lru_bound(self):
+        cache = ResponseCache(max_entries=2, clock=self.clock)
+        cache.put('code', "a", "1")
+        cache.put('code', "b", "2")
+        cache.get('code', "a")
+        cache.put('code', "c", "3")
+        self.assertIsNone(cache.get('code', "b"))
+        self.assertEqual(cache.get('code', "a"), "1")
+        self.assertEqual(cache.stats()['categories']['code']['evictions'], 1)
+
+    def test_get_or_compute_skips_rejected_replies(self):
+        cache = ResponseCache(clock=self.clock)
+        calls = []
+        def compute():
+            calls.append(1)
+            return "The run failed."
+        cacheable = lambda reply: reply != "The run failed."
+        cache.get_or_compute('code', "a", compute, cacheable)
+        cache.get_or_compute('code', "a", compute, cacheable)
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(cache.get_or_compute('code', "b", lambda: "ok"), "ok")
+        self.assertEqual(cache.get_or_compute('code', "b", compute), "ok")
+
+    def test_namespace_separates_assistants(self):
+        cache = ResponseCache(namespace='asst_1', clock=self.clock)
+        self.assertNotEqual(cache.key('code', "a"), ResponseCache(namespace='asst_2').key('code', "a"))
+
+    def test_persists_across_restarts(self):
+        cache = ResponseCache(self.path, flush_interval=None, clock=self.clock)
+        cache.put('code', "a", "1")
+        cache.put('code', "b", "2")
+        cache.put('fix', "c", "3")
+        cache.invalidate('fix')
+        cache.flush()
+        reloaded = ResponseCache(self.path, max_entries=1, flush_interval=None, clock=self.clock)
+        self.assertEqual(len(reloaded), 1)
+        self.assertEqual(reloaded.get('code', "b"), "2")
+        self.assertIsNone(reloaded.get('fix', "c"))
+        reloaded.flush()
+        self.assertEqual(len(ResponseCache(self.path, flush_interval=None, clock=self.clock)), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,95 @@
+import unittest
+from types import SimpleNamespace
+from core.run_polling import PollPolicy, wait_for_run
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+class FakeRuns:
+    def __init__(self, statuses):
+        self.statuses = list(statuses)
+        self.retrieves = 0
+        self.cancelled = []
+
+    def retrieve(self, thread_id, run_id):
+        self.retrieves += 1
+        status = self.statuses.pop(0) if len(self.statuses) > 1 else self.statuses[0]
+        return SimpleNamespace(id=run_id, thread_id=thread_id, status=status)
+
+    def cancel(self, run_id, thread_id):
+        self.cancelled.append(run_id)
+
+class FakeClient:
+    def __init__(self, statuses):
+        self.runs = FakeRuns(statuses)
+        self.beta = SimpleNamespace(threads=SimpleNamespace(runs=self.runs))
+
+class TestRunPolling(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.policy = PollPolicy(initial_delay=0.1, backoff=2.0, max_delay=1.0, timeout=10.0)
+
+    def wait(self, client, **kwargs):
+        return wait_for_run(client, 'thread_1', 'run_1', self.policy,
+                            sleep=self.clock.sleep, clock=self.clock, **kwargs)
+
+    def test_policy_backoff(self):
+        delays = self.policy.delays()
+        self.assertEqual([next(delays) for _ in range(6)], [0.1, 0.2, 0.4, 0.8, 1.0, 1.0])
+
+    def test_completed_quickly(self):
+        client = FakeClient(['completed'])
+        run, metrics = self.wait(client)
+        self.assertEqual(run.status, 'completed')
+        self.assertEqual(metrics.polls, 1)
+        self.assertAlmostEqual(metrics.wait_time, 0.1)
+        self.assertFalse(metrics.cancelled)
+
+    def test_backoff_until_completed(self):
+        client = FakeClient(['queued', 'in_progress', 'in_progress', 'completed'])
+        run, metrics = self.wait(client)
+        self.assertEqual(metrics.status, 'completed')
+        self.assertEqual(metrics.polls, 4)
+        self.assertAlmostEqual(metrics.wait_time, 0.1 + 0.2 + 0.4 + 0.8)
+        self.assertAlmostEqual(metrics.elapsed, metrics.wait_time)
+
+    def test_terminal_states(self):
+        for status in ['failed', 'cancelled', 'expired', 'incomplete']:
+            client = FakeClient(['in_progress', status])
+            run, metrics = self.wait(client)
+            self.assertEqual(metrics.status, status)
+            self.assertEqual(client.runs.cancelled, [])
+
+    def test_timeout_cancels_run(self):
+        client = FakeClient(['in_progress'])
+        run, metrics = self.wait(client)
+        self.assertEqual(metrics.status, 'timed_out')
+        self.assertTrue(metrics.cancelled)
+        self.assertEqual(client.runs.cancelled, ['run_1'])
+        self.assertAlmostEqual(self.clock.now, 10.0)
+        self.assertEqual(metrics.as_dict()['polls'], client.runs.retrieves)
+
+    def test_requires_action_without_handler_cancels(self):
+        client = FakeClient(['requires_action'])
+        run, metrics = self.wait(client)
+        self.assertEqual(metrics.status, 'requires_action')
+        self.assertEqual(client.runs.cancelled, ['run_1'])
+
+    def test_requires_action_with_handler(self):
+        client = FakeClient(['requires_action', 'in_progress', 'completed'])
+        handled = []
+        run, metrics = self.wait(client, on_requires_action=handled.append)
+        self.assertEqual(metrics.status, 'completed')
+        self.assertEqual(len(handled), 1)
+        self.assertEqual(client.runs.cancelled, [])
+
+if __name__ == '__main__':
+    unittest.main()
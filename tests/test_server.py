@@ -0,0 +1,83 @@
+# tests/test_server.py
+
+import unittest
+import io
+import json
+import time
+import wave
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from core.sessions import SessionPool
+from core.server import AssistantServer
+from tests.test_sessions import FakeAssistant
+
+def wav_bytes(frequency, sample_rate=16000):
+    samples = (0.5 * np.sin(2 * np.pi * frequency * np.arange(sample_rate) / sample_rate) * 32767).astype(np.int16)
+    buffer = io.BytesIO()
+    with wave.open(buffer, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes(samples.tobytes())
+    return buffer.getvalue()
+
+def recognize(samples, sample_rate):
+    # The loudest frequency stands in for the voice.
+    peak = np.argmax(np.abs(np.fft.rfft(samples))) * sample_rate / len(samples)
+    return {220: 'alice', 440: 'bob'}.get(int(round(peak)))
+
+class TestAssistantServer(unittest.TestCase):
+
+    def setUp(self):
+        self.backend = FakeAssistant(latency=0.1)
+        self.server = AssistantServer(SessionPool(self.backend), recognize=recognize,
+                                      transcribe=lambda wav: f"{len(wav)} bytes of speech", port=0)
+        host, port = self.server.start(poll_interval=0.05)
+        self.url = f"http://{host}:{port}"
+        self.addCleanup(self.server.close)
+
+    def post(self, body, content_type='application/json', headers=None):
+        request = urllib.request.Request(self.url + '/turn', data=body, method='POST',
+                                         headers=dict(headers or {}, **{'Content-Type': content_type}))
+        with urllib.request.urlopen(request) as response:
+            return json.loads(response.read())
+
+    def test_text_turns_get_a_thread_per_speaker(self):
+        alice = self.post(json.dumps({'text': 'hi', 'speaker': 'alice'}).encode())
+        bob = self.post(json.dumps({'text': 'hello', 'speaker': 'bob'}).encode())
+        guest = self.post(json.dumps({'text': 'hey'}).encode(), headers={'X-Client-Id': 'kitchen'})
+        self.assertEqual(alice, {'speaker': 'alice', 'text': 'hi', 'reply': 'thread_0: hi'})
+        self.assertEqual(bob['reply'], 'thread_1: hello')
+        self.assertEqual(guest['speaker'], 'guest:kitchen')
+        with urllib.request.urlopen(self.url + '/sessions') as response:
+            stats = json.loads(response.read())
+        self.assertEqual(stats['text_turns'], 3)
+        self.assertEqual(set(stats['sessions']['sessions']), {'alice', 'bob', 'guest:kitchen'})
+
+    def test_audio_turns_are_attributed_to_the_recognized_speaker(self):
+        reply = self.post(wav_bytes(220), 'audio/wav')
+        self.assertEqual(reply['speaker'], 'alice')
+        self.assertTrue(reply['reply'].startswith('thread_0: '))
+        unknown = self.post(wav_bytes(1000), 'audio/wav', headers={'X-Client-Id': 'phone'})
+        self.assertEqual(unknown['speaker'], 'guest:phone')
+
+    def test_turns_from_different_speakers_run_concurrently(self):
+        speakers = ['alice', 'bob', 'carol', 'dave']
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            replies = list(executor.map(
+                lambda speaker: self.post(json.dumps({'text': 'hi', 'speaker': speaker}).encode()), speakers))
+        self.assertLess(time.perf_counter() - start, 0.35)
+        self.assertEqual([reply['speaker'] for reply in replies], speakers)
+
+    def test_bad_requests(self):
+        for body, content_type in ((b'{}', 'application/json'), (b'not json', 'application/json'), (b'RIFF', 'audio/wav')):
+            with self.assertRaises(urllib.error.HTTPError) as raised:
+                self.post(body, content_type)
+            self.assertEqual(raised.exception.code, 400)
+            raised.exception.close()
+
+if __name__ == '__main__':
+    unittest.main()
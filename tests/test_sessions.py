@@ -0,0 +1,126 @@
+# tests/test_sessions.py
+
+import unittest
+import time
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from core.sessions import SessionPool, SessionPoolFull
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class FakeAssistant:
+    # The create_thread/delete_thread/ask_question_memory surface of assist.
+    def __init__(self, latency=0.0):
+        self.latency = latency
+        self.threads = {}
+        self.deleted = []
+        self.max_messages = []
+        self.running = set()
+        self.overlaps = 0
+        self._lock = threading.Lock()
+
+    def create_thread(self):
+        with self._lock:
+            thread = f"thread_{len(self.threads) + len(self.deleted)}"
+            self.threads[thread] = []
+        return thread
+
+    def delete_thread(self, thread):
+        with self._lock:
+            del self.threads[thread]
+            self.deleted.append(thread)
+
+    def ask_question_memory(self, question, thread, max_messages=None):
+        with self._lock:
+            if thread in self.running:
+                self.overlaps += 1
+            self.running.add(thread)
+            self.max_messages.append(max_messages)
+        time.sleep(self.latency)
+        with self._lock:
+            self.running.discard(thread)
+            self.threads[thread].append(question)
+            return f"{thread}: {question}"
+
+class TestSessionPool(unittest.TestCase):
+
+    def setUp(self):
+        self.clock = FakeClock()
+        self.backend = FakeAssistant()
+        self.pool = SessionPool(self.backend, max_sessions=2, idle_timeout=60, max_context_messages=10, clock=self.clock)
+
+    def test_thread_per_speaker(self):
+        self.assertEqual(self.pool.ask('alice', 'hi'), 'thread_0: hi')
+        self.assertEqual(self.pool.ask('bob', 'hello'), 'thread_1: hello')
+        self.assertEqual(self.pool.ask('alice', 'again'), 'thread_0: again')
+        self.assertEqual(self.backend.threads, {'thread_0': ['hi', 'again'], 'thread_1': ['hello']})
+        self.assertEqual(self.backend.max_messages, [10, 10, 10])
+        stats = self.pool.stats()
+        self.assertEqual((stats['created'], stats['turns'], stats['open']), (2, 3, 2))
+        self.assertEqual(stats['sessions']['alice']['turns'], 2)
+
+    def test_least_recently_used_session_makes_room(self):
+        self.pool.ask('alice', 'one')
+        self.clock.now = 1
+        self.pool.ask('bob', 'two')
+        self.clock.now = 2
+        self.pool.ask('alice', 'three')
+        self.clock.now = 3
+        self.pool.ask('carol', 'four')
+        self.assertEqual(set(self.pool.sessions), {'alice', 'carol'})
+        self.assertEqual(self.backend.deleted, ['thread_1'])
+        self.assertEqual(self.pool.stats()['evicted_capacity'], 1)
+
+    def test_idle_sessions_expire(self):
+        self.pool.ask('alice', 'one')
+        self.clock.now = 30
+        self.pool.ask('bob', 'two')
+        self.clock.now = 70
+        self.assertEqual(self.pool.evict_idle(), 1)
+        self.assertEqual(list(self.pool.sessions), ['bob'])
+        # A returning speaker starts a fresh thread.
+        self.assertEqual(self.pool.ask('alice', 'back'), 'thread_2: back')
+
+    def test_busy_sessions_are_never_evicted(self):
+        with self.pool.session('alice'), self.pool.session('bob'):
+            with self.assertRaises(SessionPoolFull):
+                self.pool.ask('carol', 'hi')
+        self.assertEqual(self.pool.ask('carol', 'hi'), 'thread_2: hi')
+
+    def test_expired_threads_are_deleted_when_the_pool_is_full(self):
+        pool = SessionPool(self.backend, max_sessions=3, idle_timeout=60, clock=self.clock)
+        pool.ask('alice', 'hi')
+        with pool.session('bob'), pool.session('carol'):
+            self.clock.now += 61
+            pool.max_sessions = 2
+            with self.assertRaises(SessionPoolFull):
+                pool.ask('dave', 'hi')
+            self.assertEqual(self.backend.deleted, ['thread_0'])
+        self.assertEqual(pool.stats()['evicted_idle'], 1)
+
+    def test_speakers_run_concurrently_and_each_thread_serially(self):
+        backend = FakeAssistant(latency=0.1)
+        pool = SessionPool(backend, max_sessions=8)
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=8) as executor:
+            replies = list(executor.map(lambda i: pool.ask(f"speaker_{i % 4}", f"q{i}"), range(8)))
+        elapsed = time.perf_counter() - start
+        self.assertEqual(len(replies), 8)
+        self.assertEqual(backend.overlaps, 0)
+        # Four speakers with two turns each: two rounds, not eight.
+        self.assertLess(elapsed, 0.5)
+        self.assertEqual(len(backend.threads), 4)
+
+    def test_close_deletes_threads(self):
+        self.pool.ask('alice', 'hi')
+        self.pool.close()
+        self.assertEqual(self.backend.deleted, ['thread_0'])
+        self.assertEqual(self.pool.stats()['open'], 0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,105 @@
+# tests/test_speaker_embeddings.py
+
+import unittest
+import os
+import wave
+import shutil
+import tempfile
+import importlib.util
+import numpy as np
+from core.speaker_embeddings import EcapaBackend, EmbeddingBackend, EmbeddingCache, SpeakerEmbedder, audio_hash, wav_hash
+
+class CountingBackend(EmbeddingBackend):
+    name = 'counting'
+
+    def __init__(self):
+        self.batches = []
+
+    def embed_batch(self, clips):
+        self.batches.append(len(clips))
+        return np.array([[float(np.sum(samples)), float(rate)] for samples, rate in clips], dtype=np.float32)
+
+class FakeClassifier:
+    def __init__(self):
+        self.calls = []
+
+    def encode_batch(self, wavs, wav_lens):
+        self.calls.append((tuple(wavs.shape), wav_lens.tolist()))
+        # (batch, 1, dim), like speechbrain: the energy of the unpadded part.
+        return (wavs ** 2).sum(dim=1, keepdim=True).unsqueeze(1).repeat(1, 1, 4)
+
+class TestSpeakerEmbeddings(unittest.TestCase):
+
+    def test_audio_hash(self):
+        samples = np.arange(10, dtype=np.float32)
+        self.assertEqual(audio_hash(samples, 16000), audio_hash(samples.astype(np.float64), 16000))
+        self.assertNotEqual(audio_hash(samples, 16000), audio_hash(samples, 44100))
+        self.assertNotEqual(audio_hash(samples, 16000), audio_hash(samples[::-1], 16000))
+
+    def test_wav_hash_matches_samples(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'clip.wav')
+        samples = (np.arange(5000) % 300 - 150).astype(np.int16)
+        with wave.open(path, 'wb') as wf:
+            wf.setnchannels(1)
+            wf.setsampwidth(2)
+            wf.setframerate(16000)
+            wf.writeframes(samples.tobytes())
+        self.assertEqual(wav_hash(path, chunk_seconds=0.1), audio_hash(samples, 16000))
+
+        embedder = SpeakerEmbedder(CountingBackend())
+        extracted = []
+        def extract_files(paths):
+            extracted.append(list(paths))
+            return [np.ones(2, dtype=np.float32) for _ in paths]
+        embedder.embed_files([path, path], extract_files)
+        self.assertEqual(extracted, [[path]])
+        embedder.embed_files([path], extract_files)
+        self.assertEqual(len(extracted), 1)
+        # The file and its samples share a cache entry.
+        np.testing.assert_allclose(embedder.embed(samples, 16000), [1.0, 1.0])
+
+    def test_cache_lru(self):
+        cache = EmbeddingCache(max_entries=2)
+        cache.put(('b', 'one'), [1.0])
+        cache.put(('b', 'two'), [2.0])
+        cache.get(('b', 'one'))
+        cache.put(('b', 'three'), [3.0])
+        self.assertIsNone(cache.get(('b', 'two')))
+        np.testing.assert_allclose(cache.get(('b', 'one')), [1.0])
+        self.assertEqual(len(cache), 2)
+        self.assertEqual((cache.hits, cache.misses), (2, 1))
+
+    def test_cache_on_disk(self):
+        cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, cache_dir)
+        EmbeddingCache(cache_dir=cache_dir).put(('b', 'key'), [1.0, 2.0])
+        np.testing.assert_allclose(EmbeddingCache(cache_dir=cache_dir).get(('b', 'key')), [1.0, 2.0])
+
+    def test_embedder_batches_only_misses(self):
+        backend = CountingBackend()
+        embedder = SpeakerEmbedder(backend)
+        a, b, c = np.ones(4), np.full(4, 2.0), np.full(4, 3.0)
+        first = embedder.embed_many([(a, 16000), (b, 16000), (a, 16000)])
+        self.assertEqual(backend.batches, [2])
+        np.testing.assert_allclose(first[2], [4.0, 16000.0])
+        embedder.embed_many([(a, 16000), (c, 16000)])
+        self.assertEqual(backend.batches, [2, 1])
+        np.testing.assert_allclose(embedder.embed(b, 16000), [8.0, 16000.0])
+        self.assertEqual(backend.batches, [2, 1])
+
+    @unittest.skipUnless(importlib.util.find_spec('torch') and importlib.util.find_spec('torchaudio'),
+                         "needs torch and torchaudio")
+    def test_ecapa_pads_batches_with_relative_lengths(self):
+        classifier = FakeClassifier()
+        backend = EcapaBackend(batch_size=2, classifier_factory=lambda: classifier)
+        clips = [(np.ones(16000, dtype=np.float32), 16000), (np.ones(8000, dtype=np.float32), 16000),
+                 (np.ones(4000, dtype=np.float32), 16000)]
+        embeddings = backend.embed_batch(clips)
+        self.assertEqual(embeddings.shape, (3, 4))
+        self.assertEqual(classifier.calls, [((2, 16000), [1.0, 0.5]), ((1, 4000), [1.0])])
+        np.testing.assert_allclose(embeddings[:, 0], [16000, 8000, 4000])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,97 @@
+import unittest
+import numpy as np
+from core.speaker_index import SpeakerIndex
+
+class TestSpeakerIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.profiles = {
+            'alice': [1.0, 10.0, -20.0, 0.001],
+            'bob': [2.0, 12.0, -25.0, 0.002],
+            'carol': [3.0, 8.0, -30.0, 0.003],
+        }
+        self.index = SpeakerIndex.from_profiles(self.profiles)
+
+    def test_from_profiles(self):
+        self.assertEqual(len(self.index), 3)
+        self.assertEqual(self.index.names, ['alice', 'bob', 'carol'])
+        self.assertEqual(self.index.matrix.dtype, np.float32)
+        self.assertTrue(self.index.matrix.flags['C_CONTIGUOUS'])
+
+    def test_nearest_exact_match(self):
+        match = self.index.nearest(self.profiles['bob'])
+        self.assertEqual(match.name, 'bob')
+        self.assertAlmostEqual(match.distance, 0.0, places=5)
+        self.assertAlmostEqual(match.confidence, 1.0, places=5)
+
+    def test_query_top_k_sorted(self):
+        matches = self.index.query([1.1, 10.2, -20.5, 0.0011], k=3)
+        self.assertEqual([m.name for m in matches][0], 'alice')
+        self.assertEqual(len(matches), 3)
+        distances = [m.distance for m in matches]
+        self.assertEqual(distances, sorted(distances))
+
+    def test_query_confidence_threshold(self):
+        matches = self.index.query([100.0, -50.0, 40.0, 1.0], k=3, min_confidence=0.5)
+        self.assertEqual(matches, [])
+        self.assertIsNone(self.index.nearest([100.0, -50.0, 40.0, 1.0], min_confidence=0.5))
+
+    def test_add_is_incremental(self):
+        for i in range(40):
+            self.index.add(f'speaker_{i}', [float(i), 1.0, 2.0, 3.0])
+        self.assertEqual(len(self.index), 43)
+        self.assertEqual(self.index.nearest([7.0, 1.0, 2.0, 3.0]).name, 'speaker_7')
+
+    def test_add_replaces_existing(self):
+        self.index.add('alice', [3.0, 8.0, -30.0, 0.003])
+        self.assertEqual(len(self.index), 3)
+        np.testing.assert_allclose(self.index.get('alice'), [3.0, 8.0, -30.0, 0.003], rtol=1e-6)
+        self.assertEqual(self.index.to_profiles()['bob'], list(np.float32(self.profiles['bob'])))
+
+    def test_dimension_mismatch(self):
+        with self.assertRaises(ValueError):
+            self.index.add('dave', [1.0, 2.0])
+
+    def test_empty_index(self):
+        index = SpeakerIndex()
+        self.assertEqual(index.query([1.0, 2.0]), [])
+        self.assertIsNone(index.nearest([1.0, 2.0]))
+
+    def test_centroid_of_samples(self):
+        index = SpeakerIndex()
+        index.add_sample('alice', [1.0, 2.0])
+        index.add_sample('alice', [3.0, 6.0])
+        index.add_sample('alice', [5.0, 10.0])
+        np.testing.assert_allclose(index.get('alice'), [3.0, 6.0])
+        self.assertEqual(index.samples('alice'), 3)
+        index.add('alice', [0.0, 0.0])
+        self.assertEqual(index.samples('alice'), 1)
+        self.assertEqual(index.samples('bob'), 0)
+
+    def test_from_matrix_centroids(self):
+        matrix = np.array([[1.0, 2.0], [5.0, 6.0], [3.0, 4.0]], dtype=np.float32)
+        latest = SpeakerIndex.from_matrix(['alice', 'bob', 'alice'], matrix)
+        np.testing.assert_allclose(latest.get('alice'), [3.0, 4.0])
+        averaged = SpeakerIndex.from_matrix(['alice', 'bob', 'alice'], matrix, centroids=True)
+        np.testing.assert_allclose(averaged.get('alice'), [2.0, 3.0])
+        self.assertEqual(averaged.samples('alice'), 2)
+
+    def test_cosine_metric(self):
+        index = SpeakerIndex.from_profiles({'alice': [1.0, 0.0, 0.0], 'bob': [0.0, 1.0, 0.0]}, metric='cosine')
+        match = index.nearest([10.0, 1.0, 0.0])
+        self.assertEqual(match.name, 'alice')
+        self.assertAlmostEqual(match.confidence, 10 / np.sqrt(101), places=5)
+        self.assertAlmostEqual(match.distance, 1 - match.confidence, places=5)
+        # Scale doesn't matter, only direction.
+        self.assertIsNone(index.nearest([0.0, 0.0, 5.0], min_confidence=0.25))
+        with self.assertRaises(ValueError):
+            SpeakerIndex(metric='manhattan')
+
+    def test_cosine_centroid_weighs_samples_equally(self):
+        index = SpeakerIndex(metric='cosine')
+        index.add_sample('alice', [100.0, 0.0])
+        index.add_sample('alice', [0.0, 1.0])
+        np.testing.assert_allclose(index.get('alice'), [0.5, 0.5])
+
+if __name__ == '__main__':
+    unittest.main()
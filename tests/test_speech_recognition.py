@@ -1,7 +1,10 @@
 import unittest
 import os
+import glob
 import json
 import wave
+import shutil
+import tempfile
 import numpy as np
 from core import speech_recognition as sr
 
@@ -16,12 +19,15 @@ class TestSpeechRecognition(unittest.TestCase):
         self.create_test_audio_file()
 
     def tearDown(self):
+        sr.flush_memory()
         if os.path.exists(self.memory_file):
             os.remove(self.memory_file)
         if os.path.exists(self.speaker_profiles_file):
             os.remove(self.speaker_profiles_file)
         if os.path.exists(self.audio_file):
             os.remove(self.audio_file)
+        for path in glob.glob('test_speaker_profiles.*'):
+            os.remove(path)
 
     def create_test_audio_file(self):
         with wave.open(self.audio_file, 'wb') as wf:
@@ -51,6 +57,7 @@ class TestSpeechRecognition(unittest.TestCase):
 
     def test_set_memory(self):
         sr.set_memory('key', 'value')
+        sr.flush_memory()
         with open(self.memory_file, 'r') as file:
             memory = json.load(file)
         self.assertEqual(memory['key'], 'value')
@@ -59,6 +66,7 @@ class TestSpeechRecognition(unittest.TestCase):
         with open(self.memory_file, 'w') as file:
             json.dump({'key': 'old_value'}, file)
         sr.update_memory('key', 'new_value')
+        sr.flush_memory()
         with open(self.memory_file, 'r') as file:
             memory = json.load(file)
         self.assertEqual(memory['key'], 'new_value')
@@ -67,14 +75,15 @@ class TestSpeechRecognition(unittest.TestCase):
         with open(self.speaker_profiles_file, 'w') as file:
             json.dump({'speaker': [0.1, 0.2]}, file)
         profiles = sr.load_speaker_profiles()
-        self.assertEqual(profiles['speaker'], [0.1, 0.2])
+        np.testing.assert_allclose(profiles['speaker'], [0.1, 0.2], rtol=1e-6)
+        self.assertTrue(os.path.exists('test_speaker_profiles.meta.json'))
 
     def test_save_speaker_profiles(self):
         profiles = {'speaker': [0.1, 0.2]}
         sr.save_speaker_profiles(profiles)
-        with open(self.speaker_profiles_file, 'r') as file:
-            saved_profiles = json.load(file)
-        self.assertEqual(saved_profiles['speaker'], [0.1, 0.2])
+        self.assertFalse(os.path.exists(self.speaker_profiles_file))
+        saved_profiles = sr.load_speaker_profiles()
+        np.testing.assert_allclose(saved_profiles['speaker'], [0.1, 0.2], rtol=1e-6)
 
     def test_enroll_speaker(self):
         sr.enroll_speaker('test_speaker', self.audio_file)
@@ -86,5 +95,105 @@ class TestSpeechRecognition(unittest.TestCase):
         recognized_speaker = sr.recognize_speaker(self.audio_file)
         self.assertEqual(recognized_speaker, 'test_speaker')
 
+    def test_extract_features_from_buffer(self):
+        with wave.open(self.audio_file, 'rb') as wf:
+            samples = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        from_file = sr.extract_features(self.audio_file)
+        from_int16 = sr.extract_features_from_buffer(samples, 44100)
+        from_float = sr.extract_features_from_buffer(samples.astype(np.float32) / 32768.0, 44100)
+        np.testing.assert_allclose(from_int16, from_file)
+        np.testing.assert_allclose(from_float, from_file, rtol=1e-4, atol=1e-6)
+
+    def test_recognize_speaker_from_buffer(self):
+        samples = (0.5 * np.sin(2 * np.pi * 220 * np.linspace(0, 1, 16000))).astype(np.float32)
+        sr.enroll_speaker('buffer_speaker', samples, 16000)
+        self.assertEqual(sr.recognize_speaker(samples, 16000), 'buffer_speaker')
+        with self.assertRaises(ValueError):
+            sr.recognize_speaker(samples)
+
+    def test_save_audio_to_wav_float(self):
+        samples = (0.5 * np.sin(2 * np.pi * 220 * np.linspace(0, 1, 16000))).astype(np.float32)
+        sr.save_audio_to_wav(samples, self.audio_file, 16000)
+        with wave.open(self.audio_file, 'rb') as wf:
+            self.assertEqual(wf.getnframes(), 16000)
+            written = np.frombuffer(wf.readframes(wf.getnframes()), dtype=np.int16)
+        self.assertAlmostEqual(written.max() / 32768.0, 0.5, places=2)
+
+    def test_enroll_speaker_appends(self):
+        sr.enroll_speaker('first_speaker', self.audio_file)
+        sr.enroll_speaker('second_speaker', self.audio_file)
+        profiles = sr.load_speaker_profiles()
+        self.assertEqual(set(profiles), {'first_speaker', 'second_speaker'})
+
+    def test_enroll_speaker_samples_averages_into_centroid(self):
+        low = (0.5 * np.sin(2 * np.pi * 220 * np.linspace(0, 1, 16000))).astype(np.float32)
+        high = (0.5 * np.sin(2 * np.pi * 880 * np.linspace(0, 1, 16000))).astype(np.float32)
+        sr.enroll_speaker_samples('two_clips', [low, high], 16000)
+        index = sr.get_speaker_index()
+        self.assertEqual(index.samples('two_clips'), 2)
+        embedder = sr.get_embedder()
+        np.testing.assert_allclose(index.get('two_clips'), (embedder.embed(low, 16000) + embedder.embed(high, 16000)) / 2,
+                                   rtol=1e-5)
+        np.testing.assert_allclose(sr.load_speaker_profiles()['two_clips'], index.get('two_clips'))
+        np.testing.assert_allclose(sr.get_profile_store().load_profiles()['two_clips'], index.get('two_clips'), rtol=1e-5)
+        # The centroid is rebuilt from the stored samples.
+        sr._speaker_index = None
+        self.assertEqual(sr.get_speaker_index().samples('two_clips'), 2)
+
+    def test_further_clips_of_enrolled_speakers_are_accepted(self):
+        from core.benchmark import SAMPLE_RATE, SCRIPT, synthetic_voice
+        first = {}
+        for speaker, text in SCRIPT:
+            first.setdefault(speaker, text)
+        sr.enroll_speaker('alice', synthetic_voice('alice', first['alice']), SAMPLE_RATE)
+        # With a single speaker the nearest profile is taken.
+        self.assertEqual(sr.recognize_speaker(synthetic_voice('alice', "Jarvis, tell me a joke."), SAMPLE_RATE), 'alice')
+        sr.enroll_speaker('bob', synthetic_voice('bob', first['bob']), SAMPLE_RATE)
+        self.assertIsNone(sr.recognize_speaker(synthetic_voice('carol', first['carol']), SAMPLE_RATE))
+        sr.enroll_speaker('carol', synthetic_voice('carol', first['carol']), SAMPLE_RATE)
+        for speaker, text in SCRIPT:
+            if text != first[speaker]:
+                self.assertEqual(sr.recognize_speaker(synthetic_voice(speaker, text), SAMPLE_RATE), speaker)
+
+    def test_rescoring_uses_cached_embeddings(self):
+        samples = (0.5 * np.sin(2 * np.pi * 330 * np.linspace(0, 1, 16000))).astype(np.float32)
+        sr.enroll_speaker('cached_speaker', samples, 16000)
+        cache = sr.get_embedder().cache
+        hits = cache.hits
+        self.assertEqual(sr.recognize_speakers([samples, samples], 16000), ['cached_speaker', 'cached_speaker'])
+        self.assertEqual(cache.hits, hits + 2)
+
+    def test_enroll_and_score_directory(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        for name, frequency in (('low', 220), ('high', 880)):
+            os.makedirs(os.path.join(directory, name))
+            for i, seconds in enumerate((1.5, 0.2)):
+                t = np.linspace(0, seconds, int(16000 * seconds))
+                sr.save_audio_to_wav(0.5 * np.sin(2 * np.pi * frequency * t), os.path.join(directory, name, f'{i}.wav'), 16000)
+        self.assertEqual(sr.enroll_directory(directory, workers=1), {'high': 2, 'low': 2})
+        self.assertEqual(sr.get_speaker_index().samples('low'), 2)
+        scores = sr.score_directory(os.path.join(directory, 'high'), min_confidence=0.0, workers=2)
+        self.assertEqual(list(scores.values()), ['high', 'high'])
+        self.assertEqual(sr.enroll_directory(os.path.join(directory, 'low'), name='again'), {'again': 2})
+
+    def test_wav_paths_are_streamed_and_cached(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        path = os.path.join(directory, 'long.wav')
+        t = np.linspace(0, 3, 48000)
+        sr.save_audio_to_wav(0.5 * np.sin(2 * np.pi * 330 * t), path, 16000)
+        real_aIO = sr.aIO
+        sr.aIO = None
+        try:
+            sr.enroll_speaker('streamed', path)
+            cache = sr.get_embedder().cache
+            hits = cache.hits
+            self.assertEqual(sr.recognize_speaker(path, min_confidence=0.0), 'streamed')
+            self.assertEqual(sr.score_directory(directory, min_confidence=0.0), {path: 'streamed'})
+            self.assertEqual(cache.hits, hits + 2)
+        finally:
+            sr.aIO = real_aIO
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,187 @@
+# tests/test_spotify_service.py
+
+import unittest
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from core.spotify_service import SpotifyService, SpotifyError
+
+class FakeSpotify(ThreadingHTTPServer):
+    # A local stand-in for the Spotify Web API's player endpoints.
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(('127.0.0.1', 0), FakeSpotifyHandler)
+        self.requests = []
+        self.responses = []
+        self.valid_tokens = {'token-1'}
+        self.is_playing = True
+        self.track = 0
+        self.tracks = [('Song A', 'Artist A', 'Album A'), ('Song B', 'Artist B', 'Album B')]
+        self.connections = set()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}/v1/"
+
+class FakeSpotifyHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, status, body=None, headers=None):
+        data = json.dumps(body).encode('utf-8') if body is not None else b''
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _handle(self):
+        server = self.server
+        server.connections.add(self.client_address)
+        server.requests.append((self.command, self.path))
+        if self.headers.get('Authorization', '')[len('Bearer '):] not in server.valid_tokens:
+            return self._reply(401, {'error': 'expired token'})
+        if server.responses:
+            status, headers = server.responses.pop(0)
+            return self._reply(status, {'error': 'scripted'}, headers)
+        if self.path == '/v1/me/player/currently-playing':
+            title, artist, album = server.tracks[server.track]
+            return self._reply(200, {'is_playing': server.is_playing, 'item': {
+                'name': title, 'artists': [{'name': artist}], 'album': {'name': album}}})
+        if self.path == '/v1/me/player/play':
+            server.is_playing = True
+        elif self.path == '/v1/me/player/pause':
+            server.is_playing = False
+        elif self.path == '/v1/me/player/next':
+            server.track = (server.track + 1) % len(server.tracks)
+        elif self.path == '/v1/me/player/previous':
+            server.track = (server.track - 1) % len(server.tracks)
+        else:
+            return self._reply(404, {'error': 'not found'})
+        self._reply(204)
+
+    do_GET = do_PUT = do_POST = _handle
+
+class FakeCacheHandler:
+    def __init__(self, token_info):
+        self.token_info = token_info
+
+    def get_cached_token(self):
+        return self.token_info
+
+class FakeAuthManager:
+    def __init__(self, expires_at):
+        self.cache_handler = FakeCacheHandler({'access_token': 'token-1', 'refresh_token': 'refresh', 'expires_at': expires_at})
+        self.refreshes = 0
+
+    def get_access_token(self, as_dict=False):
+        return self.cache_handler.token_info['access_token']
+
+    def refresh_access_token(self, refresh_token):
+        self.refreshes += 1
+        token_info = {'access_token': f'token-{self.refreshes + 1}', 'refresh_token': refresh_token, 'expires_at': 10_000}
+        self.cache_handler.token_info = token_info
+        return token_info
+
+class TestSpotifyService(unittest.TestCase):
+
+    def setUp(self):
+        self.server = FakeSpotify()
+        threading.Thread(target=self.server.serve_forever, args=(0.05,), daemon=True).start()
+        self.now = 0.0
+        self.sleeps = []
+        self.auth = FakeAuthManager(expires_at=10_000)
+
+    def tearDown(self):
+        self.service.close()
+        self.server.shutdown()
+        self.server.server_close()
+
+    def make_service(self, **kwargs):
+        self.service = SpotifyService(self.auth, base_url=self.server.url, sleep=self.sleeps.append,
+                                      clock=lambda: self.now, wall_clock=lambda: self.now, **kwargs)
+        return self.service
+
+    def test_now_playing_is_cached(self):
+        service = self.make_service(ttl=5.0)
+        state = service.now_playing()
+        self.assertEqual(state, {'artist': 'Artist A', 'album': 'Album A', 'title': 'Song A', 'is_playing': True})
+        service.now_playing()
+        self.assertEqual(len(self.server.requests), 1)
+        self.now += 6.0
+        service.now_playing()
+        self.assertEqual(len(self.server.requests), 2)
+        self.assertEqual(service.stats()['now_playing']['calls'], 2)
+
+    def test_session_reuses_connections(self):
+        service = self.make_service(ttl=0.0)
+        for _ in range(5):
+            self.now += 1.0
+            service.now_playing()
+        self.assertEqual(len(self.server.requests), 5)
+        self.assertEqual(len(self.server.connections), 1)
+
+    def test_commands_apply_optimistically(self):
+        service = self.make_service()
+        service.now_playing()
+        future = service.pause()
+        self.assertFalse(service.now_playing()['is_playing'])
+        future.result(timeout=5)
+        self.assertFalse(self.server.is_playing)
+
+        service.next_track().result(timeout=5)
+        self.assertEqual(service.now_playing()['title'], 'Song B')
+
+    def test_failed_command_rolls_back(self):
+        service = self.make_service(max_retries=0)
+        service.now_playing()
+        self.server.responses.append((403, {}))
+        future = service.pause()
+        with self.assertRaises(SpotifyError):
+            future.result(timeout=5)
+        self.assertTrue(service.now_playing()['is_playing'])
+        self.assertEqual(service.stats()['pause']['errors'], 1)
+
+    def test_rate_limits_are_retried_with_backoff(self):
+        service = self.make_service(backoff=0.5)
+        self.server.responses += [(429, {'Retry-After': '2'}), (503, {})]
+        service.now_playing()
+        self.assertEqual(len(self.sleeps), 2)
+        self.assertGreaterEqual(self.sleeps[0], 2.0)
+        self.assertLessEqual(self.sleeps[0], 2.5)
+        self.assertLessEqual(self.sleeps[1], 1.0)
+        self.assertEqual(service.stats()['now_playing']['retries'], 2)
+
+    def test_gives_up_after_max_retries(self):
+        service = self.make_service(max_retries=2)
+        self.server.responses += [(500, {})] * 3
+        with self.assertRaises(SpotifyError) as raised:
+            service.now_playing()
+        self.assertEqual(raised.exception.status, 500)
+        self.assertEqual(len(self.sleeps), 2)
+
+    def test_token_refreshed_before_expiry(self):
+        self.auth = FakeAuthManager(expires_at=100)
+        service = self.make_service(refresh_margin=300)
+        self.server.valid_tokens.add('token-2')
+        service.now_playing()
+        for _ in range(100):
+            if service._token_info['access_token'] == 'token-2':
+                break
+            threading.Event().wait(0.01)
+        self.assertEqual(self.auth.refreshes, 1)
+        self.assertEqual(service.access_token(), 'token-2')
+
+    def test_expired_token_is_refreshed_on_401(self):
+        service = self.make_service()
+        service.access_token()
+        self.server.valid_tokens = {'token-2'}
+        self.assertEqual(service.now_playing()['title'], 'Song A')
+        self.assertEqual(self.auth.refreshes, 1)
+
+if __name__ == '__main__':
+    unittest.main()
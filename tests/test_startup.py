@@ -0,0 +1,59 @@
+# tests/test_startup.py
+
+import unittest
+import sys
+import time
+import threading
+from core.startup import StartupProfiler, LazyModule, lazy_import, preload, Warmup
+
+class TestStartup(unittest.TestCase):
+
+    def test_profiler_records_phases_and_marks(self):
+        profiler = StartupProfiler()
+        with profiler.phase("first"):
+            time.sleep(0.01)
+        with self.assertRaises(ValueError):
+            with profiler.phase("broken"):
+                raise ValueError("boom")
+        profiler.mark("listening")
+        self.assertEqual([phase['name'] for phase in profiler.phases], ["first", "broken"])
+        self.assertGreaterEqual(profiler.phases[0]['duration'], 0.01)
+        self.assertIn("ValueError", profiler.phases[1]['error'])
+        report = profiler.report()
+        self.assertIn("first", report)
+        self.assertIn("failed", report)
+        self.assertIn("listening", report)
+
+    def test_lazy_import_defers_loading(self):
+        sys.modules.pop('colorsys', None)
+        module = lazy_import('colorsys')
+        self.assertIsInstance(module, LazyModule)
+        self.assertNotIn('colorsys', sys.modules)
+        self.assertEqual(module.rgb_to_hsv(0, 0, 0), (0.0, 0.0, 0.0))
+        self.assertIn('colorsys', sys.modules)
+        self.assertIs(lazy_import('colorsys'), sys.modules['colorsys'])
+
+    def test_failed_lazy_import_is_retried(self):
+        module = LazyModule('no_such_module_for_jarvis')
+        with self.assertRaises(ImportError):
+            preload(module)
+        with self.assertRaises(ImportError):
+            module.anything
+
+    def test_warmup_runs_tasks_in_background(self):
+        profiler = StartupProfiler()
+        warmup = Warmup(profiler)
+        release = threading.Event()
+        warmup.start("slow", release.wait)
+        warmup.start("fails", lambda: 1 / 0)
+        self.assertFalse(warmup.wait(0.01))
+        release.set()
+        self.assertTrue(warmup.wait(1))
+        self.assertTrue(warmup.result("slow"))
+        with self.assertRaises(ZeroDivisionError):
+            warmup.result("fails")
+        self.assertEqual(sorted(phase['name'] for phase in profiler.phases), ["fails", "slow"])
+        self.assertTrue(all(phase['thread'].startswith("warmup-") for phase in profiler.phases))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+from core.text_stream import SentenceSplitter
+
+def split_all(deltas, **kwargs):
+    splitter = SentenceSplitter(**kwargs)
+    sentences = []
+    for delta in deltas:
+        sentences.extend(splitter.feed(delta))
+    sentences.extend(splitter.flush())
+    return splitter, sentences
+
+class TestSentenceSplitter(unittest.TestCase):
+
+    def test_sentences_emitted_as_they_complete(self):
+        splitter = SentenceSplitter(min_length=0)
+        self.assertEqual(splitter.feed("Hello there"), [])
+        self.assertEqual(splitter.feed(", sir. How are"), ["Hello there, sir."])
+        self.assertEqual(splitter.feed(" you today? I am"), ["How are you today?"])
+        self.assertEqual(splitter.flush(), ["I am"])
+
+    def test_token_stream(self):
+        text = "The weather is sunny today. It will rain tomorrow! Bring an umbrella."
+        _, sentences = split_all(list(text), min_length=0)
+        self.assertEqual(sentences, ["The weather is sunny today.", "It will rain tomorrow!", "Bring an umbrella."])
+
+    def test_short_sentences_are_merged(self):
+        _, sentences = split_all(["Sure. ", "Okay. ", "Playing your music now. ", "Enjoy."], min_length=20)
+        self.assertEqual(sentences, ["Sure. Okay. Playing your music now.", "Enjoy."])
+
+    def test_command_suffix_not_spoken(self):
+        splitter, sentences = split_all(["Starting the music now", " for you. #pl", "ay"], min_length=0)
+        self.assertEqual(sentences, ["Starting the music now for you."])
+        self.assertEqual(splitter.text, "Starting the music now for you. #play")
+        self.assertEqual(splitter.text.split('#')[1], "play")
+        self.assertEqual(splitter.speech, "Starting the music now for you. ")
+
+    def test_command_marker_mid_sentence(self):
+        _, sentences = split_all(["Skipping#skip"], min_length=0)
+        self.assertEqual(sentences, ["Skipping"])
+
+    def test_decimal_is_not_a_sentence_end(self):
+        _, sentences = split_all(["It costs 3.50 dollars. Thanks."], min_length=0)
+        self.assertEqual(sentences, ["It costs 3.50 dollars.", "Thanks."])
+
+    def test_empty_stream(self):
+        _, sentences = split_all([])
+        self.assertEqual(sentences, [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,144 @@
+# tests/test_tracing.py
+
+import unittest
+import os
+import json
+import time
+import asyncio
+import tempfile
+import urllib.request
+from core.tracing import Tracer, Histogram, tracer as shared_tracer
+from core.pipeline import Pipeline
+from core.commands import CommandTable
+
+class Item:
+    def __init__(self, trace):
+        self.trace = trace
+
+class TestTracing(unittest.TestCase):
+
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix='.jsonl')
+        os.close(fd)
+        self.addCleanup(os.remove, self.path)
+        self.tracer = Tracer(enabled=True, jsonl_path=self.path)
+
+    def records(self):
+        with open(self.path) as file:
+            return [json.loads(line) for line in file]
+
+    def test_histogram_quantiles(self):
+        histogram = Histogram(window=100)
+        for value in range(1, 101):
+            histogram.observe(value)
+        self.assertEqual(histogram.quantile(0.5), 51)
+        self.assertEqual(histogram.quantile(0.99), 100)
+        self.assertEqual(histogram.count, 100)
+        self.assertIsNone(Histogram().quantile(0.5))
+
+    def test_turn_breakdown_is_written(self):
+        with self.tracer.turn():
+            with self.tracer.span("stt"):
+                time.sleep(0.01)
+            with self.tracer.span("assistant", model="gpt"):
+                pass
+        spans = [r for r in self.records() if r['type'] == 'span']
+        turns = [r for r in self.records() if r['type'] == 'turn']
+        self.assertEqual([span['name'] for span in spans], ['stt', 'assistant'])
+        self.assertEqual(spans[1]['attrs'], {'model': 'gpt'})
+        self.assertEqual(len(turns), 1)
+        self.assertEqual(set(turns[0]['breakdown_ms']), {'stt', 'assistant'})
+        self.assertGreaterEqual(turns[0]['breakdown_ms']['stt'], 10)
+        self.assertGreaterEqual(turns[0]['total_ms'], turns[0]['breakdown_ms']['stt'])
+        self.assertEqual(spans[0]['trace'], turns[0]['trace'])
+        self.assertEqual(self.tracer.summary()['turn']['count'], 1)
+
+    def test_failed_span_is_recorded(self):
+        with self.assertRaises(ValueError):
+            with self.tracer.span("tts.synthesize"):
+                raise ValueError
+        self.assertEqual(self.records()[0]['attrs'], {'error': 'ValueError'})
+
+    def test_traced_and_observe(self):
+        @self.tracer.traced("speaker_id")
+        def recognize(x):
+            return x * 2
+        self.assertEqual(recognize.__name__, 'recognize')
+        self.assertEqual(recognize(2), 4)
+        self.tracer.observe("assistant.first_token", 0.25)
+        summary = self.tracer.summary()
+        self.assertEqual(summary['speaker_id']['count'], 1)
+        self.assertAlmostEqual(summary['assistant.first_token']['p50'], 0.25)
+
+    def test_disabled_tracer_records_nothing(self):
+        tracer = Tracer(jsonl_path=self.path)
+        with tracer.turn():
+            with tracer.span("stt"):
+                pass
+        self.assertIsNone(tracer.start_trace())
+        self.assertEqual(tracer.summary(), {})
+        self.assertEqual(self.records(), [])
+        # A disabled span is a shared no-op and must stay cheap.
+        start = time.perf_counter()
+        for _ in range(10000):
+            with tracer.span("stt"):
+                pass
+        self.assertLess((time.perf_counter() - start) / 10000, 20e-6)
+
+    def test_prometheus_endpoint(self):
+        for value in (0.1, 0.2, 0.3):
+            self.tracer.observe("stt", value)
+        text = self.tracer.prometheus_text()
+        self.assertIn('jarvis_latency_seconds{span="stt",quantile="0.5"} 0.200000', text)
+        self.assertIn('jarvis_latency_seconds_count{span="stt"} 3', text)
+        server = self.tracer.serve(0)
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        port = server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics") as response:
+            self.assertEqual(response.read().decode('utf-8'), self.tracer.prometheus_text())
+
+    def test_pipeline_stages_are_traced_per_item(self):
+        shared_tracer.configure(enabled=True, jsonl_path=self.path)
+        self.addCleanup(shared_tracer.configure, enabled=False)
+
+        async def source():
+            for _ in range(2):
+                yield Item(shared_tracer.start_trace())
+
+        async def transcribe(item):
+            with shared_tracer.span("stt"):
+                await asyncio.sleep(0.001)
+            return item
+
+        def ask():
+            with shared_tracer.span("assistant"):
+                pass
+
+        async def respond(item):
+            # Blocking calls run on the executor but still belong to the item's turn.
+            await pipeline.run_blocking(ask)
+            return item
+
+        pipeline = Pipeline()
+        pipeline.add_stage("transcribe", transcribe)
+        pipeline.add_stage("respond", respond)
+        asyncio.run(pipeline.run(source()))
+        turns = [r for r in self.records() if r['type'] == 'turn']
+        self.assertEqual(len(turns), 2)
+        for turn in turns:
+            self.assertEqual(set(turn['breakdown_ms']), {'stage.transcribe', 'stt', 'stage.respond', 'assistant'})
+
+    def test_commands_run_in_the_current_turn(self):
+        shared_tracer.configure(enabled=True, jsonl_path=self.path)
+        self.addCleanup(shared_tracer.configure, enabled=False)
+        commands = CommandTable(max_workers=1)
+        self.addCleanup(commands.executor.shutdown)
+        commands.register("pause", lambda: None)
+        with shared_tracer.turn():
+            commands.dispatch("pause").result()
+        turn = [r for r in self.records() if r['type'] == 'turn'][0]
+        self.assertEqual(list(turn['breakdown_ms']), ['command.pause'])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+# tests/test_tts_backends.py
+
+import unittest
+import os
+import shutil
+import tempfile
+from core.tts_cache import TTSCache
+from core.tts_backends import TTSBackend, Pyttsx3Backend, TTSSelector
+
+class StubBackend(TTSBackend):
+    def __init__(self, name, clock=None, delay=0.0):
+        self.name = name
+        self.model = name + '-model'
+        self.voice = 'voice'
+        self.clock = clock
+        self.delay = delay
+        self.fail = False
+        self.rendered = []
+
+    def render(self, text, path):
+        if self.fail:
+            raise ConnectionError("offline")
+        if self.clock is not None:
+            self.clock.now += self.delay
+        self.rendered.append(text)
+        with open(path, 'wb') as file:
+            file.write(text.encode('utf-8'))
+
+class StubEngine:
+    def __init__(self):
+        self.properties = {}
+        self.queued = []
+
+    def setProperty(self, name, value):
+        self.properties[name] = value
+
+    def save_to_file(self, text, path):
+        self.queued.append((text, path))
+
+    def runAndWait(self):
+        for text, path in self.queued:
+            with open(path, 'wb') as file:
+                file.write(b'RIFF' + text.encode('utf-8'))
+        self.queued = []
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+class TestTTSBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.dir = tempfile.mkdtemp()
+        self.clock = FakeClock()
+        self.remote = StubBackend('remote', self.clock, delay=0.5)
+        self.local = StubBackend('local', self.clock, delay=0.05)
+        self.caches = {
+            'remote': TTSCache(os.path.join(self.dir, 'remote')),
+            'local': TTSCache(os.path.join(self.dir, 'local'), extension='.wav'),
+        }
+        self.selector = TTSSelector(self.remote, self.local, latency_threshold=1.0,
+                                    retry_after=10.0, clock=self.clock)
+
+    def tearDown(self):
+        shutil.rmtree(self.dir)
+
+    def test_routes_by_kind(self):
+        self.assertIs(self.selector.choose(), self.remote)
+        self.assertIs(self.selector.choose(system=True), self.local)
+
+    def test_short_replies_keep_the_remote_voice(self):
+        self.selector.synthesize("Yes.", self.caches)
+        self.assertEqual(self.remote.rendered, ["Yes."])
+
+    def test_backend_chosen_for_the_reply_is_used(self):
+        self.selector.synthesize("Part of a reply.", self.caches, backend=self.local)
+        self.assertEqual(self.local.rendered, ["Part of a reply."])
+
+    def test_backend_is_abstract(self):
+        with self.assertRaises(TypeError):
+            TTSBackend()
+
+    def test_without_local_engine_everything_is_remote(self):
+        selector = TTSSelector(self.remote)
+        self.assertIs(selector.choose(system=True), self.remote)
+
+    def test_reuses_remote_clips(self):
+        text = "A reply that is long enough for the remote voice."
+        path = self.selector.synthesize(text, self.caches)
+        self.assertEqual(self.remote.rendered, [text])
+        self.assertEqual(self.selector.synthesize(text, self.caches, system=True), path)
+        self.assertEqual(self.local.rendered, [])
+
+    def test_falls_back_to_local_when_remote_fails(self):
+        self.remote.fail = True
+        text = "A reply that is long enough for the remote voice."
+        path = self.selector.synthesize(text, self.caches)
+        self.assertTrue(path.endswith('.wav'))
+        self.assertEqual(self.selector.failures, {'remote': 1})
+        # The remote backend is skipped until retry_after has passed.
+        self.assertIs(self.selector.choose(), self.local)
+        self.clock.now += 10.0
+        self.assertIs(self.selector.choose(), self.remote)
+
+    def test_slow_remote_is_avoided(self):
+        self.remote.delay = 3.0
+        self.selector.synthesize("A first reply that takes the remote voice ages.", self.caches)
+        self.assertGreater(self.selector.latency['remote'], 1.0)
+        self.assertIs(self.selector.choose(), self.local)
+        self.clock.now += 10.0
+        self.assertIs(self.selector.choose(), self.remote)
+
+    def test_raises_when_every_backend_fails(self):
+        self.remote.fail = True
+        self.local.fail = True
+        with self.assertRaises(ConnectionError):
+            self.selector.synthesize("Nothing can say this.", self.caches)
+
+    def test_pyttsx3_backend_renders_with_engine(self):
+        engine = StubEngine()
+        backend = Pyttsx3Backend(voice='english', rate=180, engine_factory=lambda: engine)
+        path = os.path.join(self.dir, 'clip.tmp')
+        backend.render("Hello there", path)
+        with open(path, 'rb') as file:
+            self.assertEqual(file.read(), b'RIFFHello there')
+        self.assertEqual(engine.properties, {'voice': 'english', 'rate': 180})
+        self.assertTrue(backend.available())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+import unittest
+import os
+import shutil
+from core.tts_cache import TTSCache
+
+class TestTTSCache(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = 'test_tts_cache'
+        self.cache = TTSCache(self.cache_dir, max_bytes=1000)
+        self.rendered = []
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir, ignore_errors=True)
+
+    def render(self, text, path):
+        self.rendered.append(text)
+        with open(path, 'wb') as file:
+            file.write(b'x' * 400)
+
+    def test_key_depends_on_model_voice_and_text(self):
+        keys = {
+            self.cache.key('tts-1', 'echo', 'Hello'),
+            self.cache.key('tts-1', 'alloy', 'Hello'),
+            self.cache.key('tts-1-hd', 'echo', 'Hello'),
+            self.cache.key('tts-1', 'echo', 'Hello!'),
+        }
+        self.assertEqual(len(keys), 4)
+
+    def test_get_or_render_caches(self):
+        first = self.cache.get_or_render('tts-1', 'echo', 'Hello', self.render)
+        second = self.cache.get_or_render('tts-1', 'echo', 'Hello', self.render)
+        self.assertEqual(first, second)
+        self.assertTrue(os.path.exists(first))
+        self.assertEqual(self.rendered, ['Hello'])
+        self.assertEqual((self.cache.hits, self.cache.misses), (1, 1))
+
+    def test_failed_render_leaves_nothing(self):
+        def failing_render(text, path):
+            with open(path, 'wb') as file:
+                file.write(b'partial')
+            raise RuntimeError("network down")
+        with self.assertRaises(RuntimeError):
+            self.cache.get_or_render('tts-1', 'echo', 'Hello', failing_render)
+        self.assertIsNone(self.cache.get('tts-1', 'echo', 'Hello'))
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_lru_eviction(self):
+        a = self.cache.get_or_render('tts-1', 'echo', 'a', self.render)
+        b = self.cache.get_or_render('tts-1', 'echo', 'b', self.render)
+        os.utime(a, ns=(1, 1))
+        os.utime(b, ns=(2, 2))
+        self.cache.get('tts-1', 'echo', 'a')
+        c = self.cache.get_or_render('tts-1', 'echo', 'c', self.render)
+        self.assertTrue(os.path.exists(a))
+        self.assertFalse(os.path.exists(b))
+        self.assertTrue(os.path.exists(c))
+        self.assertLessEqual(self.cache.size(), 1000)
+
+    def test_warm_up(self):
+        prompts = ['Which file should I update?', 'Please describe what the code should do.']
+        self.assertEqual(self.cache.warm_up('tts-1', 'echo', prompts, self.render), 2)
+        self.assertEqual(self.cache.warm_up('tts-1', 'echo', prompts, self.render), 0)
+        self.assertEqual(self.rendered, prompts)
+
+if __name__ == '__main__':
+    unittest.main()
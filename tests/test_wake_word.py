@@ -0,0 +1,96 @@
+# tests/test_wake_word.py
+
+import unittest
+import os
+import shutil
+import tempfile
+import wave
+import numpy as np
+from core.wake_word import WakeWordDetector, evaluate, load_wav_dir, mfcc_frames, subsequence_dtw
+
+RATE = 16000
+# Synthetic "words": runs of harmonic tones standing in for syllables.
+WAKE_WORD = [300, 800, 500, 1200, 700]
+OTHER_WORDS = [[400, 400, 900, 600, 300], [1000, 350, 650, 450, 900], [250, 1100, 800, 300, 600], [600, 600, 600, 800, 500]]
+
+def word(freqs, tempo=1.0, syllable=0.12):
+    parts = []
+    for freq in freqs:
+        t = np.arange(int(syllable * tempo * RATE)) / RATE
+        parts.append(sum(np.sin(2 * np.pi * freq * k * t) / k for k in (1, 2, 3)) * np.hanning(len(t)))
+    return np.concatenate(parts)
+
+def utterance(rng, words, tempo=1.0):
+    silence = np.zeros(int(0.1 * RATE))
+    signal = np.concatenate([silence] + [word(w, tempo) for w in words] + [silence])
+    signal = signal * rng.uniform(0.2, 0.5) / np.abs(signal).max()
+    return (signal + rng.normal(0, 0.01, len(signal))).astype(np.float32), RATE
+
+def write_wav(path, samples, sample_rate):
+    with wave.open(path, 'wb') as wf:
+        wf.setnchannels(1)
+        wf.setsampwidth(2)
+        wf.setframerate(sample_rate)
+        wf.writeframes((samples * 32767).astype(np.int16).tobytes())
+
+class TestWakeWord(unittest.TestCase):
+
+    def setUp(self):
+        rng = np.random.default_rng(0)
+        self.templates = [utterance(rng, [WAKE_WORD], tempo) for tempo in (0.9, 1.0, 1.1)]
+        self.positives = ([utterance(rng, [WAKE_WORD, OTHER_WORDS[i % 4]], rng.uniform(0.8, 1.25)) for i in range(10)] +
+                          [utterance(rng, [OTHER_WORDS[i % 4], WAKE_WORD], rng.uniform(0.8, 1.25)) for i in range(5)])
+        self.negatives = [utterance(rng, [OTHER_WORDS[i % 4], OTHER_WORDS[(i + 1) % 4]], rng.uniform(0.8, 1.25))
+                          for i in range(15)]
+
+    def test_mfcc_frames_shape(self):
+        samples, rate = self.templates[0]
+        frames = mfcc_frames(samples, rate)
+        self.assertEqual(frames.shape[1], 13)
+        self.assertEqual(frames.shape[0], 1 + (len(samples) - 400) // 160)
+        self.assertEqual(mfcc_frames(samples[:100], rate).shape, (0, 13))
+
+    def test_subsequence_dtw_finds_embedded_pattern(self):
+        rng = np.random.default_rng(1)
+        template = rng.normal(size=(20, 13))
+        utterance_frames = np.vstack([rng.normal(size=(30, 13)), np.repeat(template, 2, axis=0), rng.normal(size=(30, 13))])
+        self.assertAlmostEqual(subsequence_dtw(template, utterance_frames), 0.0)
+        self.assertGreater(subsequence_dtw(template, rng.normal(size=(100, 13))), 1.0)
+
+    def test_separates_wake_word_from_other_speech(self):
+        detector = WakeWordDetector(self.templates)
+        self.assertIsNotNone(detector.threshold)
+        report = evaluate(detector, self.positives, self.negatives)
+        self.assertEqual(report['false_reject_rate'], 0.0)
+        self.assertEqual(report['false_accept_rate'], 0.0)
+        self.assertAlmostEqual(report['transcribed_share'], 0.5)
+        # The gate has to be far cheaper than transcription.
+        self.assertLess(report['realtime_factor'], 0.1)
+        self.assertEqual(detector.stats['calls'], 30)
+        self.assertEqual(detector.stats['accepted'], 15)
+
+    def test_calibrate(self):
+        detector = WakeWordDetector(self.templates, threshold=0.1)
+        threshold = detector.calibrate(self.positives[:8], self.negatives[:8])
+        self.assertGreater(threshold, 0.1)
+        report = evaluate(detector, self.positives[8:], self.negatives[8:])
+        self.assertEqual(report['false_accept_rate'], 0.0)
+
+    def test_without_templates_nothing_fires(self):
+        detector = WakeWordDetector()
+        self.assertFalse(detector.detect(*self.positives[0]))
+
+    def test_benchmark_on_wav_fixtures(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        for name, recordings in (('templates', self.templates), ('positives', self.positives), ('negatives', self.negatives)):
+            os.makedirs(os.path.join(root, name))
+            for i, (samples, rate) in enumerate(recordings):
+                write_wav(os.path.join(root, name, f'{i:02d}.wav'), samples, rate)
+        detector = WakeWordDetector.from_directory(os.path.join(root, 'templates'))
+        report = evaluate(detector, load_wav_dir(os.path.join(root, 'positives')), load_wav_dir(os.path.join(root, 'negatives')))
+        self.assertEqual(report['false_reject_rate'], 0.0)
+        self.assertEqual(report['false_accept_rate'], 0.0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,53 +1,64 @@
 import asyncio
 import assist
-from icrawler.builtin import GoogleImageCrawler
-import os
-import spot
+from core.startup import lazy_import, preload
+from core.commands import CommandTable
+from core.image_search import ImageSearch
+
+# spot authenticates with Spotify when imported, so it is only loaded on first use
+# (or by jarvis' background warm-up).
+spot = lazy_import('spot')
+
+def warm_up():
+    preload(spot)
 
 #async def get_weather(city_name):
 #    async with python_weather.Client(unit=python_weather.IMPERIAL) as client:
 #        weather = await client.get(city_name)
 #        return weather
 
+commands = CommandTable(max_workers=4)
+
+# Results are kept in ./images (content-addressed, size-bounded) and reused for repeated queries.
+images = ImageSearch('images', downloader_threads=4)
+
 def search(query):
-    google_Crawler = GoogleImageCrawler(storage = {"root_dir": r'./images'})
-    google_Crawler.crawl(keyword = query, max_num = 1)
+    return images.search(query)
+
+@commands.command("search", takes_argument=True, timeout=30.0)
+def search_images(query):
+    return search(query)
 
+@commands.command("play", aliases=("resume",), timeout=5.0)
+def play_music():
+    spot.start_music()
+
+@commands.command("pause", aliases=("stop",), timeout=5.0)
+def pause_music():
+    spot.stop_music()
+
+@commands.command("skip", aliases=("next",), timeout=5.0)
+def next_track():
+    spot.skip_to_next()
+
+@commands.command("previous", aliases=("back",), timeout=5.0)
+def previous_track():
+    spot.skip_to_previous()
+
+@commands.command("spotify", blocking=True, timeout=10.0)
+def describe_music():
+    # Described locally from the cached playback state; no assistant round-trip.
+    # Blocking, so the recorder isn't restarted while the description is spoken.
+    response = spot.describe_current_track()
+    print(response)
+    return assist.TTS(response)
 
 def parse_command(command):
+    # Runs the one command named in `command` on the worker pool and returns its
+    # Future (None if nothing matched); commands.stats() has per-command timings.
 #    if "weather" in command:
 #        weather_description = asyncio.run(get_weather("Chicago"))
 #        query = "System information: " + str(weather_description)
 #        print(query)
 #        response = assist.ask_question_memory(query)
 #        done = assist.TTS(response)
-
-    if "search" in command:
-        files = os.listdir("./images")
-        [os.remove(os.path.join("./images", f))for f in files]
-        query = command.split("-")[1]
-        search(query)
-    
-    if "play" in command:
-        spot.start_music()
-
-    if "pause" in command:
-        spot.stop_music()
-    
-    if "skip" in command:
-        spot.skip_to_next()
-    
-    if "previous" in command:
-        spot.skip_to_previous()
-    
-    if "spotify" in command:
-        spotify_info = spot.get_current_playing_info()
-        query = "System information: " + str(spotify_info)
-        print(query)
-        response = assist.ask_question_memory(query)
-        done = assist.TTS(response)
-        
-
-    
-
-        
\ No newline at end of file
+    return commands.dispatch(command)